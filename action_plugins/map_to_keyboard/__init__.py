@@ -107,6 +107,9 @@ class MapToKeyboardFunctor(AbstractFunctor):
         for key in action.keys:
             self.release.release(gremlin.macro.key_from_code(key[0], key[1]))
 
+        self.press.compile()
+        self.release.compile()
+
     def process_event(self, event, value):
         if value.current:
             gremlin.macro.MacroManager().queue_macro(self.press)
@@ -23,6 +23,7 @@ from xml.etree import ElementTree
 from gremlin.base_classes import AbstractAction, AbstractFunctor
 from gremlin.common import InputType
 import gremlin.ui.input_item
+import gremlin.util
 
 
 class PlaySoundWidget(gremlin.ui.input_item.AbstractActionWidget):
@@ -81,13 +82,18 @@ class PlaySoundFunctor(AbstractFunctor):
         self.volume = action.volume
 
     def process_event(self, event, value):
+        # The player belongs to the main thread and has to be used from there
+        gremlin.util.run_in_main_thread(self._play)
+        return True
+
+    def _play(self):
+        """Plays the sound file."""
         PlaySoundFunctor.player.setMedia(
             QtMultimedia.QMediaContent(
                 QtCore.QUrl.fromLocalFile(self.sound_file)
             ))
         PlaySoundFunctor.player.setVolume(self.volume)
         PlaySoundFunctor.player.play()
-        return True
 
 
 class PlaySound(AbstractAction):
@@ -683,11 +683,13 @@ class CurveScene(QtWidgets.QGraphicsScene):
         # Redraw response curve
         curve_fn = self.model.get_curve_function()
         if curve_fn:
+            xs = range(-int(g_scene_size), int(g_scene_size+1), 2)
+            ys = curve_fn.evaluate([x / g_scene_size for x in xs])
             path = QtGui.QPainterPath(
                 QtCore.QPointF(-g_scene_size, -g_scene_size*curve_fn(-1))
             )
-            for x in range(-int(g_scene_size), int(g_scene_size+1), 2):
-                path.lineTo(x, -g_scene_size * curve_fn(x / g_scene_size))
+            for x, y in zip(xs, ys):
+                path.lineTo(x, -g_scene_size * y)
             self.addPath(path, QtGui.QPen(QtGui.QColor(0, 200, 0)))
 
         # Update editor widget fields
@@ -1159,8 +1161,18 @@ class ResponseCurveFunctor(AbstractFunctor):
         else:
             raise gremlin.error.GremlinError("Invalid curve type")
 
+        # Combine deadzone and response curve into a single table
+        self.lookup_table = None
+        if gremlin.config.Configuration().precompute_response_curves:
+            self.lookup_table = gremlin.spline.LookupTable(
+                lambda value: self.response_fn(self.deadzone_fn(value))
+            )
+
     def process_event(self, event, value):
-        value.current = self.response_fn(self.deadzone_fn(value.current))
+        if self.lookup_table is not None:
+            value.current = self.lookup_table(value.current)
+        else:
+            value.current = self.response_fn(self.deadzone_fn(value.current))
         return True
 
 
@@ -23,6 +23,7 @@ from xml.etree import ElementTree
 from gremlin.base_classes import AbstractAction, AbstractFunctor
 from gremlin.common import InputType
 import gremlin.ui.input_item
+import gremlin.util
 
 
 class TextToSpeechWidget(gremlin.ui.input_item.AbstractActionWidget):
@@ -54,7 +55,12 @@ class TextToSpeechFunctor(AbstractFunctor):
         self.text = action.text
 
     def process_event(self, event, value):
-        TextToSpeechFunctor.tts.speak(gremlin.tts.text_substitution(self.text))
+        # The COM object belongs to the main thread and has to be used from
+        # there
+        text = gremlin.tts.text_substitution(self.text)
+        gremlin.util.run_in_main_thread(
+            lambda: TextToSpeechFunctor.tts.speak(text)
+        )
         return True
 
 
@@ -0,0 +1,130 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares calibrating axis values via functions and lookup tables.
+
+Raw axis values are calibrated either by calling the function returned by
+util.create_calibration_function() or by indexing the table returned by
+util.create_calibration_lookup(). Three measurements are made:
+
+* cost of calibrating a single value
+* time needed to build a lookup table
+* agreement of both methods for every raw value
+
+    python benchmarks/calibration_lookup.py
+"""
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("GREMLIN_VJOY_DRIVER", "simulated")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gremlin import util
+
+
+# Calibration limits (minimum, center, maximum) of an axis and a slider
+limits = [
+    ("axis", (-32768, 0, 32767)),
+    ("slider", (-32768, -32768, 32767)),
+    ("narrow axis", (-30000, 1200, 29000))
+]
+
+
+def function_cost(calibrate, values):
+    """Returns the time in nanoseconds needed to calibrate a single value.
+
+    :param calibrate function calibrating a raw value
+    :param values the raw values to calibrate
+    :return average duration of a calibration in nanoseconds
+    """
+    start = time.perf_counter()
+    for value in values:
+        calibrate(value)
+    return (time.perf_counter() - start) / len(values) * 1e9
+
+
+def table_cost(table, values):
+    """Returns the time in nanoseconds needed to look up a single value.
+
+    The table is indexed directly, as done by the event listener.
+
+    :param table the lookup table of the calibration
+    :param values the raw values to calibrate
+    :return average duration of a lookup in nanoseconds
+    """
+    start = time.perf_counter()
+    for value in values:
+        table[value + 32768]
+    return (time.perf_counter() - start) / len(values) * 1e9
+
+
+def build_cost(limit, repetitions):
+    """Returns the time in milliseconds needed to build a lookup table.
+
+    :param limit the calibration limits of the axis
+    :param repetitions number of tables to build
+    :return average duration of building a table in milliseconds
+    """
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        util.create_calibration_lookup(*limit)
+    return (time.perf_counter() - start) / repetitions * 1000
+
+
+def mismatches(limit):
+    """Returns the number of raw values both methods disagree on.
+
+    :param limit the calibration limits of the axis
+    :return number of raw values with differing calibrated values
+    """
+    function = util.create_calibration_function(*limit)
+    table = util.create_calibration_lookup(*limit)
+    return sum(
+        1 for raw in range(-32768, 32768) if function(raw) != table[raw + 32768]
+    )
+
+
+def main():
+    values = [random.randint(-32768, 32767) for _ in range(200000)]
+
+    print("Calibration cost per value [ns]")
+    print("{:>12s} {:>10s} {:>10s}".format("limits", "function", "table"))
+    for name, limit in limits:
+        function = util.create_calibration_function(*limit)
+        table = util.create_calibration_lookup(*limit)
+        costs = [
+            function_cost(function, values),
+            table_cost(table, values)
+        ]
+        print("{:>12s} {:>10.1f} {:>10.1f}".format(name, *costs))
+
+    print()
+    print("Lookup table build time [ms], mismatching values")
+    for name, limit in limits:
+        print("{:>12s} {:>10.1f} {:>10d}".format(
+            name,
+            build_cost(limit, 10),
+            mismatches(limit)
+        ))
+
+
+if __name__ == "__main__":
+    main()
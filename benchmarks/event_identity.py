@@ -0,0 +1,194 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the cost of creating, hashing and cloning events.
+
+The Event class as it was before it used __slots__ and a cached identity
+hash is reproduced as LegacyEvent. Each synthetic event is created, used
+for three dictionary lookups and cloned once, as happens when an event
+passes through the listener, the dispatcher and the callbacks. Memory use
+per event is measured with tracemalloc.
+
+    python benchmarks/event_identity.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("GREMLIN_VJOY_DRIVER", "simulated")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gremlin import common, util
+from gremlin.event_handler import Event
+
+
+class LegacyEvent:
+
+    """Event without slots, computing its hash on every call."""
+
+    def __init__(
+            self,
+            event_type,
+            identifier,
+            hardware_id,
+            windows_id,
+            value=None,
+            is_pressed=None,
+            raw_value=None
+    ):
+        self.event_type = event_type
+        self.identifier = identifier
+        self.hardware_id = hardware_id
+        self.windows_id = windows_id
+        self.is_pressed = is_pressed
+        self.value = value
+        self.raw_value = raw_value
+
+    def clone(self):
+        return LegacyEvent(
+            self.event_type,
+            self.identifier,
+            self.hardware_id,
+            self.windows_id,
+            self.value,
+            self.is_pressed,
+            self.raw_value
+        )
+
+    def __eq__(self, other):
+        return self.__hash__() == other.__hash__()
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def __hash__(self):
+        hash_val = 0
+        if self.event_type == common.InputType.Keyboard:
+            extended_val = 1 << 8 if self.identifier[1] else 0
+            hash_val += (extended_val + int(self.identifier[0])) \
+                << Event.ShiftIdentifier
+        else:
+            hash_val += self.identifier << Event.ShiftIdentifier
+        hash_val += self.event_type.value << Event.ShiftEventId
+        if util.g_duplicate_devices:
+            hash_val += self.windows_id << Event.ShiftSystemId
+        hash_val += self.hardware_id << Event.ShiftDeviceId
+
+        return hash_val
+
+
+def create_inputs(count):
+    """Returns the properties of a stream of axis and button events.
+
+    :param count number of events in the stream
+    :return list of event type, identifier, value and pressed state
+    """
+    inputs = []
+    for i in range(count):
+        if i % 4 == 0:
+            inputs.append((common.InputType.JoystickButton, i % 16 + 1,
+                           None, i % 8 == 0))
+        else:
+            inputs.append((common.InputType.JoystickAxis, i % 6 + 1,
+                           (i % 200) / 100.0 - 1.0, None))
+    return inputs
+
+
+def create_lookup(event_class):
+    """Returns a dictionary containing the events of all inputs.
+
+    :param event_class the class of the events to create
+    :return dictionary mapping every possible event to a value
+    """
+    lookup = {}
+    for identifier in range(1, 17):
+        for event_type in [
+            common.InputType.JoystickAxis,
+            common.InputType.JoystickButton
+        ]:
+            lookup[event_class(event_type, identifier, 1234, 0)] = identifier
+    return lookup
+
+
+def process_stream(event_class, inputs):
+    """Returns the time needed to process a stream of events.
+
+    :param event_class the class of the events to create
+    :param inputs the properties of the events of the stream
+    :return duration in seconds
+    """
+    lookups = [create_lookup(event_class) for _ in range(3)]
+    start = time.perf_counter()
+    for event_type, identifier, value, is_pressed in inputs:
+        event = event_class(
+            event_type,
+            identifier,
+            1234,
+            0,
+            value=value,
+            is_pressed=is_pressed
+        )
+        for lookup in lookups:
+            lookup.get(event)
+        event.clone()
+    return time.perf_counter() - start
+
+
+def memory_per_event(event_class, count):
+    """Returns the memory used by a single event.
+
+    :param event_class the class of the events to create
+    :param count number of events to create for the measurement
+    :return number of bytes allocated per event
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    events = [
+        event_class(common.InputType.JoystickAxis, 1, 1234, 0, value=0.5)
+        for _ in range(count)
+    ]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "lineno"))
+    del events
+    return size / count
+
+
+def main():
+    util.g_duplicate_devices = False
+    inputs = create_inputs(50000)
+    classes = [("LegacyEvent", LegacyEvent), ("Event", Event)]
+
+    print("Stream of {:d} events, best of 5 [ms]".format(len(inputs)))
+    for name, event_class in classes:
+        duration = min(process_stream(event_class, inputs) for _ in range(5))
+        print("{:>14s} {:>10.1f}".format(name, duration * 1000))
+
+    print()
+    print("Memory per event [bytes]")
+    for name, event_class in classes:
+        print("{:>14s} {:>10.1f}".format(
+            name,
+            memory_per_event(event_class, 10000)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares finding the callbacks of an event via the per-mode lookup table
+and via the nested callback dictionaries.
+
+An EventHandler is populated with callbacks for 20 modes, 4 devices and
+150 inputs per device, with every mode inheriting from the first one. The
+callbacks matching a stream of events, one in five of which has no
+callback, are then looked up with EventHandler._matching_callbacks() and
+with a copy of the lookup performed before the per-mode table existed.
+
+    python benchmarks/event_lookup.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("GREMLIN_VJOY_DRIVER", "simulated")
+# Changing the mode stores it in the configuration, keep it away from an
+# actual installation's
+os.environ.setdefault("userprofile", tempfile.mkdtemp())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5 import QtCore
+
+from gremlin import common, util
+from gremlin.event_handler import Event, EventHandler
+
+
+mode_count = 20
+device_count = 4
+input_count = 150
+
+
+def legacy_matching_callbacks(handler, event):
+    """Returns the callbacks of an event using the nested dictionaries.
+
+    :param handler the EventHandler holding the callbacks
+    :param event the event for which to search the matching callbacks
+    :return list of all callbacks registered and valid for the event
+    """
+    callback_list = []
+    device_id = util.device_id(event)
+    if device_id in handler.callbacks:
+        callback_list = handler.callbacks[device_id].get(
+            handler.active_mode, {}
+        ).get(event, [])
+    if not handler.process_callbacks:
+        return [c[0] for c in callback_list if c[1]]
+    else:
+        return [c[0] for c in callback_list]
+
+
+def create_handler():
+    """Returns an EventHandler holding callbacks for all inputs.
+
+    :return populated EventHandler instance
+    """
+    def callback(event):
+        pass
+
+    modes = ["Mode {:d}".format(i) for i in range(mode_count)]
+    handler = EventHandler()
+    for hardware_id in range(1, device_count+1):
+        for identifier in range(1, input_count+1):
+            event = Event(
+                common.InputType.JoystickButton,
+                identifier,
+                hardware_id,
+                hardware_id - 1
+            )
+            # Only half the inputs are overridden by the child modes
+            active_modes = modes if identifier % 2 == 0 else modes[:1]
+            for mode in active_modes:
+                handler.add_callback(
+                    util.device_id(event),
+                    mode,
+                    event,
+                    callback,
+                    identifier % 3 == 0
+                )
+    handler.build_event_lookup({modes[0]: {mode: {} for mode in modes[1:]}})
+    handler.change_mode(modes[-1])
+    return handler
+
+
+def create_events(count):
+    """Returns a stream of button events.
+
+    :param count number of events in the stream
+    :return list of events
+    """
+    events = []
+    for _ in range(count):
+        hardware_id = random.randint(1, device_count)
+        # Inputs past the configured ones have no callbacks
+        identifier = random.randint(1, input_count * 5 // 4)
+        events.append(Event(
+            common.InputType.JoystickButton,
+            identifier,
+            hardware_id,
+            hardware_id - 1,
+            is_pressed=True
+        ))
+    return events
+
+
+def lookup_cost(lookup, events):
+    """Returns the time in nanoseconds needed to look up one event.
+
+    :param lookup function returning the callbacks of an event
+    :param events the events to look up
+    :return average duration of a lookup in nanoseconds
+    """
+    start = time.perf_counter()
+    for event in events:
+        lookup(event)
+    return (time.perf_counter() - start) / len(events) * 1e9
+
+
+def main():
+    app = QtCore.QCoreApplication(sys.argv)
+    util.setup_userprofile()
+    util.setup_duplicate_devices(util.device_id_unique, False)
+    handler = create_handler()
+    events = create_events(200000)
+
+    lookups = [
+        ("nested", lambda event: legacy_matching_callbacks(handler, event)),
+        ("table", handler._matching_callbacks)
+    ]
+
+    print("Callback lookup per event [ns], best of 5")
+    print("{:>8s} {:>10s} {:>10s}".format("state", *[l[0] for l in lookups]))
+    for state in [True, False]:
+        handler.process_callbacks = state
+        costs = [
+            min(lookup_cost(lookup, events) for _ in range(5))
+            for _, lookup in lookups
+        ]
+        print("{:>8s} {:>10.1f} {:>10.1f}".format(
+            "active" if state else "paused",
+            *costs
+        ))
+
+
+if __name__ == "__main__":
+    main()
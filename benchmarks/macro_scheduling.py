@@ -0,0 +1,215 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures the throughput and correctness of the macro scheduling.
+
+Macros perform actions recording their runs instead of sending input.
+Two measurements are made:
+
+* time needed to run a given number of queued runs of ten macros
+* number of lost or duplicated runs and of exclusive macros running
+  alongside others while four threads queue runs of 200 macros, four of
+  which are exclusive
+
+    python benchmarks/macro_scheduling.py
+"""
+
+import collections
+import os
+import random
+import sys
+import threading
+import time
+
+os.environ.setdefault("GREMLIN_VJOY_DRIVER", "simulated")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gremlin import macro
+
+
+class RunRecorder:
+
+    """Records the macro runs which started and ended."""
+
+    def __init__(self):
+        """Creates a new instance."""
+        self.lock = threading.Lock()
+        self.started = collections.Counter()
+        self.ended = 0
+        self.running = 0
+        self.exclusive_running = 0
+        self.violations = 0
+
+    def start(self, macro_id, exclusive):
+        with self.lock:
+            self.started[macro_id] += 1
+            self.running += 1
+            if exclusive:
+                self.exclusive_running += 1
+            if self.exclusive_running > 0 and self.running > 1:
+                self.violations += 1
+
+    def end(self, exclusive):
+        with self.lock:
+            self.ended += 1
+            self.running -= 1
+            if exclusive:
+                self.exclusive_running -= 1
+
+
+class RecordAction(macro.AbstractAction):
+
+    """Macro action reporting the start or end of a run."""
+
+    def __init__(self, recorder, macro_id, exclusive, is_start):
+        self.recorder = recorder
+        self.macro_id = macro_id
+        self.exclusive = exclusive
+        self.is_start = is_start
+
+    def __call__(self):
+        if self.is_start:
+            self.recorder.start(self.macro_id, self.exclusive)
+        else:
+            self.recorder.end(self.exclusive)
+
+
+class CountAction(macro.AbstractAction):
+
+    """Macro action reporting a complete run."""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def __call__(self):
+        with self.recorder.lock:
+            self.recorder.ended += 1
+
+
+def create_macros(recorder, count, exclusive_count, pause):
+    """Returns macros recording their runs.
+
+    :param recorder the RunRecorder receiving the reports of the macros
+    :param count number of macros to create
+    :param exclusive_count number of the macros which are exclusive
+    :param pause duration in seconds between the start and end of a run
+    :return list of macros
+    """
+    macros = []
+    for i in range(count):
+        exclusive = i < exclusive_count
+        new_macro = macro.Macro()
+        new_macro.exclusive = exclusive
+        new_macro.add_action(RecordAction(recorder, i, exclusive, True))
+        new_macro.pause(pause)
+        new_macro.add_action(RecordAction(recorder, i, exclusive, False))
+        macros.append(new_macro)
+    return macros
+
+
+def wait_for_runs(recorder, count, timeout):
+    """Waits until a number of runs ended.
+
+    :param recorder the RunRecorder receiving the reports of the macros
+    :param count number of runs to wait for
+    :param timeout maximum time in seconds to wait
+    """
+    deadline = time.perf_counter() + timeout
+    while recorder.ended < count and time.perf_counter() < deadline:
+        time.sleep(0.001)
+
+
+def drain_time(run_count):
+    """Returns the time needed to run queued runs of ten macros.
+
+    :param run_count number of runs to queue
+    :return duration in seconds until all runs ended
+    """
+    recorder = RunRecorder()
+    macros = []
+    for _ in range(10):
+        new_macro = macro.Macro()
+        new_macro.add_action(CountAction(recorder))
+        macros.append(new_macro)
+    manager = macro.MacroManager()
+    manager.start()
+    start = time.perf_counter()
+    for i in range(run_count):
+        manager.queue_macro(macros[i % len(macros)])
+    wait_for_runs(recorder, run_count, 60.0)
+    duration = time.perf_counter() - start
+    manager.stop()
+    return duration
+
+
+def stress(thread_count, runs_per_thread):
+    """Queues runs from several threads and checks their execution.
+
+    :param thread_count number of threads queuing runs
+    :param runs_per_thread number of runs queued by each thread
+    :return number of lost runs, duplicated runs and exclusivity
+        violations
+    """
+    recorder = RunRecorder()
+    macros = create_macros(recorder, 200, 4, 0.001)
+    queued = collections.Counter()
+    queued_lock = threading.Lock()
+    manager = macro.MacroManager()
+    manager.start()
+
+    def queue_runs():
+        for _ in range(runs_per_thread):
+            index = random.randrange(len(macros))
+            with queued_lock:
+                queued[index] += 1
+            manager.queue_macro(macros[index])
+
+    threads = [threading.Thread(target=queue_runs) for _ in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wait_for_runs(recorder, thread_count * runs_per_thread, 120.0)
+    manager.stop()
+
+    lost = sum(
+        max(0, count - recorder.started[index])
+        for index, count in queued.items()
+    )
+    duplicated = sum(
+        max(0, count - queued[index])
+        for index, count in recorder.started.items()
+    )
+    return lost, duplicated, recorder.violations
+
+
+def main():
+    print("Time to run queued runs of 10 macros [s]")
+    for run_count in [2000, 8000]:
+        print("{:>8d} {:>10.2f}".format(run_count, drain_time(run_count)))
+
+    print()
+    print("4 threads queuing 5000 runs of 200 macros, 4 exclusive")
+    lost, duplicated, violations = stress(4, 1250)
+    print("{:>12s} {:>8d}".format("lost", lost))
+    print("{:>12s} {:>8d}".format("duplicated", duplicated))
+    print("{:>12s} {:>8d}".format("violations", violations))
+
+
+if __name__ == "__main__":
+    main()
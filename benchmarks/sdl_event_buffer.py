@@ -0,0 +1,155 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares draining SDL events via SDLEventBuffer and sdl2.ext.get_events().
+
+Joystick axis events are pushed into the SDL queue with SDL_PushEvent, so
+no joystick hardware is required. Two measurements are made:
+
+* drain cost for different numbers of queued events
+* CPU time needed to keep up with 10000 events per second, pushed in
+  batches once every millisecond, as the event loop would see them
+
+    python benchmarks/sdl_event_buffer.py
+"""
+
+import ctypes
+import os
+import sys
+import time
+
+os.environ.setdefault("GREMLIN_VJOY_DRIVER", "simulated")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sdl2
+import sdl2.ext
+
+from gremlin.event_handler import SDLEventBuffer
+
+
+def push_events(count):
+    """Places axis motion events into the SDL queue.
+
+    :param count number of events to push
+    """
+    event = sdl2.SDL_Event()
+    event.type = sdl2.SDL_JOYAXISMOTION
+    for i in range(count):
+        event.jaxis.which = 0
+        event.jaxis.axis = i % 4
+        event.jaxis.value = i % 32767
+        sdl2.SDL_PushEvent(ctypes.byref(event))
+
+
+def consume_get_events():
+    """Drains the queue with sdl2.ext.get_events().
+
+    :return number of events processed
+    """
+    count = 0
+    for event in sdl2.ext.get_events():
+        if event.type == sdl2.SDL_JOYAXISMOTION:
+            count += event.jaxis.value >= 0
+    return count
+
+
+def make_consume_buffer():
+    """Returns a function draining the queue with an SDLEventBuffer.
+
+    :return function draining the queue, returning the number of events
+    """
+    event_buffer = SDLEventBuffer()
+
+    def consume():
+        count = 0
+        drained = event_buffer.size
+        while drained == event_buffer.size:
+            drained = event_buffer.drain()
+            for event in event_buffer:
+                if event.type == sdl2.SDL_JOYAXISMOTION:
+                    count += event.jaxis.value >= 0
+        return count
+    return consume
+
+
+def drain_cost(consume, batch_size, repetitions):
+    """Returns the time in microseconds needed to drain one batch.
+
+    :param consume function draining the queue
+    :param batch_size number of events queued before each drain
+    :param repetitions number of batches to measure
+    :return average duration of a drain in microseconds
+    """
+    total = 0.0
+    for _ in range(repetitions):
+        push_events(batch_size)
+        start = time.perf_counter()
+        processed = consume()
+        total += time.perf_counter() - start
+        assert processed == batch_size
+    return total / repetitions * 1e6
+
+
+def paced_cpu_time(consume, rate, duration):
+    """Returns the CPU time spent draining events arriving at a fixed rate.
+
+    :param consume function draining the queue
+    :param rate number of events per second
+    :param duration length of the measurement in seconds
+    :return CPU time spent draining in milliseconds per second
+    """
+    per_tick = rate // 1000
+    cpu = 0.0
+    for _ in range(int(duration * 1000)):
+        push_events(per_tick)
+        start = time.process_time()
+        consume()
+        cpu += time.process_time() - start
+        time.sleep(0.001)
+    return cpu / duration * 1000
+
+
+def main():
+    sdl2.SDL_Init(sdl2.SDL_INIT_JOYSTICK)
+    consumers = [
+        ("get_events()", consume_get_events),
+        ("SDLEventBuffer", make_consume_buffer())
+    ]
+
+    print("Drain cost per batch [us]")
+    print("{:>8s} {:>14s} {:>14s}".format("events", *[c[0] for c in consumers]))
+    for batch_size in [1, 10, 100, 1000]:
+        costs = [
+            drain_cost(consume, batch_size, max(20, 20000 // batch_size))
+            for _, consume in consumers
+        ]
+        print("{:>8d} {:>14.1f} {:>14.1f}".format(batch_size, *costs))
+
+    print()
+    print("CPU time at 10000 events/s [ms/s]")
+    for name, consume in consumers:
+        print("{:>23s} {:>14.1f}".format(
+            name,
+            paced_cpu_time(consume, 10000, 2.0)
+        ))
+
+    sdl2.SDL_Quit()
+
+
+if __name__ == "__main__":
+    main()
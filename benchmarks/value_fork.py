@@ -0,0 +1,124 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares copying action values via copy.deepcopy() and Value.fork().
+
+InputItemCallback copies the value of an event once for the callback and
+once for every container it runs. This is reproduced for an input feeding
+four containers, using values of axes, buttons and hats. The previous,
+unslotted Value class is reproduced as LegacyValue, as it was copied with
+copy.deepcopy().
+
+    python benchmarks/value_fork.py
+"""
+
+import copy
+import os
+import sys
+import time
+
+os.environ.setdefault("GREMLIN_VJOY_DRIVER", "simulated")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gremlin.actions import Value
+
+
+# Number of containers an input's value is handed to
+container_count = 4
+
+
+class LegacyValue:
+
+    """Value without slots, as copied before fork() existed."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._current = raw
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @property
+    def current(self):
+        return self._current
+
+    @current.setter
+    def current(self, current):
+        self._current = current
+
+
+def deepcopy_values(value):
+    """Copies a value as done by InputItemCallback using deepcopy.
+
+    :param value the value of the event
+    """
+    shared_value = copy.deepcopy(value)
+    for _ in range(container_count):
+        copy.deepcopy(shared_value)
+
+
+def fork_values(value):
+    """Copies a value as done by InputItemCallback using fork.
+
+    :param value the value of the event
+    """
+    shared_value = value.fork()
+    for _ in range(container_count):
+        shared_value.fork()
+
+
+def copy_cost(copy_fn, value, repetitions):
+    """Returns the time in microseconds spent copying the value of an event.
+
+    :param copy_fn function copying the value for all containers
+    :param value the value of the event
+    :param repetitions number of events to measure
+    :return average duration per event in microseconds
+    """
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        copy_fn(value)
+    return (time.perf_counter() - start) / repetitions * 1e6
+
+
+def main():
+    inputs = [("axis", 0.25), ("button", True), ("hat", (1, -1))]
+    methods = [
+        ("deepcopy legacy", deepcopy_values, LegacyValue),
+        ("deepcopy", deepcopy_values, Value),
+        ("fork", fork_values, Value)
+    ]
+
+    print("Value copies per event with {:d} containers [us]".format(
+        container_count
+    ))
+    print("{:>8s} {:>16s} {:>16s} {:>16s}".format(
+        "input",
+        *[m[0] for m in methods]
+    ))
+    for name, raw in inputs:
+        costs = [
+            copy_cost(copy_fn, value_class(raw), 50000)
+            for _, copy_fn, value_class in methods
+        ]
+        print("{:>8s} {:>16.2f} {:>16.2f} {:>16.2f}".format(name, *costs))
+
+
+if __name__ == "__main__":
+    main()
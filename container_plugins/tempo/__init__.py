@@ -15,7 +15,6 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import copy
 import logging
 import threading
 import time
@@ -240,7 +239,7 @@ class TempoContainerFunctor(gremlin.base_classes.AbstractFunctor):
 
         # Copy state when input is pressed
         if isinstance(value.current, bool) and value.current:
-            self.value_press = copy.deepcopy(value)
+            self.value_press = value.fork()
             self.event_press = event.clone()
 
         # Execute tempo logic
@@ -0,0 +1,123 @@
+"""
+Runs a profile against a simulated joystick.
+
+Neither joystick hardware nor the vJoy driver are needed, the script can be
+run on any platform with PyQt5 and the SDL2 library installed:
+
+    python examples/simulated_devices.py
+
+The profile imports the custom module simulated_module.py and is started
+by the CodeRunner, exactly as when a profile is activated in the user
+interface. A short script of input events is replayed after which the
+resulting vJoy state and the recorded key presses are printed.
+"""
+
+import os
+import sys
+import tempfile
+
+# Select the simulated vJoy driver before the vjoy module is imported
+os.environ.setdefault("GREMLIN_VJOY_DRIVER", "simulated")
+# Keep the configuration away from an actual installation's
+os.environ.setdefault("userprofile", tempfile.mkdtemp())
+# Gremlin loads its data files and templates relative to the working
+# directory
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(root_path)
+sys.path.insert(0, root_path)
+# Custom modules are imported from the folder of the profile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PyQt5 import QtCore
+
+import gremlin
+from gremlin import code_generator, code_runner, event_handler, macro, \
+    profile, simulation
+from gremlin.common import InputType
+from vjoy import vjoy_interface
+
+
+gremlin.util.setup_userprofile()
+# All simulated joysticks are distinct devices
+gremlin.util.setup_duplicate_devices(gremlin.util.device_id_unique, False)
+# The generated code is imported from the user's profile folder
+sys.path.insert(0, gremlin.util.userprofile_path())
+
+stick = simulation.SimulatedJoystick(
+    name="Simulated Stick",
+    hardware_id=1,
+    windows_id=0,
+    axis_count=2,
+    button_count=8,
+    hat_count=1
+)
+
+
+def create_profile():
+    """Returns a profile containing the simulated joystick.
+
+    :return profile running the simulated_module custom module
+    """
+    new_profile = profile.Profile()
+    device = profile.Device(new_profile)
+    device.name = stick.name
+    device.hardware_id = stick.hardware_id
+    device.windows_id = stick.windows_id
+    device.type = profile.DeviceType.Joystick
+    device.ensure_mode_exists("Default")
+    new_profile.devices[gremlin.util.device_id(device)] = device
+    new_profile.imports = ["simulated_module"]
+    return new_profile
+
+
+def main():
+    app = QtCore.QCoreApplication(sys.argv)
+
+    # Create the listener with the simulated joystick before anything else
+    # creates it with SDL as its event source
+    source = simulation.ScriptedEventSource([stick])
+    listener = event_handler.EventListener(source)
+
+    key_output = macro.win32api
+    if hasattr(key_output, "record_history"):
+        key_output.record_history = True
+
+    # Generate the profile's code and run it
+    sim_profile = create_profile()
+    code_generator.CodeGenerator(sim_profile).write_code(
+        os.path.join(gremlin.util.userprofile_path(), "gremlin_code.py")
+    )
+    runner = code_runner.CodeRunner()
+    runner.start(
+        sim_profile.build_inheritance_tree(),
+        sim_profile.settings,
+        "Default",
+        sim_profile
+    )
+
+    source.play([
+        simulation.ScriptEntry(0.00, 0, InputType.JoystickAxis, 1, -0.5),
+        simulation.ScriptEntry(0.05, 0, InputType.JoystickAxis, 1, 0.25),
+        simulation.ScriptEntry(0.10, 0, InputType.JoystickButton, 1, True),
+        simulation.ScriptEntry(0.15, 0, InputType.JoystickButton, 2, True),
+        simulation.ScriptEntry(0.20, 0, InputType.JoystickButton, 2, False),
+    ])
+    source.wait()
+
+    # Give the dispatcher and the macro time to process all events
+    deadline = QtCore.QDeadlineTimer(500)
+    while not deadline.hasExpired():
+        app.processEvents(QtCore.QEventLoop.AllEvents, 50)
+
+    device = vjoy_interface.VJoyInterface.devices[1]
+    print("vJoy 1 axis 1: {:#x}".format(device.axes[0x30]))
+    print("vJoy 1 button 1: {}".format(device.buttons[1]))
+    if hasattr(key_output, "history"):
+        print("Recorded key events: {}".format(len(key_output.history)))
+
+    runner.stop()
+    listener.terminate()
+
+
+if __name__ == "__main__":
+    main()
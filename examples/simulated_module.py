@@ -0,0 +1,38 @@
+"""
+Custom module used by simulated_devices.py.
+
+The first axis of the simulated joystick is mapped to the first vJoy axis,
+its first button to the first vJoy button and pressing its second button
+sends a macro.
+"""
+
+import gremlin
+from gremlin import macro
+
+# The simulated joystick has hardware id 1, which is its device id as all
+# simulated joysticks are distinct devices
+stick = gremlin.input_devices.JoystickDecorator(
+    "Simulated Stick",
+    1,
+    "Default"
+)
+
+burst = macro.Macro()
+burst.tap("space")
+burst.tap("e")
+
+
+@stick.axis(1)
+def roll(event, vjoy):
+    vjoy[1].axis(1).value = event.value
+
+
+@stick.button(1)
+def fire(event, vjoy, joy):
+    vjoy[1].button(1).is_pressed = joy["Simulated Stick"].button(1).is_pressed
+
+
+@stick.button(2)
+def special(event):
+    if event.is_pressed:
+        macro.MacroManager().queue_macro(burst)
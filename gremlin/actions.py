@@ -22,30 +22,34 @@ import logging
 from . import base_classes, common, fsm, input_devices, macro, util
 
 
-def smart_all(conditions):
+def smart_all(conditions, event, value):
     """Returns True if all conditions are True, False otherwise.
 
     Employs short circuiting in order to prevent unnecessary evalutions.
 
     :param conditions the conditions to check
+    :param event the event passed to each condition
+    :param value the value passed to each condition
     :return True if all conditions are True, False otherwise
     """
     for condition in conditions:
-        if not condition():
+        if not condition(event, value):
             return False
     return True
 
 
-def smart_any(conditions):
+def smart_any(conditions, event, value):
     """Returns True if any conditions is True, False if none is True.
 
     Employs short circuiting in order to prevent unnecessary evalutions.
 
     :param conditions the conditions to check
+    :param event the event passed to each condition
+    :param value the value passed to each condition
     :return True if at least one condition is True, False otherwise
     """
     for condition in conditions:
-        if condition():
+        if condition(event, value):
             return True
     return False
 
@@ -54,6 +58,8 @@ class Value:
 
     """Represents an input value, keeping track of raw and "seen" value."""
 
+    __slots__ = ["_raw", "_current"]
+
     def __init__(self, raw):
         """Creates a new value and initializes it.
 
@@ -86,6 +92,19 @@ class Value:
         """
         self._current = current
 
+    def fork(self):
+        """Returns an independent copy of this value.
+
+        Both the raw and current value are immutable types, as such
+        modifying the copy's current value leaves this instance unchanged.
+
+        :return copy of this value
+        """
+        value = Value.__new__(Value)
+        value._raw = self._raw
+        value._current = self._current
+        return value
+
 
 class ActivationCondition:
 
@@ -113,7 +132,22 @@ class ActivationCondition:
         :return True if all conditions are satisfied, False otherwise
         """
         return ActivationCondition.rule_function[self._rule](
-            [partial(c, event, value) for c in self._conditions]
+            self._conditions,
+            event,
+            value
+        )
+
+    def compile(self):
+        """Returns a function evaluating this condition.
+
+        The returned function behaves like process_event but has the rule
+        and conditions bound to it.
+
+        :return function evaluating the condition for an event and value
+        """
+        return partial(
+            ActivationCondition.rule_function[self._rule],
+            tuple(self._conditions)
         )
 
 
@@ -195,6 +229,7 @@ class JoystickCondition(AbstractCondition):
         self.input_type = condition.input_type
         self.input_id = condition.input_id
         self.condition = condition
+        self._input = None
 
     def __call__(self, event, value):
         """Evaluates the condition using the condition and provided data.
@@ -203,11 +238,16 @@ class JoystickCondition(AbstractCondition):
         :param value the possibly modified value
         :return True if the condition is satisfied, False otherwise
         """
-        joy = input_devices.JoystickProxy()[self.windows_id]
+        # The input's state is read from the state mirror, hence the input
+        # object only needs to be retrieved once
+        if self._input is None:
+            self._input = self._get_input()
+            if self._input is None:
+                return False
 
         if self.input_type == common.InputType.JoystickAxis:
             in_range = self.condition.range[0] <= \
-                       joy.axis(self.input_id).value <= \
+                       self._input.value <= \
                        self.condition.range[1]
 
             if self.comparison in ["inside", "outside"]:
@@ -216,17 +256,31 @@ class JoystickCondition(AbstractCondition):
                 return False
         elif self.input_type == common.InputType.JoystickButton:
             if self.comparison == "pressed":
-                return joy.button(self.input_id).is_pressed
+                return self._input.is_pressed
             else:
-                return not joy.button(self.input_id).is_pressed
-        elif self.input_type == common.InputType.JoystickHat:
-            return joy.hat(self.input_id).direction == \
+                return not self._input.is_pressed
+        else:
+            return self._input.direction == \
                    util.hat_direction_to_tuple(self.comparison)
+
+    def _get_input(self):
+        """Returns the joystick input object this condition checks.
+
+        :return input object providing the input's state, None if the
+            input type is invalid
+        """
+        joy = input_devices.JoystickProxy()[self.windows_id]
+        if self.input_type == common.InputType.JoystickAxis:
+            return joy.axis(self.input_id)
+        elif self.input_type == common.InputType.JoystickButton:
+            return joy.button(self.input_id)
+        elif self.input_type == common.InputType.JoystickHat:
+            return joy.hat(self.input_id)
         else:
             logging.getLogger("system").warning(
                 "Invalid input_type {} received".format(self.input_type)
             )
-            return False
+            return None
 
 
 class InputActionCondition(AbstractCondition):
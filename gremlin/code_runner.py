@@ -16,11 +16,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from abc import abstractmethod, ABCMeta
-import copy
+import functools
 import time
 
+from PyQt5 import QtCore
+
 import gremlin
-from gremlin import event_handler, input_devices, joystick_handling, macro, util
+from gremlin import config, event_handler, input_devices, joystick_handling, \
+    latency, macro, util
+from vjoy.vjoy import FlushTimer, OutputWriter, VJoy
 import action_plugins.remap
 
 
@@ -38,6 +42,7 @@ class CodeRunner:
         self._inheritance_tree = None
         self._vjoy_curves = VJoyCurves()
         self._merge_axes = []
+        self._flush_timer = None
         self._running = False
 
     def is_running(self):
@@ -158,31 +163,42 @@ class CodeRunner:
                     False
                 )
 
-            # Create vJoy response curve setups
+            # Create vJoy response curve setups, these have to be updated
+            # by the thread changing the mode
             self._vjoy_curves.profile_data = profile.vjoy_devices
             self.event_handler.mode_changed.connect(
-                self._vjoy_curves.mode_changed
+                self._vjoy_curves.mode_changed,
+                QtCore.Qt.DirectConnection
             )
 
             # Use inheritance to build input action lookup table
             self.event_handler.build_event_lookup(inheritance_tree)
 
+            # Select how vJoy output is written to the driver
+            if config.Configuration().vjoy_output_thread:
+                VJoy.output_writer = OutputWriter()
+                VJoy.output_writer.start()
+            else:
+                VJoy.batch_output = config.Configuration().batch_vjoy_output
+
             # Set vJoy axis default values
             for vid, data in settings.vjoy_initial_values.items():
                 vjoy_proxy = joystick_handling.VJoyProxy()[vid]
                 for aid, value in data.items():
                     vjoy_proxy.axis(aid).set_absolute_value(value)
 
-            # Connect signals
-            evt_listener = event_handler.EventListener()
+            # Connect event processing
+            dispatcher = event_handler.EventDispatcher()
             kb = input_devices.Keyboard()
-            evt_listener.keyboard_event.connect(
-                self.event_handler.process_event
-            )
-            evt_listener.joystick_event.connect(
-                self.event_handler.process_event
-            )
-            evt_listener.keyboard_event.connect(kb.keyboard_event)
+            dispatcher.connect(self.event_handler.process_event)
+            dispatcher.connect(kb.keyboard_event)
+            if VJoy.batch_output:
+                dispatcher.connect_batch_end(VJoy.flush_all)
+                self._flush_timer = FlushTimer(
+                    config.Configuration().vjoy_flush_interval
+                )
+                self._flush_timer.start()
+            dispatcher.start(config.Configuration().threaded_event_dispatch)
 
             input_devices.periodic_registry.start()
             macro.MacroManager().start()
@@ -200,11 +216,15 @@ class CodeRunner:
         """Stops listening to events and unloads all callbacks."""
         # Disconnect all signals
         if self._running:
-            evt_lst = event_handler.EventListener()
+            dispatcher = event_handler.EventDispatcher()
             kb = input_devices.Keyboard()
-            evt_lst.keyboard_event.disconnect(self.event_handler.process_event)
-            evt_lst.joystick_event.disconnect(self.event_handler.process_event)
-            evt_lst.keyboard_event.disconnect(kb.keyboard_event)
+            dispatcher.stop()
+            dispatcher.disconnect(self.event_handler.process_event)
+            dispatcher.disconnect(kb.keyboard_event)
+            if self._flush_timer is not None:
+                dispatcher.disconnect_batch_end(VJoy.flush_all)
+                self._flush_timer.stop()
+                self._flush_timer = None
             self.event_handler.mode_changed.disconnect(
                 self._vjoy_curves.mode_changed
             )
@@ -220,8 +240,14 @@ class CodeRunner:
 
         macro.MacroManager().stop()
 
-        # Remove all claims on VJoy devices
+        # Write all submitted output before the vJoy devices are released
+        if VJoy.output_writer is not None:
+            VJoy.output_writer.stop()
+            VJoy.output_writer = None
+
+        # Remove all claims on VJoy devices, writing any pending output
         joystick_handling.VJoyProxy.reset()
+        VJoy.batch_output = False
 
     def _reset_state(self):
         """Resets all states to their default values."""
@@ -237,7 +263,25 @@ class VJoyCurves:
 
     def __init__(self):
         """Creates a new instance"""
-        self.profile_data = None
+        self._profile_data = None
+        self._lookup_tables = {}
+
+    @property
+    def profile_data(self):
+        """Returns the vJoy device data of the profile.
+
+        :return vJoy device data of the profile
+        """
+        return self._profile_data
+
+    @profile_data.setter
+    def profile_data(self, value):
+        """Sets the vJoy device data of the profile.
+
+        :param value the vJoy device data of the profile
+        """
+        self._profile_data = value
+        self._lookup_tables = {}
 
     def mode_changed(self, mode_name):
         """Called when the mode changes and updates vJoy response curves.
@@ -247,6 +291,7 @@ class VJoyCurves:
         if not self.profile_data:
             return
 
+        precompute = config.Configuration().precompute_response_curves
         vjoy = gremlin.joystick_handling.VJoyProxy()
         for vid, device in self.profile_data.items():
             if mode_name in device.modes:
@@ -255,12 +300,22 @@ class VJoyCurves:
                 ].items():
                     if len(data.containers) > 0 and vjoy[vid].is_axis_valid(aid):
                         action = data.containers[0].action_sets[0][0]
-                        vjoy[vid].axis(aid).set_deadzone(*action.deadzone)
-                        vjoy[vid].axis(aid).set_response_curve(
+                        axis = vjoy[vid].axis(aid)
+                        axis.set_deadzone(*action.deadzone)
+                        axis.set_response_curve(
                             action.mapping_type,
                             action.control_points
                         )
 
+                        # Tables are built once per mode as building them
+                        # is expensive
+                        if precompute:
+                            key = (vid, aid, mode_name)
+                            if key not in self._lookup_tables:
+                                self._lookup_tables[key] = \
+                                    axis.create_lookup_table()
+                            axis.set_lookup_table(self._lookup_tables[key])
+
 
 class MergeAxis:
 
@@ -355,15 +410,53 @@ class InputItemCallback:
 
         # Containers representing a virtual button get their individual
         # value instance, all others share one to propagate changes across
-        shared_value = copy.deepcopy(value)
+        shared_value = value.fork()
 
         for graph in self.execution_graphs:
             if graph.is_virtual_button:
-                graph.process_event(event, copy.deepcopy(value))
+                graph.process_event(event, value.fork())
             else:
                 graph.process_event(event, shared_value)
 
 
+def _compile_node(fn, on_true, on_false):
+    """Returns a function executing a single node of an execution graph.
+
+    The result of the node's function is compared against True and False
+    in the same way the transition lookup of the interpreter does, i.e.
+    results which are neither end the execution of the graph.
+
+    :param fn the function executed by the node
+    :param on_true function of the node to execute on success, None if
+        execution ends
+    :param on_false function of the node to execute on failure, None if
+        execution ends
+    :return function executing the node and its successors
+    """
+    if on_true is None and on_false is None:
+        return fn
+    elif on_true is on_false:
+        def node(event, value):
+            if fn(event, value) in (True, False):
+                on_true(event, value)
+    elif on_false is None:
+        def node(event, value):
+            if fn(event, value) == True:
+                on_true(event, value)
+    elif on_true is None:
+        def node(event, value):
+            if fn(event, value) == False:
+                on_false(event, value)
+    else:
+        def node(event, value):
+            result = fn(event, value)
+            if result == True:
+                on_true(event, value)
+            elif result == False:
+                on_false(event, value)
+    return node
+
+
 class AbstractExecutionGraph(metaclass=ABCMeta):
 
     """Abstract base class for all execution graph type classes.
@@ -388,6 +481,11 @@ class AbstractExecutionGraph(metaclass=ABCMeta):
 
         self._build_graph(instance)
 
+        if config.Configuration().interpret_execution_graphs:
+            self._execute = self._interpret
+        else:
+            self._execute = self._compile()
+
     def process_event(self, event, value):
         """Executes the graph with the provided data.
 
@@ -397,7 +495,22 @@ class AbstractExecutionGraph(metaclass=ABCMeta):
         # Processing an event twice is needed when a virtual axis button has
         # "jumped" over it's activation region without triggering it. Once
         # this is detected the "press" event is sent and the second run ensures
-        # a "release" event is sent.
+        # a "release" event is sent. The second run is deferred such that
+        # other inputs are processed in the meantime.
+        if self._execute(event, value):
+            event_handler.EventDispatcher().defer(
+                event,
+                0.05,
+                functools.partial(self.process_event, event, value)
+            )
+
+    def _interpret(self, event, value):
+        """Executes the graph by following the transitions node by node.
+
+        :param event the raw event that caused the execution of this graph
+        :param value the possibly modified value extracted from the event
+        :return True if the graph has to be processed again, False otherwise
+        """
         process_again = False
 
         while self.current_index is not None:
@@ -413,9 +526,59 @@ class AbstractExecutionGraph(metaclass=ABCMeta):
             )
         self.current_index = 0
 
-        if process_again:
-            time.sleep(0.05)
-            self.process_event(event, value)
+        return process_again
+
+    def _compile(self):
+        """Compiles the graph into a chain of functions.
+
+        Each node is turned into a function which executes the node's
+        functor and then directly calls the function of the node its
+        transitions lead to. Activation conditions are replaced by functions
+        evaluating their conditions directly.
+
+        :return function executing the graph, returning True if the graph
+            has to be processed again
+        """
+        # Forced activations can only be detected in compiled graphs if the
+        # axis button is the first node, as it is always executed
+        for i, functor in enumerate(self.functors):
+            if i > 0 and isinstance(functor, gremlin.actions.AxisButton):
+                return self._interpret
+        if len(self.functors) == 0:
+            return lambda event, value: False
+
+        # Transitions only ever lead to later nodes, thus creating the
+        # functions in reverse order ensures all successors exist
+        nodes = [None] * len(self.functors)
+        for i in reversed(range(len(self.functors))):
+            functor = self.functors[i]
+            if isinstance(functor, gremlin.actions.ActivationCondition):
+                fn = functor.compile()
+            else:
+                fn = functor.process_event
+
+            on_true = self.transitions.get((i, True))
+            on_false = self.transitions.get((i, False))
+            assert on_true is None or on_true > i
+            assert on_false is None or on_false > i
+            nodes[i] = _compile_node(
+                fn,
+                None if on_true is None else nodes[on_true],
+                None if on_false is None else nodes[on_false]
+            )
+
+        start = nodes[0]
+        if isinstance(self.functors[0], gremlin.actions.AxisButton):
+            axis_button = self.functors[0]
+
+            def execute(event, value):
+                start(event, value)
+                return axis_button.forced_activation
+        else:
+            def execute(event, value):
+                start(event, value)
+                return False
+        return execute
 
     @abstractmethod
     def _build_graph(self, instance):
@@ -511,6 +674,30 @@ class ContainerExecutionGraph(AbstractExecutionGraph):
         assert isinstance(container, gremlin.base_classes.AbstractContainer)
         super().__init__(container)
         self.is_virtual_button = container.virtual_button is not None
+        self.label = "{} {:d}".format(
+            container.name,
+            container.parent.containers.index(container) + 1
+        )
+        self._latency = latency.LatencyRecorder()
+
+    def process_event(self, event, value):
+        """Executes the graph with the provided data.
+
+        :param event the raw event that caused the execution of this graph
+        :param value the possibly modified value extracted from the event
+        """
+        if not self._latency.enabled:
+            super().process_event(event, value)
+            return
+
+        start = time.perf_counter()
+        super().process_event(event, value)
+        self._latency.record(
+            latency.Stage.Container,
+            event,
+            time.perf_counter() - start,
+            self.label
+        )
 
     def _build_graph(self, container):
         """Builds the graph structure based on the container's content.
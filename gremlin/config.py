@@ -16,8 +16,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import json
-import time
+import logging
 import os
+import threading
+import time
 
 from PyQt5 import QtCore
 
@@ -27,39 +29,51 @@ from . import common, util
 @common.SingletonDecorator
 class Configuration:
 
-    """Responsible for loading and saving configuration data."""
+    """Responsible for loading and saving configuration data.
+
+    Changes are written to disk by a background thread which collects all
+    changes made within a short time into a single write. Mutating the
+    configuration therefore only modifies data in memory. All mutations
+    of the data hold the data lock, allowing the writer to take a
+    consistent snapshot of it.
+    """
+
+    # Delay in seconds between a change and it being written to disk
+    write_delay = 0.5
 
     def __init__(self):
         """Creates a new instance, loading the current configuration."""
         self._data = {}
-        self._last_reload = None
+        self._data_lock = threading.RLock()
+        self._modified = False
+        self._save_requested = threading.Event()
+        self._write_lock = threading.Lock()
+        self._written_signature = None
+        self._writer = None
         self.reload()
 
-        self.watcher = QtCore.QFileSystemWatcher([
-            os.path.join(util.userprofile_path(), "config.json")
-        ])
-        self.watcher.fileChanged.connect(self.reload)
+        self.watcher = QtCore.QFileSystemWatcher([self._fname()])
+        self.watcher.fileChanged.connect(self._file_changed)
 
     def reload(self):
-        """Loads the configuration file's content."""
-        if self._last_reload is not None and \
-                time.time() - self._last_reload < 1:
-            return
+        """Loads the configuration file's content.
 
-        fname = os.path.join(util.userprofile_path(), "config.json")
+        Changes which have not been written to disk yet are discarded.
+        """
+        fname = self._fname()
         # Attempt to load the configuration file if this fails set
         # default empty values.
-        load_successful = False
+        data = None
         if os.path.isfile(fname):
             with open(fname) as hdl:
                 try:
                     decoder = json.JSONDecoder()
-                    self._data = decoder.decode(hdl.read())
-                    load_successful = True
+                    data = decoder.decode(hdl.read())
                 except ValueError:
                     pass
+        load_successful = data is not None
         if not load_successful:
-            self._data = {
+            data = {
                 "calibration": {},
                 "profiles": {},
                 "last_mode": {}
@@ -67,23 +81,126 @@ class Configuration:
 
         # Ensure required fields are present and if they are missing
         # add empty ones.
+        fields_missing = False
         for field in ["calibration", "profiles", "last_mode"]:
-            if field not in self._data:
-                self._data[field] = {}
+            if field not in data:
+                data[field] = {}
+                fields_missing = True
 
-        # Save all data
-        self._last_reload = time.time()
-        self.save()
+        with self._data_lock:
+            self._data = data
+            self._modified = False
+
+        # Only write the data back if it had to be modified
+        if not load_successful or fields_missing:
+            self.save()
 
     def save(self):
-        """Writes the configuration file to disk."""
-        fname = os.path.join(util.userprofile_path(), "config.json")
-        with open(fname, "w") as hdl:
-            encoder = json.JSONEncoder(
-                sort_keys=True,
-                indent=4
-            )
-            hdl.write(encoder.encode(self._data))
+        """Requests the configuration to be written to disk.
+
+        The write is performed asynchronously after a short delay.
+        """
+        with self._data_lock:
+            self._modified = True
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop,
+                    daemon=True
+                )
+                self._writer.start()
+        self._save_requested.set()
+
+    def flush(self):
+        """Writes pending changes to disk immediately.
+
+        Returns once all changes made before the call, including those
+        currently being written by the background thread, are on disk.
+        """
+        self._write()
+
+    def _fname(self):
+        """Returns the path to the configuration file.
+
+        :return path to the configuration file
+        """
+        return os.path.join(util.userprofile_path(), "config.json")
+
+    def _file_signature(self, fname):
+        """Returns information identifying a specific version of a file.
+
+        :param fname path to the file
+        :return tuple of modification time and size of the file, None if
+            the file does not exist
+        """
+        try:
+            stat = os.stat(fname)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _file_changed(self, fname):
+        """Reloads the configuration if it was modified by someone else.
+
+        If changes are pending the in-memory configuration is kept and
+        overwrites the external modification once it is written.
+
+        :param fname path to the file that changed
+        """
+        # Replacing the file removes it from the watcher
+        if fname not in self.watcher.files() and os.path.isfile(fname):
+            self.watcher.addPath(fname)
+
+        if self._file_signature(fname) == self._written_signature:
+            return
+
+        with self._data_lock:
+            if self._modified:
+                logging.getLogger("system").warning(
+                    "Configuration file modified externally while changes "
+                    "are pending, keeping the current configuration"
+                )
+            else:
+                self.reload()
+
+    def _write_loop(self):
+        """Writes the configuration to disk whenever changes occur."""
+        while True:
+            self._save_requested.wait()
+            # Wait for further changes such that they are written together
+            time.sleep(self.write_delay)
+            self._save_requested.clear()
+            self._write()
+
+    def _write(self):
+        """Atomically writes the configuration file to disk.
+
+        Nothing is written if there are no pending changes.
+        """
+        fname = self._fname()
+        tmp_fname = fname + ".tmp"
+        encoder = json.JSONEncoder(
+            sort_keys=True,
+            indent=4
+        )
+        with self._write_lock:
+            with self._data_lock:
+                if not self._modified:
+                    return
+                content = encoder.encode(self._data)
+                self._modified = False
+
+            try:
+                with open(tmp_fname, "w") as hdl:
+                    hdl.write(content)
+                os.replace(tmp_fname, fname)
+                self._written_signature = self._file_signature(fname)
+            except OSError as e:
+                logging.getLogger("system").error(
+                    "Unable to write the configuration: {}".format(e)
+                )
+                # Retry with the next write
+                with self._data_lock:
+                    self._modified = True
 
     def set_calibration(self, dev_id, limits):
         """Sets the calibration data for all axes of a device.
@@ -93,17 +210,15 @@ class Configuration:
         """
         hid, wid = util.extract_ids(dev_id)
         identifier = str(hid) if wid == -1 else "{}_{}".format(hid, wid)
-        if identifier in self._data["calibration"]:
-            del self._data["calibration"][identifier]
-        self._data["calibration"][identifier] = {}
-
+        calibration = {}
         for i, limit in enumerate(limits):
             if limit[2] - limit[0] == 0:
                 continue
             axis_name = "axis_{}".format(i)
-            self._data["calibration"][identifier][axis_name] = [
-                limit[0], limit[1], limit[2]
-            ]
+            calibration[axis_name] = [limit[0], limit[1], limit[2]]
+
+        with self._data_lock:
+            self._data["calibration"][identifier] = calibration
         self.save()
 
     def get_calibration(self, dev_id, axis_id):
@@ -135,9 +250,11 @@ class Configuration:
 
         :param exec_path the path to the executable to remove
         """
-        if self._has_profile(exec_path):
+        with self._data_lock:
+            if not self._has_profile(exec_path):
+                return
             del self._data["profiles"][exec_path]
-            self.save()
+        self.save()
 
     def get_profile(self, exec_path):
         """Returns the path to the profile associated with the given
@@ -155,7 +272,8 @@ class Configuration:
         :param exec_path the path to the executable
         :param profile_path the path to the associated profile
         """
-        self._data["profiles"][exec_path] = profile_path
+        with self._data_lock:
+            self._data["profiles"][exec_path] = profile_path
         self.save()
 
     def set_last_mode(self, profile_path, mode_name):
@@ -166,7 +284,8 @@ class Configuration:
         """
         if profile_path is None or mode_name is None:
             return
-        self._data["last_mode"][profile_path] = mode_name
+        with self._data_lock:
+            self._data["last_mode"][profile_path] = mode_name
         self.save()
 
     def get_last_mode(self, profile_path):
@@ -199,16 +318,17 @@ class Configuration:
 
         :param value path to the most recently used profile
         """
-        self._data["last_profile"] = value
-
-        # Update recent profiles
-        if value is not None:
-            current = self.recent_profiles
-            if value in current:
-                del current[current.index(value)]
-            current.insert(0, value)
-            current = current[0:5]
-            self._data["recent_profiles"] = current
+        with self._data_lock:
+            self._data["last_profile"] = value
+
+            # Update recent profiles
+            if value is not None:
+                current = list(self.recent_profiles)
+                if value in current:
+                    del current[current.index(value)]
+                current.insert(0, value)
+                current = current[0:5]
+                self._data["recent_profiles"] = current
         self.save()
 
     @property
@@ -239,7 +359,8 @@ class Configuration:
             feature
         """
         if type(value) == bool:
-            self._data["autoload_profiles"] = value
+            with self._data_lock:
+                self._data["autoload_profiles"] = value
             self.save()
 
     @property
@@ -264,7 +385,8 @@ class Configuration:
             feature
         """
         if type(value) == bool:
-            self._data["highlight_input"] = value
+            with self._data_lock:
+                self._data["highlight_input"] = value
             self.save()
 
     @property
@@ -281,7 +403,8 @@ class Configuration:
 
         :param value True to enable the feature, False to disable
         """
-        self._data["mode_change_message"] = bool(value)
+        with self._data_lock:
+            self._data["mode_change_message"] = bool(value)
         self.save()
 
     @property
@@ -298,7 +421,8 @@ class Configuration:
 
         :param value minimize to tray if True, close if False
         """
-        self._data["close_to_tray"] = bool(value)
+        with self._data_lock:
+            self._data["close_to_tray"] = bool(value)
         self.save()
 
     @property
@@ -315,7 +439,8 @@ class Configuration:
 
         :param value start minimized if True and normal if False
         """
-        self._data["start_minimized"] = bool(value)
+        with self._data_lock:
+            self._data["start_minimized"] = bool(value)
         self.save()
 
     @property
@@ -332,7 +457,8 @@ class Configuration:
 
         :param value the name of the default action to show
         """
-        self._data["default_action"] = str(value)
+        with self._data_lock:
+            self._data["default_action"] = str(value)
         self.save()
 
     @property
@@ -345,7 +471,165 @@ class Configuration:
 
     @macro_axis_polling_rate.setter
     def macro_axis_polling_rate(self, value):
-        self._data["macro_axis_polling_rate"] = value
+        with self._data_lock:
+            self._data["macro_axis_polling_rate"] = value
+        self.save()
+
+    @property
+    def coalesce_axis_events(self):
+        """Returns whether or not axis events are coalesced.
+
+        When enabled only the most recent value of each axis is processed
+        out of a batch of events received at the same time.
+
+        :return True if axis events are coalesced, False otherwise
+        """
+        return self._data.get("coalesce_axis_events", False)
+
+    @coalesce_axis_events.setter
+    def coalesce_axis_events(self, value):
+        """Sets whether or not axis events are coalesced.
+
+        :param value True to coalesce axis events, False to process each one
+        """
+        with self._data_lock:
+            self._data["coalesce_axis_events"] = bool(value)
+        self.save()
+
+    @property
+    def threaded_event_dispatch(self):
+        """Returns whether or not events are processed on a dedicated thread.
+
+        When enabled the execution of a profile does not depend on the
+        responsiveness of the user interface.
+
+        :return True if events are processed by a dedicated thread, False
+            if they are processed by the user interface thread
+        """
+        return self._data.get("threaded_event_dispatch", True)
+
+    @threaded_event_dispatch.setter
+    def threaded_event_dispatch(self, value):
+        """Sets whether or not events are processed on a dedicated thread.
+
+        :param value True to use a dedicated thread, False to use the user
+            interface thread
+        """
+        with self._data_lock:
+            self._data["threaded_event_dispatch"] = bool(value)
+        self.save()
+
+    @property
+    def interpret_execution_graphs(self):
+        """Returns whether or not execution graphs are interpreted.
+
+        Interpreting the graphs is slower than running their compiled
+        version but simplifies debugging.
+
+        :return True if execution graphs are interpreted, False if they
+            are compiled
+        """
+        return self._data.get("interpret_execution_graphs", False)
+
+    @interpret_execution_graphs.setter
+    def interpret_execution_graphs(self, value):
+        """Sets whether or not execution graphs are interpreted.
+
+        :param value True to interpret execution graphs, False to compile
+            them
+        """
+        with self._data_lock:
+            self._data["interpret_execution_graphs"] = bool(value)
+        self.save()
+
+    @property
+    def precompute_response_curves(self):
+        """Returns whether or not response curves are precomputed.
+
+        When enabled response curves, including their deadzone, are turned
+        into tables which approximate the curve but are faster to evaluate.
+
+        :return True if response curves are precomputed, False if they are
+            evaluated exactly
+        """
+        return self._data.get("precompute_response_curves", False)
+
+    @precompute_response_curves.setter
+    def precompute_response_curves(self, value):
+        """Sets whether or not response curves are precomputed.
+
+        :param value True to precompute response curves, False to evaluate
+            them exactly
+        """
+        with self._data_lock:
+            self._data["precompute_response_curves"] = bool(value)
+        self.save()
+
+    @property
+    def batch_vjoy_output(self):
+        """Returns whether or not vJoy output is written in batches.
+
+        When enabled all changes made to a vJoy device while processing a
+        batch of events are written to the driver with a single call.
+
+        :return True if vJoy output is batched, False if every change is
+            written immediately
+        """
+        return self._data.get("batch_vjoy_output", False)
+
+    @batch_vjoy_output.setter
+    def batch_vjoy_output(self, value):
+        """Sets whether or not vJoy output is written in batches.
+
+        :param value True to batch vJoy output, False to write every change
+            immediately
+        """
+        with self._data_lock:
+            self._data["batch_vjoy_output"] = bool(value)
+        self.save()
+
+    @property
+    def vjoy_output_thread(self):
+        """Returns whether or not vJoy output is written by its own thread.
+
+        When enabled all changes to vJoy devices are submitted to a single
+        thread which performs all writes to the driver.
+
+        :return True if vJoy output is written by a dedicated thread, False
+            if the thread making a change writes it
+        """
+        return self._data.get("vjoy_output_thread", False)
+
+    @vjoy_output_thread.setter
+    def vjoy_output_thread(self, value):
+        """Sets whether or not vJoy output is written by its own thread.
+
+        :param value True to write vJoy output from a dedicated thread,
+            False to write it from the thread making a change
+        """
+        with self._data_lock:
+            self._data["vjoy_output_thread"] = bool(value)
+        self.save()
+
+    @property
+    def vjoy_flush_interval(self):
+        """Returns the time between writes of batched vJoy output.
+
+        Changes not made in response to an input event, such as the ones
+        made by macros, are written at this interval.
+
+        :return time in seconds between two writes of batched vJoy output
+        """
+        return self._data.get("vjoy_flush_interval", 0.01)
+
+    @vjoy_flush_interval.setter
+    def vjoy_flush_interval(self, value):
+        """Sets the time between writes of batched vJoy output.
+
+        :param value time in seconds between two writes
+        """
+        with self._data_lock:
+            self._data["vjoy_flush_interval"] = float(value)
         self.save()
 
     @property
@@ -362,7 +646,8 @@ class Configuration:
 
         :param value the size of the main Gremlin window
         """
-        self._data["window_size"] = value
+        with self._data_lock:
+            self._data["window_size"] = value
         self.save()
 
     @property
@@ -379,5 +664,6 @@ class Configuration:
 
         :param value the position of the main Gremlin window
         """
-        self._data["window_location"] = value
+        with self._data_lock:
+            self._data["window_location"] = value
         self.save()
@@ -15,19 +15,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import array
+import ctypes
 import functools
+import heapq
 import inspect
 import logging
+import queue
 import time
 from threading import Thread
 
 from PyQt5 import QtCore
 
 import sdl2
-import sdl2.ext
 
 from . import common, config, error, joystick_handling, keyboard_hook, \
-    macro, util
+    latency, macro, util
 
 
 class Event:
@@ -47,6 +50,10 @@ class Event:
 
     The extended field is used for Keyboard events only to indicate
     whether or not the key's scan code is extended one.
+
+    The timestamp field holds the time in milliseconds at which SDL queued
+    a joystick event while the received field holds the value of
+    time.perf_counter() when the event was read by the EventListener.
     """
 
     ShiftEventId = 36
@@ -54,6 +61,19 @@ class Event:
     ShiftSystemId = 32
     ShiftIdentifier = 40
 
+    __slots__ = [
+        "event_type",
+        "identifier",
+        "hardware_id",
+        "windows_id",
+        "is_pressed",
+        "value",
+        "raw_value",
+        "timestamp",
+        "received",
+        "_hash"
+    ]
+
     def __init__(
             self,
             event_type,
@@ -62,7 +82,9 @@ class Event:
             windows_id,
             value=None,
             is_pressed=None,
-            raw_value=None
+            raw_value=None,
+            timestamp=0,
+            received=None
     ):
         """Creates a new Event object.
 
@@ -76,6 +98,8 @@ class Event:
         :param is_pressed boolean flag indicating if a button or key
         :param raw_value the raw SDL value of the axis
             is pressed
+        :param timestamp the SDL timestamp of the event in milliseconds
+        :param received the time at which the event was received
         """
         self.event_type = event_type
         self.identifier = identifier
@@ -84,47 +108,85 @@ class Event:
         self.is_pressed = is_pressed
         self.value = value
         self.raw_value = raw_value
+        self.timestamp = timestamp
+        self.received = received
+        self._hash = Event._identity_key(
+            event_type,
+            identifier,
+            hardware_id,
+            windows_id,
+            util.g_duplicate_devices
+        )
 
     def clone(self):
         """Returns a clone of the event.
 
         :return cloned copy of this event
         """
-        return Event(
-            self.event_type,
-            self.identifier,
-            self.hardware_id,
-            self.windows_id,
-            self.value,
-            self.is_pressed,
-            self.raw_value
-        )
+        event = Event.__new__(Event)
+        event.event_type = self.event_type
+        event.identifier = self.identifier
+        event.hardware_id = self.hardware_id
+        event.windows_id = self.windows_id
+        event.is_pressed = self.is_pressed
+        event.value = self.value
+        event.raw_value = self.raw_value
+        event.timestamp = self.timestamp
+        event.received = self.received
+        event._hash = self._hash
+        return event
 
     def __eq__(self, other):
-        return self.__hash__() == other.__hash__()
+        return self._hash == other.__hash__()
 
     def __ne__(self, other):
         return not (self == other)
 
     def __hash__(self):
-        """Computes the hash value of this event.
+        """Returns the hash value of this event.
 
         The hash is comprised of the events type, identifier of the
-        event source and the id of the event device.
+        event source and the id of the event device. It is computed once
+        when the event is created, as such the fields making up the hash
+        must not be modified afterwards.
 
         :return integer hash value of this event
         """
+        return self._hash
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _identity_key(
+            event_type,
+            identifier,
+            hardware_id,
+            windows_id,
+            duplicate_devices
+    ):
+        """Computes the hash value of an event with the given properties.
+
+        The results are cached as the same few inputs generate the vast
+        majority of all events.
+
+        :param event_type the type of the event
+        :param identifier the identifier of the event source
+        :param hardware_id the hardware identifier of the device
+        :param windows_id the index of the device as assigned by windows
+        :param duplicate_devices whether or not the windows id is used to
+            distinguish devices
+        :return integer hash value of an event with the given properties
+        """
         hash_val = 0
-        if self.event_type == common.InputType.Keyboard:
-            extended_val = 1 << 8 if self.identifier[1] else 0
-            hash_val += (extended_val + int(self.identifier[0])) \
+        if event_type == common.InputType.Keyboard:
+            extended_val = 1 << 8 if identifier[1] else 0
+            hash_val += (extended_val + int(identifier[0])) \
                 << Event.ShiftIdentifier
         else:
-            hash_val += self.identifier << Event.ShiftIdentifier
-        hash_val += self.event_type.value << Event.ShiftEventId
-        if util.g_duplicate_devices:
-            hash_val += self.windows_id << Event.ShiftSystemId
-        hash_val += self.hardware_id << Event.ShiftDeviceId
+            hash_val += identifier << Event.ShiftIdentifier
+        hash_val += event_type.value << Event.ShiftEventId
+        if duplicate_devices:
+            hash_val += windows_id << Event.ShiftSystemId
+        hash_val += hardware_id << Event.ShiftDeviceId
 
         return hash_val
 
@@ -144,6 +206,118 @@ class Event:
         )
 
 
+class DeviceState:
+
+    """Holds the most recent state of all inputs of a single joystick.
+
+    Axis values are stored calibrated in the range [-1, 1], buttons as 1 if
+    they are pressed and 0 otherwise and hats as (x, y) direction tuples.
+    All inputs are indexed starting at 0.
+    """
+
+    __slots__ = ["axes", "buttons", "hats"]
+
+    def __init__(self, axis_count, button_count, hat_count):
+        """Creates a new instance with all inputs in their neutral state.
+
+        :param axis_count the number of axes of the joystick
+        :param button_count the number of buttons of the joystick
+        :param hat_count the number of hats of the joystick
+        """
+        self.axes = array.array("d", [0.0] * axis_count)
+        self.buttons = bytearray(button_count)
+        self.hats = [(0, 0)] * hat_count
+
+
+class SDLEventBuffer:
+
+    """Drains the SDL event queue into a preallocated buffer.
+
+    The buffer is allocated once and reused for every drain operation. The
+    events returned when iterating over the buffer are views into the
+    buffer's memory and are therefore only valid until the next call to
+    drain.
+    """
+
+    def __init__(self, size=1024):
+        """Creates a new buffer instance.
+
+        :param size the maximum number of events retrieved by one drain
+        """
+        self._size = size
+        self._buffer = (sdl2.SDL_Event * size)()
+        self._pointer = ctypes.cast(
+            self._buffer,
+            ctypes.POINTER(sdl2.SDL_Event)
+        )
+        self._count = 0
+
+        # Statistics about the events that passed through the buffer
+        self.received_count = 0
+        self.coalesced_count = 0
+
+    @property
+    def size(self):
+        """Returns the capacity of the buffer.
+
+        :return maximum number of events the buffer can hold
+        """
+        return self._size
+
+    def drain(self):
+        """Moves queued SDL events into the buffer.
+
+        :return number of events retrieved from the SDL queue
+        """
+        sdl2.SDL_PumpEvents()
+        self._count = max(0, sdl2.SDL_PeepEvents(
+            self._pointer,
+            self._size,
+            sdl2.SDL_GETEVENT,
+            sdl2.SDL_FIRSTEVENT,
+            sdl2.SDL_LASTEVENT
+        ))
+        self.received_count += self._count
+        return self._count
+
+    def coalesced(self):
+        """Iterates over the buffered events, collapsing axis motion events.
+
+        Only the most recent motion event of each axis is returned, all
+        other events, such as button and hat events, are returned in their
+        original order.
+
+        :return iterator over the events remaining after coalescing
+        """
+        buffer = self._buffer
+        latest = {}
+        for i in range(self._count):
+            if buffer[i].type == sdl2.SDL_JOYAXISMOTION:
+                jaxis = buffer[i].jaxis
+                latest[(jaxis.which, jaxis.axis)] = i
+
+        for i in range(self._count):
+            event = buffer[i]
+            if event.type == sdl2.SDL_JOYAXISMOTION and \
+                    latest[(event.jaxis.which, event.jaxis.axis)] != i:
+                self.coalesced_count += 1
+                continue
+            yield event
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError("Event buffer index out of range")
+        return self._buffer[index]
+
+    def __iter__(self):
+        buffer = self._buffer
+        for i in range(self._count):
+            yield buffer[i]
+
+
 @common.SingletonDecorator
 class EventListener(QtCore.QObject):
 
@@ -158,34 +332,147 @@ class EventListener(QtCore.QObject):
     # Signal emitted when a joystick is attached or removed
     device_change_event = QtCore.pyqtSignal()
 
-    def __init__(self):
-        """Creates a new instance."""
+    # Maximum duration in milliseconds an event source blocks while waiting
+    # for events, this bounds the time needed to terminate the loop
+    wait_timeout = 100
+
+    def __init__(self, event_source=None):
+        """Creates a new instance.
+
+        :param event_source source of input events used instead of SDL and
+            the keyboard hook, such as a simulation.ScriptedEventSource
+        """
         QtCore.QObject.__init__(self)
         self.keyboard_hook = keyboard_hook.KeyboardHook()
         self.keyboard_hook.register(self._keyboard_handler)
         self._joysticks = {}
+        self._joystick_instances = {}
         self._joystick_guid_map = {}
+        self._device_states = {}
+        self._device_names = {}
         self._calibrations = {}
+        self._calibration_limits = {}
         self._running = True
         self._keyboard_state = {}
-
-        self._init_joysticks()
-        self.keyboard_hook.start()
+        self._event_buffer = SDLEventBuffer()
+        self._dispatch_queue = None
+        self._latency = latency.LatencyRecorder()
+        self._event_source = event_source
+        # Read once as the event loop runs every millisecond, the options
+        # dialog updates it when the setting is changed
+        self.coalesce_axis_events = config.Configuration().coalesce_axis_events
+
+        if self._event_source is None:
+            self._init_joysticks()
+            self.keyboard_hook.start()
+        else:
+            self._event_source.attach(self)
         Thread(target=self._run).start()
 
+    @property
+    def event_counts(self):
+        """Returns statistics about the joystick events received.
+
+        :return tuple containing the number of received events and the
+            number of axis events that were dropped by coalescing
+        """
+        return (
+            self._event_buffer.received_count,
+            self._event_buffer.coalesced_count
+        )
+
+    def device_state(self, windows_id):
+        """Returns the state of the inputs of a joystick.
+
+        The state is updated whenever events of the joystick are received.
+        Axis values are calibrated.
+
+        :param windows_id the SDL instance id of the joystick
+        :return DeviceState instance of the joystick, None if no joystick
+            with the given id is known
+        """
+        return self._device_states.get(windows_id)
+
+    def device_names(self):
+        """Returns the names of all connected joysticks.
+
+        :return dictionary mapping joystick instance ids to device names
+        """
+        return dict(self._device_names)
+
+    def add_device_state(self, windows_id, state, name):
+        """Adds the state of a joystick which is not opened via SDL.
+
+        :param windows_id the instance id of the joystick
+        :param state DeviceState instance holding the joystick's state
+        :param name the name of the joystick
+        """
+        self._device_states[windows_id] = state
+        self._device_names[windows_id] = name
+
+    def set_dispatch_queue(self, dispatch_queue):
+        """Sets the queue receiving all events in addition to the signals.
+
+        :param dispatch_queue the queue to place events into, None to only
+            publish events via signals
+        """
+        self._dispatch_queue = dispatch_queue
+
+    def emit_keyboard_event(self, event):
+        """Publishes a keyboard event to all interested parties.
+
+        :param event the keyboard event to publish
+        """
+        self.keyboard_event.emit(event)
+        dispatch_queue = self._dispatch_queue
+        if dispatch_queue is not None:
+            dispatch_queue.put(event)
+
+    def emit_joystick_event(self, event):
+        """Publishes a joystick event to all interested parties.
+
+        :param event the joystick event to publish
+        """
+        self.joystick_event.emit(event)
+        dispatch_queue = self._dispatch_queue
+        if dispatch_queue is not None:
+            dispatch_queue.put(event)
+
     def terminate(self):
         """Stops the loop from running."""
         self._running = False
         self.keyboard_hook.stop()
+        logging.getLogger("system").debug(
+            "Joystick events received: {:d}, coalesced: {:d}".format(
+                *self.event_counts
+            )
+        )
 
     def _run(self):
         """Starts the event loop."""
+        event_source = self._event_source
+        if event_source is not None:
+            timeout = self.wait_timeout / 1000.0
+            while self._running:
+                event_source.process(self, timeout)
+            return
+
+        event_buffer = self._event_buffer
         while self._running:
-            # Process joystick events
-            for event in sdl2.ext.get_events():
-                self._joystick_handler(event)
             time.sleep(0.001)
 
+            # Process joystick events, if the buffer was filled completely
+            # more events may be waiting in the queue
+            count = event_buffer.size
+            while count == event_buffer.size:
+                count = event_buffer.drain()
+                if self.coalesce_axis_events:
+                    events = event_buffer.coalesced()
+                else:
+                    events = event_buffer
+                for event in events:
+                    self._joystick_handler(event)
+
     def _keyboard_handler(self, event):
         """Callback for keyboard events.
 
@@ -203,12 +490,13 @@ class EventListener(QtCore.QObject):
             # time or released but not when it's being held down
             if not is_repeat:
                 self._keyboard_state[key_id] = is_pressed
-                self.keyboard_event.emit(Event(
+                self.emit_keyboard_event(Event(
                     event_type=common.InputType.Keyboard,
                     hardware_id=0,
                     windows_id=0,
                     identifier=key_id,
                     is_pressed=is_pressed,
+                    received=time.perf_counter()
                 ))
         # Allow the windows event to propagate further
         return True
@@ -224,55 +512,163 @@ class EventListener(QtCore.QObject):
         # FIXME: this currently prevents forwarding of vJoy inputs to other
         #   vJoy inputs which might be needed for certain applications, see:
         #   https://github.com/WhiteMagic/JoystickGremlin/issues/53
+        # The state of every device, including vJoy ones, is tracked such
+        # that it can be queried without using SDL
         if event.type == sdl2.SDL_JOYAXISMOTION:
-            if self._joystick_guid_map[event.jaxis.which] != 873639358:
-                calib_id = (
-                    self._joystick_guid_map[event.jaxis.which],
-                    event.jaxis.axis + 1
-                )
-                self.joystick_event.emit(Event(
+            guid = self._joystick_guid_map[event.jaxis.which]
+            value = self._calibrations[(guid, event.jaxis.axis + 1)][
+                event.jaxis.value + 32768
+            ]
+            self._device_states[event.jaxis.which].axes[event.jaxis.axis] = \
+                value
+            if guid != 873639358:
+                self._emit_sdl_event(Event(
                     event_type=common.InputType.JoystickAxis,
-                    hardware_id=self._joystick_guid_map[event.jaxis.which],
+                    hardware_id=guid,
                     windows_id=event.jaxis.which,
                     identifier=event.jaxis.axis + 1,
-                    value=self._calibrations[calib_id](event.jaxis.value),
-                    raw_value=event.jaxis.value
+                    value=value,
+                    raw_value=event.jaxis.value,
+                    timestamp=event.jaxis.timestamp,
+                    received=time.perf_counter()
                 ))
         elif event.type in [sdl2.SDL_JOYBUTTONDOWN, sdl2.SDL_JOYBUTTONUP]:
-            if self._joystick_guid_map[event.jbutton.which] != 873639358:
-                self.joystick_event.emit(Event(
+            guid = self._joystick_guid_map[event.jbutton.which]
+            self._device_states[event.jbutton.which].buttons[
+                event.jbutton.button
+            ] = event.jbutton.state
+            if guid != 873639358:
+                self._emit_sdl_event(Event(
                     event_type=common.InputType.JoystickButton,
-                    hardware_id=self._joystick_guid_map[event.jbutton.which],
+                    hardware_id=guid,
                     windows_id=event.jbutton.which,
                     identifier=event.jbutton.button + 1,
-                    is_pressed=event.jbutton.state == 1
+                    is_pressed=event.jbutton.state == 1,
+                    timestamp=event.jbutton.timestamp,
+                    received=time.perf_counter()
                 ))
         elif event.type == sdl2.SDL_JOYHATMOTION:
-            if self._joystick_guid_map[event.jhat.which] != 873639358:
-                self.joystick_event.emit(Event(
+            guid = self._joystick_guid_map[event.jhat.which]
+            direction = util.convert_sdl_hat(event.jhat.value)
+            self._device_states[event.jhat.which].hats[event.jhat.hat] = \
+                direction
+            if guid != 873639358:
+                self._emit_sdl_event(Event(
                     event_type=common.InputType.JoystickHat,
-                    hardware_id=self._joystick_guid_map[event.jhat.which],
+                    hardware_id=guid,
                     windows_id=event.jhat.which,
                     identifier=event.jhat.hat + 1,
-                    value=util.convert_sdl_hat(event.jhat.value)
+                    value=direction,
+                    timestamp=event.jhat.timestamp,
+                    received=time.perf_counter()
                 ))
-        elif event.type in [sdl2.SDL_JOYDEVICEADDED, sdl2.SDL_JOYDEVICEREMOVED]:
-            self._init_joysticks()
-            self.device_change_event.emit()
+        elif event.type == sdl2.SDL_JOYDEVICEADDED:
+            # SDL reports devices present at startup as added as well, in
+            # which case nothing changes
+            if self._add_joystick(event.jdevice.which):
+                self.device_change_event.emit()
+        elif event.type == sdl2.SDL_JOYDEVICEREMOVED:
+            if self._remove_joystick(event.jdevice.which):
+                self.device_change_event.emit()
+
+    def _emit_sdl_event(self, event):
+        """Publishes an event created from SDL data.
+
+        :param event the joystick event to publish
+        """
+        if self._latency.enabled:
+            self._latency.record(
+                latency.Stage.Ingestion,
+                event,
+                (sdl2.SDL_GetTicks() - event.timestamp) / 1000.0
+            )
+        self.emit_joystick_event(event)
 
     def _init_joysticks(self):
         """Initializes joystick devices."""
         for i in range(sdl2.joystick.SDL_NumJoysticks()):
-            joy = sdl2.SDL_JoystickOpen(i)
-            if joy is None:
-                logging.getLogger("system").error(
-                    "Invalid joystick device at id {}".format(i)
-                )
-            else:
-                guid = self._get_device_guid(joy)
-                self._joysticks[guid] = joy
-                self._joystick_guid_map[sdl2.SDL_JoystickInstanceID(joy)] = guid
-                self._load_calibrations(guid)
+            self._add_joystick(i)
+
+    def _add_joystick(self, index):
+        """Opens the joystick with the given device index.
+
+        :param index the SDL device index of the joystick to open
+        :return True if a previously unknown joystick was added, False
+            otherwise
+        """
+        joy = sdl2.SDL_JoystickOpen(index)
+        if joy is None:
+            logging.getLogger("system").error(
+                "Invalid joystick device at id {}".format(index)
+            )
+            return False
+
+        instance_id = sdl2.SDL_JoystickInstanceID(joy)
+        if instance_id in self._joystick_instances:
+            # Opening a joystick twice only increments its reference count
+            sdl2.SDL_JoystickClose(joy)
+            return False
+
+        guid = self._get_device_guid(joy)
+        self._joysticks[guid] = joy
+        self._joystick_instances[instance_id] = joy
+        self._joystick_guid_map[instance_id] = guid
+        self._load_calibrations(guid)
+        self._device_states[instance_id] = self._create_device_state(joy, guid)
+        name = sdl2.SDL_JoystickName(joy)
+        self._device_names[instance_id] = \
+            "Unknown device" if name is None else name.decode("utf-8")
+        return True
+
+    def _remove_joystick(self, instance_id):
+        """Closes the joystick with the given instance id.
+
+        The instance id to guid mapping and the device's state are retained
+        as SDL never reuses instance ids and events of the device may still
+        be queued.
+
+        :param instance_id the SDL instance id of the joystick to close
+        :return True if a known joystick was removed, False otherwise
+        """
+        joy = self._joystick_instances.pop(instance_id, None)
+        if joy is None:
+            return False
+        self._device_names.pop(instance_id, None)
+
+        guid = self._joystick_guid_map[instance_id]
+        if self._joysticks.get(guid) is joy:
+            del self._joysticks[guid]
+            # Fall back to another device with the same guid if one exists
+            for other_id, other_joy in self._joystick_instances.items():
+                if self._joystick_guid_map[other_id] == guid:
+                    self._joysticks[guid] = other_joy
+                    break
+        sdl2.SDL_JoystickClose(joy)
+        return True
+
+    def _create_device_state(self, joy, guid):
+        """Creates the state of a joystick based on its current inputs.
+
+        :param joy the SDL joystick whose state to create
+        :param guid the guid of the joystick
+        :return DeviceState instance holding the joystick's current state
+        """
+        state = DeviceState(
+            sdl2.SDL_JoystickNumAxes(joy),
+            sdl2.SDL_JoystickNumButtons(joy),
+            sdl2.SDL_JoystickNumHats(joy)
+        )
+        for i in range(len(state.axes)):
+            state.axes[i] = self._calibrations[(guid, i + 1)][
+                sdl2.SDL_JoystickGetAxis(joy, i) + 32768
+            ]
+        for i in range(len(state.buttons)):
+            state.buttons[i] = sdl2.SDL_JoystickGetButton(joy, i)
+        for i in range(len(state.hats)):
+            state.hats[i] = util.convert_sdl_hat(
+                sdl2.SDL_JoystickGetHat(joy, i)
+            )
+        return state
 
     def _get_device_guid(self, device):
         """Returns the GUID of the provided device.
@@ -284,24 +680,318 @@ class EventListener(QtCore.QObject):
         product_id = sdl2.SDL_JoystickGetProduct(device)
         return (vendor_id << 16) + product_id
 
+    def reload_calibrations(self):
+        """Reloads the calibration data of all joysticks.
+
+        Only the lookup tables of axes whose calibration changed are
+        rebuilt.
+        """
+        for guid in list(self._joysticks):
+            self._load_calibrations(guid)
+
     def _load_calibrations(self, guid):
         """Loads the calibration data for the given joystick.
 
         :param guid the id of the joystick to load the calibration
             data for
         """
+        joy = self._joysticks.get(guid)
+        if joy is None:
+            return
+
         cfg = config.Configuration()
-        for i in range(sdl2.SDL_JoystickNumAxes(self._joysticks[guid])):
-            device = joystick_handling.JoystickDeviceData(self._joysticks[guid])
-            limits = cfg.get_calibration(util.device_id(device), i + 1)
+        device = joystick_handling.JoystickDeviceData(joy)
+        dev_id = util.device_id(device)
+        for i in range(device.axis_count):
+            limits = tuple(cfg.get_calibration(dev_id, i + 1))
+            if self._calibration_limits.get((guid, i+1)) == limits:
+                continue
+
+            self._calibration_limits[(guid, i+1)] = limits
             self._calibrations[(guid, i+1)] = \
-                util.create_calibration_function(
+                util.create_calibration_lookup(
                     limits[0],
                     limits[1],
                     limits[2]
                 )
 
 
+@common.SingletonDecorator
+class EventDispatcher(QtCore.QObject):
+
+    """Forwards input events to the callbacks executing the profile.
+
+    Events are either processed by a dedicated thread, fed by a queue the
+    EventListener writes into directly, or by the Qt main thread via the
+    EventListener's signals. In the first case the execution of the profile
+    is independent of the state of the user interface.
+
+    Work which has to happen at a later point in time, in response to an
+    event, can be deferred. Deferred tasks run on the same thread as the
+    event processing. Until all deferred tasks of an input have run, any
+    new events of that input are held back, which preserves the order in
+    which the input's events are processed.
+
+    Once all events available at a time have been processed the batch end
+    callbacks are run, allowing output to be written once per batch of
+    events rather than once per event.
+    """
+
+    # Margin in seconds by which a deferred task may run early, covering
+    # the inaccuracy of timers
+    timer_tolerance = 0.002
+
+    def __init__(self):
+        """Creates a new instance."""
+        QtCore.QObject.__init__(self)
+        self._callbacks = ()
+        self._batch_callbacks = ()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._is_running = False
+        self._deferred = []
+        self._deferred_count = 0
+        self._held_events = {}
+
+    def connect(self, callback):
+        """Adds a callback which is run for every event.
+
+        :param callback the function to call with each event
+        """
+        # Replace the tuple instead of modifying it such that the
+        # dispatch thread never observes a partially updated state
+        self._callbacks = self._callbacks + (callback,)
+
+    def disconnect(self, callback):
+        """Removes a previously added callback.
+
+        :param callback the function to remove
+        """
+        callbacks = list(self._callbacks)
+        callbacks.remove(callback)
+        self._callbacks = tuple(callbacks)
+
+    def connect_batch_end(self, callback):
+        """Adds a callback which is run after each batch of events.
+
+        :param callback the function to call once a batch is processed
+        """
+        self._batch_callbacks = self._batch_callbacks + (callback,)
+
+    def disconnect_batch_end(self, callback):
+        """Removes a previously added batch end callback.
+
+        :param callback the function to remove
+        """
+        callbacks = list(self._batch_callbacks)
+        callbacks.remove(callback)
+        self._batch_callbacks = tuple(callbacks)
+
+    def start(self, use_thread):
+        """Starts forwarding events to the callbacks.
+
+        :param use_thread if True events are processed by a dedicated
+            thread, otherwise they are processed by the Qt main thread
+        """
+        if self._is_running:
+            return
+
+        self._is_running = True
+        el = EventListener()
+        if use_thread:
+            self._queue = queue.SimpleQueue()
+            self._thread = Thread(target=self._run)
+            self._thread.start()
+            el.set_dispatch_queue(self._queue)
+        else:
+            el.joystick_event.connect(self._process_signalled_event)
+            el.keyboard_event.connect(self._process_signalled_event)
+
+    def stop(self):
+        """Stops forwarding events to the callbacks.
+
+        Deferred tasks which have not run yet are run immediately, such
+        that no input is left in the state of an unfinished task and all
+        held back events are processed.
+        """
+        if not self._is_running:
+            return
+
+        el = EventListener()
+        if self._thread is not None:
+            el.set_dispatch_queue(None)
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        else:
+            el.joystick_event.disconnect(self._process_signalled_event)
+            el.keyboard_event.disconnect(self._process_signalled_event)
+
+        # No new events arrive anymore, tasks deferred while finishing the
+        # outstanding work are added to it
+        self._run_deferred_tasks(run_all=True)
+        self._held_events = {}
+        self._is_running = False
+
+    def defer(self, event, delay, task):
+        """Runs a task for the given event after a delay.
+
+        This has to be called from the thread processing events. If the
+        dispatcher is not running the task is executed after blocking for
+        the duration of the delay.
+
+        :param event the event the task belongs to
+        :param delay the time in seconds after which to run the task
+        :param task the function to run
+        """
+        if not self._is_running:
+            time.sleep(delay)
+            task()
+            return
+
+        key = hash(event)
+        if key not in self._held_events:
+            self._held_events[key] = []
+        self._deferred_count += 1
+        heapq.heappush(self._deferred, (
+            time.perf_counter() + delay,
+            self._deferred_count,
+            key,
+            task
+        ))
+
+        if self._thread is None:
+            QtCore.QTimer.singleShot(
+                int(delay * 1000),
+                self._run_deferred_tasks
+            )
+
+    @QtCore.pyqtSlot(Event)
+    def process_event(self, event):
+        """Runs all callbacks with the provided event.
+
+        :param event the event to process
+        """
+        held_events = self._held_events.get(hash(event))
+        if held_events is not None:
+            held_events.append(event)
+            return
+
+        for callback in self._callbacks:
+            callback(event)
+
+    @QtCore.pyqtSlot(Event)
+    def _process_signalled_event(self, event):
+        """Processes an event delivered by the Qt main thread.
+
+        Each event delivered via a signal forms a batch of its own.
+
+        :param event the event to process
+        """
+        self.process_event(event)
+        self._end_batch()
+
+    def _end_batch(self):
+        """Runs all batch end callbacks."""
+        for callback in self._batch_callbacks:
+            try:
+                callback()
+            except Exception:
+                logging.getLogger("system").exception(
+                    "Error while finishing a batch of events"
+                )
+
+    def _run_deferred_tasks(self, run_all=False):
+        """Runs all deferred tasks which are due.
+
+        Without a dispatch thread, the tasks and the events they held back
+        form a batch of their own.
+
+        :param run_all if True all tasks are run, whether they are due or
+            not
+        :return time in seconds until the next task is due, None if no
+            tasks are pending
+        """
+        deferred = self._deferred
+        remaining = None
+        ran_tasks = False
+        while len(deferred) > 0:
+            deadline = deferred[0][0]
+            remaining = deadline - time.perf_counter()
+            if not run_all and remaining > self.timer_tolerance:
+                # Timers may fire early in which case they are restarted
+                if self._thread is None:
+                    QtCore.QTimer.singleShot(
+                        int(remaining * 1000) + 1,
+                        self._run_deferred_tasks
+                    )
+                break
+
+            _, _, key, task = heapq.heappop(deferred)
+            try:
+                task()
+            except Exception:
+                logging.getLogger("system").exception(
+                    "Error while running deferred task"
+                )
+            self._release_held_events(key)
+            ran_tasks = True
+            remaining = None
+
+        if ran_tasks and (run_all or self._thread is None):
+            self._end_batch()
+        return remaining
+
+    def _release_held_events(self, key):
+        """Processes the events held back by the deferred tasks of an input.
+
+        :param key the key of the input whose held back events to process
+        """
+        # Other tasks of the same input still have to run first
+        if any(entry[2] == key for entry in self._deferred):
+            return
+
+        held_events = self._held_events.pop(key, [])
+        while len(held_events) > 0:
+            event = held_events.pop(0)
+            try:
+                for callback in self._callbacks:
+                    callback(event)
+            except Exception:
+                logging.getLogger("system").exception(
+                    "Error while processing event"
+                )
+
+            # Processing the event deferred new work, the remaining events
+            # wait for it
+            if key in self._held_events:
+                self._held_events[key].extend(held_events)
+                return
+
+    def _run(self):
+        """Processes queued events until a None entry is received."""
+        event_queue = self._queue
+        timeout = None
+        while True:
+            try:
+                event = event_queue.get(timeout=timeout)
+            except queue.Empty:
+                event = False
+            if event is None:
+                break
+
+            if event is not False:
+                try:
+                    self.process_event(event)
+                except Exception:
+                    logging.getLogger("system").exception(
+                        "Error while processing event"
+                    )
+            timeout = self._run_deferred_tasks()
+            if event_queue.empty():
+                self._end_batch()
+
+
 @common.SingletonDecorator
 class EventHandler(QtCore.QObject):
 
@@ -319,8 +1009,10 @@ class EventHandler(QtCore.QObject):
         self.plugins = {}
         self.callbacks = {}
         self._event_lookup = {}
+        self._active_lookup = {}
         self._active_mode = None
         self._previous_mode = None
+        self._latency = latency.LatencyRecorder()
 
     @property
     def active_mode(self):
@@ -373,7 +1065,30 @@ class EventHandler(QtCore.QObject):
     def build_event_lookup(self, inheritance_tree):
         """Builds the lookup table linking event to callback.
 
-        This takes mode inheritance into account.
+        This takes mode inheritance into account. The resulting table
+        contains an entry for each mode and event combination holding the
+        callbacks to run when the system is active and paused respectively.
+
+        :param inheritance_tree the tree of parent and children in the
+            inheritance structure
+        """
+        self._inherit_callbacks(inheritance_tree)
+
+        event_lookup = {}
+        for device_cb in self.callbacks.values():
+            for mode, mode_cb in device_cb.items():
+                mode_lookup = event_lookup.setdefault(mode, {})
+                for event, callbacks in mode_cb.items():
+                    mode_lookup[hash(event)] = (
+                        tuple(cb[0] for cb in callbacks),
+                        tuple(cb[0] for cb in callbacks if cb[1])
+                    )
+
+        self._event_lookup = event_lookup
+        self._active_lookup = event_lookup.get(self._active_mode, {})
+
+    def _inherit_callbacks(self, inheritance_tree):
+        """Copies callbacks of parent modes into their children.
 
         :param inheritance_tree the tree of parent and children in the
             inheritance structure
@@ -398,17 +1113,14 @@ class EventHandler(QtCore.QObject):
                                 device_cb[child][event] = callbacks
 
             # Recurse until we've dealt with all modes
-            self.build_event_lookup(children)
+            self._inherit_callbacks(children)
 
     def change_mode(self, new_mode):
         """Changes the currently active mode.
 
         :param new_mode the new mode to use
         """
-        mode_exists = False
-        for device in self.callbacks.values():
-            if new_mode in device:
-                mode_exists = True
+        mode_exists = new_mode in self._event_lookup
         if not mode_exists:
             logging.getLogger("system").error(
                 "The mode \"{}\" does not exist or has no"
@@ -422,6 +1134,7 @@ class EventHandler(QtCore.QObject):
             cfg = config.Configuration()
             cfg.set_last_mode(cfg.last_profile, new_mode)
 
+            self._active_lookup = self._event_lookup[new_mode]
             self._active_mode = new_mode
             self.mode_changed.emit(self._active_mode)
 
@@ -443,45 +1156,76 @@ class EventHandler(QtCore.QObject):
     def clear(self):
         """Removes all attached callbacks."""
         self.callbacks = {}
+        self._event_lookup = {}
+        self._active_lookup = {}
 
     @QtCore.pyqtSlot(Event)
     def process_event(self, event):
         """Processes a single event by passing it to all callbacks
         registered for this event.
 
+        :param event the event to process
+        """
+        if self._latency.enabled:
+            self._process_event_timed(event)
+        else:
+            self._process_event(event)
+
+    def _process_event(self, event):
+        """Runs all callbacks matching the provided event.
+
         :param event the event to process
         """
         for cb in self._matching_callbacks(event):
             try:
                 cb(event)
             except error.VJoyError as e:
-                util.display_error(str(e))
+                util.run_in_main_thread(
+                    functools.partial(util.display_error, str(e))
+                )
                 logging.getLogger("system").exception(
                     "VJoy related error: {}".format(e)
                 )
                 self.pause()
 
+    def _process_event_timed(self, event):
+        """Runs all callbacks matching the provided event while recording
+        the latencies involved.
+
+        :param event the event to process
+        """
+        start = time.perf_counter()
+        if event.received is not None:
+            self._latency.record(
+                latency.Stage.Dispatch,
+                event,
+                start - event.received
+            )
+        self._latency.set_current_event(event)
+        try:
+            self._process_event(event)
+        finally:
+            self._latency.set_current_event(None)
+        self._latency.record(
+            latency.Stage.Handler,
+            event,
+            time.perf_counter() - start
+        )
+
     def _matching_callbacks(self, event):
         """Returns the list of callbacks to execute in response to
         the provided event.
 
         :param event the event for which to search the matching
             callbacks
-        :return a list of all callbacks registered and valid for the
+        :return a tuple of all callbacks registered and valid for the
             given event
         """
-        callback_list = []
-        # Obtain callbacks matching the event
-        device_id = util.device_id(event)
-        if device_id in self.callbacks:
-            callback_list = self.callbacks[device_id].get(
-                self._active_mode, {}
-            ).get(event, [])
-        # Filter events when the system is paused
-        if not self.process_callbacks:
-            return [c[0] for c in callback_list if c[1]]
-        else:
-            return [c[0] for c in callback_list]
+        entry = self._active_lookup.get(hash(event))
+        if entry is None:
+            return ()
+        # Only permanent callbacks are run when the system is paused
+        return entry[0] if self.process_callbacks else entry[1]
 
     def _install_plugins(self, callback):
         """Installs the current plugins into the given callback.
@@ -24,8 +24,6 @@ import threading
 
 from PyQt5 import QtCore
 
-import sdl2
-
 from . import common, error, event_handler, joystick_handling, macro, util
 
 
@@ -181,70 +179,75 @@ periodic_registry = PeriodicRegistry()
 
 class JoystickWrapper:
 
-    """Wraps SDL2 joysticks and presents an API similar to vjoy."""
+    """Wraps joysticks and presents an API similar to vjoy.
+
+    The state of the inputs is read from the state maintained by the
+    EventListener, as such axis values are calibrated. Joysticks opened via
+    SDL and simulated joysticks are handled alike.
+    """
 
     class Input:
 
         """Represents a joystick input."""
 
-        def __init__(self, joystick, index):
+        def __init__(self, state, index):
             """Creates a new instance.
 
-            :param joystick the SDL joystick instance this input belongs to
+            :param state the DeviceState instance this input belongs to
             :param index the index of the input
             """
-            self._joystick = joystick
+            self._state = state
             self._index = index
 
     class Axis(Input):
 
         """Represents a single axis of a joystick."""
 
-        def __init__(self, joystick, index):
-            super().__init__(joystick, index)
+        def __init__(self, state, index):
+            super().__init__(state, index)
 
         @property
         def value(self):
-            return sdl2.SDL_JoystickGetAxis(
-                self._joystick, self._index
-            ) / float(32768)
+            return self._state.axes[self._index]
 
     class Button(Input):
 
         """Represents a single button of a joystick."""
 
-        def __init__(self, joystick, index):
-            super().__init__(joystick, index)
+        def __init__(self, state, index):
+            super().__init__(state, index)
 
         @property
         def is_pressed(self):
-            return sdl2.SDL_JoystickGetButton(self._joystick, self._index) == 1
+            return self._state.buttons[self._index] == 1
 
     class Hat(Input):
 
         """Represents a single hat of a joystick,"""
 
-        def __init__(self, joystick, index):
-            super().__init__(joystick, index)
+        def __init__(self, state, index):
+            super().__init__(state, index)
 
         @property
         def direction(self):
-            return util.convert_sdl_hat(sdl2.SDL_JoystickGetHat(
-                self._joystick, self._index)
-            )
+            return self._state.hats[self._index]
 
-    def __init__(self, jid):
-        """Creates a new wrapper object for the given object id.
+    def __init__(self, windows_id, name):
+        """Creates a new wrapper object for the given joystick.
 
-        :param jid the id of the joystick instance to wrap
+        :param windows_id the instance id of the joystick to wrap
+        :param name the name of the joystick
         """
-        if jid > sdl2.joystick.SDL_NumJoysticks():
-            raise error.GremlinError("No device with the provided ID exist")
-        self._joystick = sdl2.SDL_JoystickOpen(jid)
+        self._windows_id = windows_id
+        self._state = event_handler.EventListener().device_state(windows_id)
+        if self._state is None:
+            raise error.GremlinError(
+                "No state available for device with ID {}".format(windows_id)
+            )
         self._axis = self._init_axes()
         self._buttons = self._init_buttons()
         self._hats = self._init_hats()
-        self._name = sdl2.joystick.SDL_JoystickNameForIndex(jid).decode("utf-8")
+        self._name = name
 
     @property
     def name(self):
@@ -259,7 +262,7 @@ class JoystickWrapper:
 
         :return system id of this device
         """
-        return sdl2.joystick.SDL_JoystickInstanceID(self._joystick)
+        return self._windows_id
 
     def axis(self, index):
         """Returns the current value of the axis with the given index.
@@ -296,7 +299,7 @@ class JoystickWrapper:
 
         :return number of axes
         """
-        return sdl2.SDL_JoystickNumAxes(self._joystick)
+        return len(self._state.axes)
 
     def _init_axes(self):
         """Initializes the axes of the joystick.
@@ -304,8 +307,8 @@ class JoystickWrapper:
         :return list of JoystickWrapper.Axis objects
         """
         axes = []
-        for i in range(sdl2.SDL_JoystickNumAxes(self._joystick)):
-            axes.append(JoystickWrapper.Axis(self._joystick, i))
+        for i in range(len(self._state.axes)):
+            axes.append(JoystickWrapper.Axis(self._state, i))
         return axes
 
     def _init_buttons(self):
@@ -314,8 +317,8 @@ class JoystickWrapper:
         :return list of JoystickWrapper.Button objects
         """
         buttons = []
-        for i in range(sdl2.SDL_JoystickNumButtons(self._joystick)):
-            buttons.append(JoystickWrapper.Button(self._joystick, i))
+        for i in range(len(self._state.buttons)):
+            buttons.append(JoystickWrapper.Button(self._state, i))
         return buttons
 
     def _init_hats(self):
@@ -324,8 +327,8 @@ class JoystickWrapper:
         :return list of JoystickWrapper.Hat objects
         """
         hats = []
-        for i in range(sdl2.SDL_JoystickNumHats(self._joystick)):
-            hats.append(JoystickWrapper.Hat(self._joystick, i))
+        for i in range(len(self._state.hats)):
+            hats.append(JoystickWrapper.Hat(self._state, i))
         return hats
 
 
@@ -346,13 +349,13 @@ class JoystickProxy:
         :return the corresponding joystick device
         """
         if len(JoystickProxy.joystick_devices) == 0:
-            # The id used to open the device is not the same as the
-            # system_id reported by SDL, hence we grab all devices and
-            # store them using their system_id
-            for i in range(sdl2.joystick.SDL_NumJoysticks()):
-                joy = JoystickWrapper(i)
-                JoystickProxy.joystick_devices[joy.windows_id()] = joy
-                JoystickProxy.joystick_devices[joy.name] = joy
+            # Grab all devices known to the EventListener and store them
+            # using both their system_id and name
+            names = event_handler.EventListener().device_names()
+            for windows_id, name in names.items():
+                joy = JoystickWrapper(windows_id, name)
+                JoystickProxy.joystick_devices[windows_id] = joy
+                JoystickProxy.joystick_devices[name] = joy
 
         if key not in JoystickProxy.joystick_devices:
             raise error.GremlinError(
@@ -432,6 +435,9 @@ class Keyboard(QtCore.QObject):
 
         :param event the keyboard event to use to update state
         """
+        if event.event_type != common.InputType.Keyboard:
+            return
+
         key = macro.key_from_code(
             event.identifier[0],
             event.identifier[1]
@@ -510,12 +516,7 @@ class ButtonReleaseActions(QtCore.QObject):
         QtCore.QObject.__init__(self)
 
         self._registry = {}
-        el = event_handler.EventListener()
-        el.joystick_event.connect(self._input_event_cb)
-        el.keyboard_event.connect(self._input_event_cb)
-        eh = event_handler.EventHandler()
-        self._current_mode = eh.active_mode
-        eh.mode_changed.connect(self._mode_changed_cb)
+        event_handler.EventDispatcher().connect(self._input_event_cb)
 
     def register_callback(self, callback, physical_event):
         """Registers a callback with the system.
@@ -529,7 +530,9 @@ class ButtonReleaseActions(QtCore.QObject):
 
         if release_evt not in self._registry:
             self._registry[release_evt] = []
-        self._registry[release_evt].append((callback, self._current_mode))
+        self._registry[release_evt].append(
+            (callback, event_handler.EventHandler().active_mode)
+        )
 
     def register_button_release(self, vjoy_input, physical_event):
         """Registers a physical and vjoy button pair for tracking.
@@ -566,18 +569,12 @@ class ButtonReleaseActions(QtCore.QObject):
         :param evt the event to process
         """
         if evt in self._registry and not evt.is_pressed:
+            current_mode = event_handler.EventHandler().active_mode
             for entry in self._registry[evt]:
-                if entry[1] != self._current_mode:
+                if entry[1] != current_mode:
                     entry[0]()
             self._registry[evt] = []
 
-    def _mode_changed_cb(self, mode):
-        """Updates the current mode variable.
-
-        :param mode the new mode
-        """
-        self._current_mode = mode
-
 
 @common.SingletonDecorator
 class JoystickInputSignificant:
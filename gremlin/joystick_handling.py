@@ -151,35 +151,47 @@ def joystick_devices():
 
     syslog.debug("{:d} joysticks found".format(sdl2.SDL_NumJoysticks()))
 
-    # Get all connected devices
+    # Get all connected devices, reusing the information of devices which
+    # are already known
+    known_devices = {dev.windows_id: dev for dev in _joystick_devices}
     devices = []
     for i in range(sdl2.SDL_NumJoysticks()):
         joy = sdl2.SDL_JoystickOpen(i)
         if joy is None:
             syslog.error("Invalid joystick device at id {}".format(i))
+            continue
+
+        instance_id = sdl2.SDL_JoystickInstanceID(joy)
+        if instance_id in known_devices:
+            # Opening a joystick twice only increments its reference count
+            sdl2.SDL_JoystickClose(joy)
+            devices.append(known_devices[instance_id])
         else:
             devices.append(JoystickDeviceData(joy))
 
     # Compare existing versus observed devices and only proceed if there
     # is a difference
-    device_added = False
-    device_removed = False
-    for new_dev in devices:
-        if new_dev not in _joystick_devices:
-            device_added = True
-            syslog.debug("Added: name={} windows_id={:d}".format(
-                new_dev.name,
-                new_dev.windows_id
-            ))
-    for old_dev in _joystick_devices:
-        if old_dev not in devices:
-            device_removed = True
-            syslog.debug("Removed: name={} windows_id={:d}".format(
-                new_dev.name,
-                new_dev.windows_id
-            ))
-
-    if not device_added and not device_removed:
+    added_devices = [dev for dev in devices if dev not in _joystick_devices]
+    removed_devices = [dev for dev in _joystick_devices if dev not in devices]
+    for new_dev in added_devices:
+        syslog.debug("Added: name={} windows_id={:d}".format(
+            new_dev.name,
+            new_dev.windows_id
+        ))
+    for old_dev in removed_devices:
+        syslog.debug("Removed: name={} windows_id={:d}".format(
+            old_dev.name,
+            old_dev.windows_id
+        ))
+
+    if len(added_devices) == 0 and len(removed_devices) == 0:
+        return _joystick_devices
+
+    # Matching virtual devices to vJoy devices requires acquiring every vJoy
+    # device, which is only needed if the set of virtual devices changed.
+    # Devices that were already known retain their existing vJoy mapping.
+    if not any(dev.is_virtual for dev in added_devices + removed_devices):
+        _joystick_devices = devices
         return _joystick_devices
 
     # Create hashes based on number of inputs for each virtual device. As we
@@ -0,0 +1,223 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import enum
+import threading
+import time
+
+from . import common
+
+
+class Stage(enum.Enum):
+
+    """Enumeration of the stages at which latencies are measured."""
+
+    Ingestion = 1   # Time an event waited in the SDL queue
+    Dispatch = 2    # Time from ingestion until the event handler runs
+    Handler = 3     # Time spent processing the event in the event handler
+    Container = 4   # Time spent executing a single container
+    Output = 5      # Time from ingestion until a vJoy value is written
+
+
+# Mapping from Stage values to their textual representation
+stage_to_name = {
+    Stage.Ingestion: "SDL queue",
+    Stage.Dispatch: "Dispatch",
+    Stage.Handler: "Event handler",
+    Stage.Container: "Container",
+    Stage.Output: "vJoy output",
+}
+
+
+class RollingHistogram:
+
+    """Stores the most recent samples of a measurement."""
+
+    __slots__ = ["description", "_samples"]
+
+    def __init__(self, description, size):
+        """Creates a new instance.
+
+        :param description tuple describing the measured quantity
+        :param size the number of samples to retain
+        """
+        self.description = description
+        self._samples = collections.deque(maxlen=size)
+
+    def add(self, value):
+        """Adds a new sample, discarding the oldest one if needed.
+
+        :param value the sample to add
+        """
+        self._samples.append(value)
+
+    def percentiles(self, *percentages):
+        """Returns the percentiles of the retained samples.
+
+        :param percentages the percentiles to compute in the range [0, 100]
+        :return list of percentile values in the order of the requested
+            percentages
+        """
+        samples = sorted(self._samples)
+        if len(samples) == 0:
+            return [0.0] * len(percentages)
+
+        last = len(samples) - 1
+        return [
+            samples[min(last, int(round(last * p / 100.0)))]
+            for p in percentages
+        ]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+@common.SingletonDecorator
+class LatencyRecorder:
+
+    """Records how long input events take to pass through the system.
+
+    Recording is disabled by default, in which case the instrumented code
+    only pays the cost of checking the enabled flag.
+    """
+
+    def __init__(self, window_size=1000):
+        """Creates a new instance.
+
+        :param window_size the number of samples retained per measurement
+        """
+        self.enabled = False
+        self.window_size = window_size
+        self._histograms = {}
+        self._local = threading.local()
+
+    def record(self, stage, event, duration, detail=None):
+        """Records the duration of a stage for the given event.
+
+        :param stage the Stage that was measured
+        :param event the event that was being processed
+        :param duration the measured duration in seconds
+        :param detail optional description further qualifying the
+            measurement, such as the container being executed
+        """
+        key = (stage, event.__hash__(), detail)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms.setdefault(key, RollingHistogram(
+                (
+                    stage,
+                    event.hardware_id,
+                    event.windows_id,
+                    event.event_type,
+                    event.identifier,
+                    detail
+                ),
+                self.window_size
+            ))
+        histogram.add(duration)
+
+    def set_current_event(self, event):
+        """Sets the event being processed by the calling thread.
+
+        Output written by the calling thread is attributed to this event
+        until a different one is set.
+
+        :param event the event being processed, None if there is none
+        """
+        self._local.event = event
+
+    def record_output(self):
+        """Records the time between ingestion of the current event and now.
+
+        Called whenever a vJoy value is written, nothing is recorded if the
+        calling thread is not processing an input event.
+        """
+        event = getattr(self._local, "event", None)
+        if event is not None and event.received is not None:
+            self.record(
+                Stage.Output,
+                event,
+                time.perf_counter() - event.received
+            )
+
+    def reset(self):
+        """Removes all recorded samples."""
+        self._histograms = {}
+
+    def statistics(self):
+        """Returns the percentiles of all measurements.
+
+        :return list of tuples containing the description of each
+            measurement, the number of samples and the p50, p95 and p99
+            values in seconds
+        """
+        result = []
+        for histogram in list(self._histograms.values()):
+            result.append((
+                histogram.description,
+                len(histogram),
+                *histogram.percentiles(50, 95, 99)
+            ))
+        return sorted(
+            result,
+            key=lambda x: (
+                x[0][0].value, x[0][1], x[0][3].value, str(x[0][4])
+            )
+        )
+
+    def dump(self, fname):
+        """Writes the current statistics to a CSV file.
+
+        :param fname path of the file to write the statistics to
+        """
+        with open(fname, "w") as out:
+            out.write(
+                "stage,hardware_id,windows_id,input_type,identifier,detail,"
+                "samples,p50_ms,p95_ms,p99_ms\n"
+            )
+            line = "{},{:d},{:d},{},{},{},{:d},{:.3f},{:.3f},{:.3f}\n"
+            for description, count, p50, p95, p99 in self.statistics():
+                stage, hardware_id, windows_id, input_type, identifier, \
+                    detail = description
+                out.write(line.format(
+                    stage_to_name[stage],
+                    hardware_id,
+                    windows_id,
+                    common.input_type_to_name[input_type],
+                    format_identifier(input_type, identifier),
+                    "" if detail is None else detail,
+                    count,
+                    p50 * 1000.0,
+                    p95 * 1000.0,
+                    p99 * 1000.0
+                ))
+
+
+def format_identifier(input_type, identifier):
+    """Returns a textual representation of an input identifier.
+
+    :param input_type the type of the input
+    :param identifier the identifier of the input
+    :return string representing the identifier
+    """
+    if input_type == common.InputType.Keyboard:
+        return "0x{:X}{}".format(
+            identifier[0],
+            " ext" if identifier[1] else ""
+        )
+    return str(identifier)
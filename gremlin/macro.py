@@ -18,17 +18,23 @@
 import collections
 import ctypes
 from ctypes import wintypes
-import functools
+import heapq
 import logging
+import queue
 import time
-from threading import Event, Thread
+from threading import Condition, Lock, Thread
 from xml.etree import ElementTree
 
-import win32con
-import win32api
-
 import gremlin
 
+try:
+    import win32con
+    import win32api
+except ImportError:
+    # Without pywin32, i.e. on other platforms, key presses are recorded
+    # by a stand-in instead of being sent
+    from gremlin.win32_stand_in import win32con, win32api
+
 
 # Default delay between subsequent message dispatch. This is to get
 # around some games not picking up messages if they are sent in too
@@ -36,9 +42,20 @@ import gremlin
 default_delay = 0.05
 
 
+# Compiled step of a macro, performed by calling opcode(*args) at offset
+# seconds after the start of the macro. Steps pressing or releasing a key or
+# button identify the input, steps pressing one also hold the opcode and
+# arguments releasing it.
+MacroStep = collections.namedtuple(
+    "MacroStep",
+    ["offset", "opcode", "args", "input_id", "release"]
+)
+
+# Queued run of a macro, runs queued before the macro was last terminated
+# have an outdated generation
 MacroEntry = collections.namedtuple(
     "MacroEntry",
-    ["macro", "state"]
+    ["macro", "generation"]
 )
 
 
@@ -51,6 +68,10 @@ def _create_function(lib_name, fn_name, param_types, return_type):
     :param return_type retuyrn parameter type
     :return function handle
     """
+    if not hasattr(ctypes, "WinDLL"):
+        from gremlin.win32_stand_in import dll_functions
+        return dll_functions[(lib_name, fn_name)]
+
     fn = getattr(ctypes.WinDLL(lib_name), fn_name)
     fn.argtypes = param_types
     fn.restype = return_type
@@ -213,159 +234,369 @@ def _send_key_up(key):
     win32api.keybd_event(key.virtual_code, key.scan_code, flags, 0)
 
 
+class MacroExecutor:
+
+    """Executes macros on a fixed pool of worker threads.
+
+    A macro run is a generator performing the macro's actions and yielding
+    the duration of every pause. Each step following a pause is scheduled
+    at an absolute deadline, the deadline of the previous step plus the
+    pause's duration, such that the inaccuracy of timers does not
+    accumulate over the course of a macro. A timer thread keeps the
+    pending steps ordered by deadline and hands them to the workers once
+    they are due.
+    """
+
+    # Number of threads executing macro steps
+    worker_count = 4
+
+    # Margin in seconds by which a step may run early, covering the
+    # inaccuracy of timers
+    timer_tolerance = 0.001
+
+    def __init__(self):
+        """Creates a new instance."""
+        self._pending = []
+        self._pending_count = 0
+        self._condition = Condition()
+        self._work_queue = queue.SimpleQueue()
+        self._is_running = False
+        self._timer_thread = None
+        self._worker_threads = []
+
+    def start(self):
+        """Starts the timer and worker threads."""
+        if self._is_running:
+            return
+        self._is_running = True
+        self._timer_thread = Thread(target=self._run_timer, daemon=True)
+        self._timer_thread.start()
+        self._worker_threads = [
+            Thread(target=self._run_worker, daemon=True)
+            for _ in range(self.worker_count)
+        ]
+        for thread in self._worker_threads:
+            thread.start()
+
+    def stop(self):
+        """Stops all threads and cancels every pending macro run.
+
+        Cancelled runs release the keys and buttons they still hold, such
+        that no input remains pressed, without performing their remaining
+        steps.
+        """
+        if not self._is_running:
+            return
+        with self._condition:
+            self._is_running = False
+            self._condition.notify()
+        self._timer_thread.join()
+        self._timer_thread = None
+        for _ in self._worker_threads:
+            self._work_queue.put(None)
+        for thread in self._worker_threads:
+            thread.join()
+        self._worker_threads = []
+
+        while len(self._pending) > 0:
+            run = heapq.heappop(self._pending)[2]
+            try:
+                run.close()
+            except Exception:
+                logging.getLogger("system").exception(
+                    "Error while cancelling a macro"
+                )
+
+    def execute(self, run):
+        """Executes a macro run starting immediately.
+
+        :param run generator performing the macro's actions and yielding
+            the duration in seconds of each pause
+        """
+        self._schedule(time.perf_counter(), run)
+
+    def _schedule(self, deadline, run):
+        """Schedules the next step of a macro run.
+
+        :param deadline time at which to perform the step
+        :param run the generator of the macro run
+        """
+        with self._condition:
+            self._pending_count += 1
+            heapq.heappush(
+                self._pending,
+                (deadline, self._pending_count, run)
+            )
+            self._condition.notify()
+
+    def _run_timer(self):
+        """Hands steps to the workers as they become due."""
+        with self._condition:
+            while self._is_running:
+                if len(self._pending) == 0:
+                    self._condition.wait()
+                    continue
+
+                remaining = self._pending[0][0] - time.perf_counter()
+                if remaining > self.timer_tolerance:
+                    self._condition.wait(remaining)
+                    continue
+
+                deadline, _, run = heapq.heappop(self._pending)
+                self._work_queue.put((deadline, run))
+
+    def _run_worker(self):
+        """Performs the steps handed over by the timer thread."""
+        while True:
+            item = self._work_queue.get()
+            if item is None:
+                return
+
+            deadline, run = item
+            try:
+                duration = next(run)
+            except StopIteration:
+                continue
+            except Exception:
+                logging.getLogger("system").exception(
+                    "Error while executing a macro"
+                )
+                run.close()
+                continue
+
+            # Steps delayed by more than the pause are not caught up on,
+            # as that would shorten the pauses required between inputs
+            self._schedule(
+                max(deadline + duration, time.perf_counter()),
+                run
+            )
+
+
 @gremlin.common.SingletonDecorator
 class MacroManager:
 
-    """Manages the proper dispatching and scheduling of macros."""
+    """Manages the proper dispatching and scheduling of macros.
+
+    Queued macros are dispatched in order. A macro which is already running
+    waits in a queue of its own until its current run ends, without
+    holding up other macros. An exclusive macro waits until no other macro
+    is running and no other macro is dispatched while it runs. All state is
+    protected by a single lock, as macros are queued from the event
+    processing threads and complete on the executor's threads.
+    """
 
     def __init__(self):
         """Initializes the instance."""
-        self._queue = []
+        self._lock = Lock()
+        self._queue = collections.deque()
+        self._waiting = {}
         self._active = {}
         self._flags = {}
+        self._generations = {}
+        self._exclusive_active = False
 
         self._is_running = False
-        self._schedule_event = Event()
-
-        self._run_scheduler_thread = None
+        self._executor = MacroExecutor()
 
     def start(self):
         """Starts the scheduler."""
-        self._active = {}
-        self._flags = {}
-        self._is_running = True
-        if self._run_scheduler_thread is None:
-            self._run_scheduler_thread = Thread(target=self._run_scheduler)
-        if not self._run_scheduler_thread.is_alive():
-            self._run_scheduler_thread.start()
+        with self._lock:
+            self._active = {}
+            self._flags = {}
+            self._exclusive_active = False
+            self._is_running = True
+            self._executor.start()
+            self._schedule()
 
     def stop(self):
         """Stops the scheduler."""
-        self._is_running = False
-        if self._run_scheduler_thread is not None and \
-                self._run_scheduler_thread.is_alive():
-
-            # Terminate the scheduler
-            self._schedule_event.set()
-            self._run_scheduler_thread.join()
-            self._run_scheduler_thread = None
+        with self._lock:
+            self._is_running = False
+            self._queue.clear()
+            self._waiting = {}
 
             # Terminate any macro that is still active
             for key, value in self._flags.items():
                 self._flags[key] = False
+        self._executor.stop()
+
+        # Compiled macros may refer to vJoy devices which are about to be
+        # released
+        Macro.invalidate_compiled()
 
     def queue_macro(self, macro):
         """Queues a macro in the schedule taking the repeat type into account.
 
         :param macro the macro to add to the scheduler
         """
-        if isinstance(macro.repeat, ToggleRepeat) and macro.id in self._active:
-            self.terminate_macro(macro)
-        else:
-            # Preprocess macro to contain pauses as neccessary
-            self._preprocess_macro(macro)
-            self._queue.append(MacroEntry(macro, True))
-            self._schedule_event.set()
+        with self._lock:
+            if isinstance(macro.repeat, ToggleRepeat) and \
+                    macro.id in self._active:
+                self._terminate_macro(macro)
+            else:
+                self._queue.append(
+                    MacroEntry(macro, self._generations.get(macro.id, 0))
+                )
+                self._schedule()
 
     def terminate_macro(self, macro):
-        """Adds a termination request for a macro to the execution queue.
+        """Terminates a repeating macro.
+
+        Stops the repetition of the macro if it is running, otherwise
+        prevents queued runs of it from being started.
 
         :param macro the macro to terminate
         """
-        self._queue.append(MacroEntry(macro, False))
-        self._schedule_event.set()
-
-    def _run_scheduler(self):
-        """Dispatches macros as required."""
-        while self._is_running:
-            # Wake up when the event triggers and reset it
-            self._schedule_event.wait()
-            self._schedule_event.clear()
-
-            # Run scheduled macros and ensure exclusive ones run separately
-            # from all other macros
-            for i, entry in enumerate(self._queue):
-                if entry.state == False:
-                    self._flags[entry.macro.id] = False
-                    del self._queue[i]
-                elif entry.macro.id in self._active:
-                    # print(time.time(), len(self._queue))
-                    continue
-                elif entry.macro.exclusive:
-                    if len(self._active) == 0:
-                        self._dispatch_macro(entry.macro)
-                        del self._queue[i]
-                    break
-                else:
-                    self._dispatch_macro(entry.macro)
-                    del self._queue[i]
+        with self._lock:
+            self._terminate_macro(macro)
+
+    def _terminate_macro(self, macro):
+        """Terminates a repeating macro, the lock has to be held.
+
+        :param macro the macro to terminate
+        """
+        if macro.repeat is None:
+            return
+
+        # Runs queued before the termination are invalidated
+        self._generations[macro.id] = self._generations.get(macro.id, 0) + 1
+        if macro.id in self._flags:
+            self._flags[macro.id] = False
+
+    def _schedule(self):
+        """Dispatches queued macros as allowed, the lock has to be held.
+
+        Every queued run is either dispatched, moved to the queue of its
+        running macro, or dropped due to a termination, unless an exclusive
+        macro is running or the run at the front of the queue is an
+        exclusive macro that has to wait for running macros to finish.
+        """
+        queue = self._queue
+        while self._is_running and len(queue) > 0 and \
+                not self._exclusive_active:
+            entry = queue[0]
+            macro = entry.macro
+            if entry.generation != self._generations.get(macro.id, 0):
+                queue.popleft()
+            elif macro.id in self._active:
+                queue.popleft()
+                if macro.id not in self._waiting:
+                    self._waiting[macro.id] = collections.deque()
+                self._waiting[macro.id].append(entry)
+            elif macro.exclusive and len(self._active) > 0:
+                break
+            else:
+                queue.popleft()
+                self._dispatch_macro(macro)
 
     def _dispatch_macro(self, macro):
-        """Dispatches a single macro to be run.
+        """Dispatches a single macro to be run, the lock has to be held.
 
         :param macro the macro to dispatch
         """
-        if macro.id not in self._active:
-            self._active[macro.id] = macro
-            Thread(target=functools.partial(self._execute_macro, macro)).start()
-        else:
-            logging.getLogger("system").warning(
-                "Attempting to dispatch an already running macro"
-            )
+        self._active[macro.id] = macro
+        self._exclusive_active = macro.exclusive
+        if macro.repeat is not None:
+            self._flags[macro.id] = True
+        self._executor.execute(self._execute_macro(macro))
+
+    def _complete_macro(self, macro):
+        """Removes a macro whose run ended and dispatches waiting ones.
+
+        :param macro the macro whose run ended
+        """
+        with self._lock:
+            del self._active[macro.id]
+            if macro.id in self._flags:
+                del self._flags[macro.id]
+            if macro.exclusive:
+                self._exclusive_active = False
+
+            # The next run of the same macro takes precedence over runs
+            # queued after it, skipping runs invalidated by a termination
+            waiting = self._waiting.get(macro.id)
+            generation = self._generations.get(macro.id, 0)
+            while waiting is not None and len(waiting) > 0:
+                entry = waiting.popleft()
+                if entry.generation == generation:
+                    self._queue.appendleft(entry)
+                    break
+            if waiting is not None and len(waiting) == 0:
+                del self._waiting[macro.id]
+
+            self._schedule()
 
     def _execute_macro(self, macro):
-        """Executes a given macro in a separate thread.
+        """Executes a given macro on the executor.
 
-        This method will run all provided actions and once they all have been
-        executed will remove the macro from the set of active macros and
-        inform the scheduler of the completion.
+        This generator will run all provided actions, yielding the duration
+        of every pause, and once they all have been executed will remove
+        the macro from the set of active macros and inform the scheduler of
+        the completion.
 
         :param macro the macro object to be executed
         """
-        # Handle macros with a repeat mode
-        if macro.repeat is not None:
-            delay = macro.repeat.delay
+        try:
+            # Handle macros with a repeat mode
+            if macro.repeat is not None:
+                delay = macro.repeat.delay
+
+                # Handle count repeat mode
+                if isinstance(macro.repeat, CountRepeat):
+                    count = 0
+                    while count < macro.repeat.count and \
+                            self._flags[macro.id]:
+                        yield from self._execute_sequence(macro)
+                        count += 1
+                        yield delay
+
+                # Handle continuous repeat modes
+                elif type(macro.repeat) in [HoldRepeat, ToggleRepeat]:
+                    while self._flags[macro.id]:
+                        yield from self._execute_sequence(macro)
+                        yield delay
+
+            # Handle simple one shot macros
+            else:
+                yield from self._execute_sequence(macro)
 
-            self._flags[macro.id] = True
+        finally:
+            self._complete_macro(macro)
 
-            # Handle count repeat mode
-            if isinstance(macro.repeat, CountRepeat):
-                count = 0
-                while count < macro.repeat.count and self._flags[macro.id]:
-                    for action in macro.sequence:
-                        action()
-                    count += 1
-                    time.sleep(delay)
-
-            # Handle continuous repeat modes
-            elif type(macro.repeat) in [HoldRepeat, ToggleRepeat]:
-                while self._flags[macro.id]:
-                    for action in macro.sequence:
-                        action()
-                    time.sleep(delay)
-
-        # Handle simple one shot macros
-        else:
-            for action in macro.sequence:
-                action()
+    def _execute_sequence(self, macro):
+        """Performs the compiled steps of a macro once.
 
-        # Remove macro from active set, notify manager, and remove any
-        # potential callbacks
-        del self._active[macro.id]
-        if macro.id in self._flags:
-            del self._flags[macro.id]
-        self._schedule_event.set()
-
-    def _preprocess_macro(self, macro):
-        """Inserts pauses as neccessary into the macro."""
-        new_sequence = [macro.sequence[0]]
-        for a1, a2 in zip(macro.sequence[:-1], macro.sequence[1:]):
-            if isinstance(a1, PauseAction) or isinstance(a2, PauseAction):
-                new_sequence.append(a2)
-            else:
-                new_sequence.append(PauseAction(default_delay))
-                new_sequence.append(a2)
-        macro._sequence = new_sequence
+        Instead of pausing the time until the next step is yielded. If the
+        run is cancelled the keys and buttons pressed by it and not yet
+        released are released.
+
+        :param macro the macro whose steps to perform
+        """
+        steps, duration = macro.compiled
+        offset = 0.0
+        held = {}
+        try:
+            for step in steps:
+                if step.offset > offset:
+                    yield step.offset - offset
+                    offset = step.offset
+                step.opcode(*step.args)
+                if step.input_id is not None:
+                    if step.release is None:
+                        held.pop(step.input_id, None)
+                    else:
+                        held[step.input_id] = step.release
+            if duration > offset:
+                yield duration - offset
+        except GeneratorExit:
+            for opcode, args in held.values():
+                try:
+                    opcode(*args)
+                except Exception:
+                    logging.getLogger("system").exception(
+                        "Error while releasing the input of a macro"
+                    )
+            raise
 
 
 class Macro:
@@ -375,6 +606,14 @@ class Macro:
     # Unique identifier for each macro
     _next_macro_id = 0
 
+    # Incremented to force all macros to be compiled again
+    _compile_generation = 0
+
+    @classmethod
+    def invalidate_compiled(cls):
+        """Forces every macro to be compiled again before its next use."""
+        cls._compile_generation += 1
+
     def __init__(self):
         """Creates a new macro instance."""
         self._sequence = []
@@ -382,6 +621,8 @@ class Macro:
         Macro._next_macro_id += 1
         self.repeat = None
         self.exclusive = False
+        self._compiled = None
+        self._compiled_generation = None
 
     @property
     def id(self):
@@ -399,12 +640,57 @@ class Macro:
         """
         return self._sequence
 
+    @property
+    def compiled(self):
+        """Returns the compiled form of the macro, compiling it if needed.
+
+        :return list of MacroStep instances and the total duration of the
+            macro in seconds
+        """
+        if self._compiled is None or \
+                self._compiled_generation != Macro._compile_generation:
+            self.compile()
+        return self._compiled
+
+    def compile(self):
+        """Compiles the action sequence into timed steps.
+
+        Pauses are turned into the offsets of the following steps, with
+        the default delay separating actions not separated by a pause, and
+        every action resolves the handles it requires once.
+        """
+        steps = []
+        offset = 0.0
+        previous = None
+        for action in self._sequence:
+            if isinstance(action, PauseAction):
+                offset += action.duration
+            else:
+                if previous is not None and \
+                        not isinstance(previous, PauseAction):
+                    offset += default_delay
+                opcode, args = action.compile()
+                release = action.release_action()
+                if release is not None:
+                    release = release.compile()
+                steps.append(MacroStep(
+                    offset,
+                    opcode,
+                    args,
+                    action.input_identifier(),
+                    release
+                ))
+            previous = action
+        self._compiled = (steps, offset)
+        self._compiled_generation = Macro._compile_generation
+
     def add_action(self, action):
         """Adds an action to the list of actions to perform.
 
         :param action the action to add
         """
         self._sequence.append(action)
+        self._compiled = None
 
     def pause(self, duration):
         """Adds a pause of the given duration to the macro.
@@ -412,6 +698,7 @@ class Macro:
         :param duration the duration of the pause in seconds
         """
         self._sequence.append(PauseAction(duration))
+        self._compiled = None
 
     def press(self, key):
         """Presses the specified key down.
@@ -450,6 +737,7 @@ class Macro:
             raise gremlin.error.KeyboardError("Invalid key specified")
 
         self._sequence.append(KeyAction(key, is_pressed))
+        self._compiled = None
 
 
 class AbstractAction:
@@ -461,6 +749,34 @@ class AbstractAction:
             "AbstractAction.__call__ not implemented in derived class."
         )
 
+    def compile(self):
+        """Returns the operation performing this action.
+
+        Derived classes resolve the handles they require such that the
+        returned operation does not have to.
+
+        :return function performing the action and the arguments to call
+            it with
+        """
+        return self, ()
+
+    def input_identifier(self):
+        """Returns the key or button pressed or released by this action.
+
+        :return hashable identifier of the key or button, None if the
+            action does not press or release one
+        """
+        return None
+
+    def release_action(self):
+        """Returns the action releasing the key or button this action
+        presses.
+
+        :return action releasing the pressed input, None if the action
+            does not press a key or button
+        """
+        return None
+
 
 class JoystickAction(AbstractAction):
 
@@ -498,7 +814,32 @@ class JoystickAction(AbstractAction):
                 identifier=self.input_id,
                 value=self.value
             )
-        el.joystick_event.emit(event)
+        el.emit_joystick_event(event)
+
+    def input_identifier(self):
+        """Returns the button pressed or released by this action.
+
+        :return identifier of the button, None if the action does not
+            affect a button
+        """
+        if self.input_type != gremlin.common.InputType.JoystickButton:
+            return None
+        return "joystick", self.device_id, self.input_id
+
+    def release_action(self):
+        """Returns the action releasing the button this action presses.
+
+        :return action releasing the button, None if the action does not
+            press a button
+        """
+        if self.input_identifier() is None or not self.value:
+            return None
+        return JoystickAction(
+            self.device_id,
+            self.input_type,
+            self.input_id,
+            False
+        )
 
 
 class VJoyAction(AbstractAction):
@@ -527,6 +868,57 @@ class VJoyAction(AbstractAction):
         elif self.input_type == gremlin.common.InputType.JoystickHat:
             vjoy.hat(self.input_id).direction = self.value
 
+    def compile(self):
+        """Returns the operation setting the vJoy input.
+
+        If the vJoy device is not available the input is resolved whenever
+        the action is performed.
+
+        :return function performing the action and the arguments to call
+            it with
+        """
+        try:
+            vjoy = gremlin.joystick_handling.VJoyProxy()[self.vjoy_id]
+            if self.input_type == gremlin.common.InputType.JoystickAxis:
+                return setattr, (vjoy.axis(self.input_id), "value", self.value)
+            elif self.input_type == gremlin.common.InputType.JoystickButton:
+                return setattr, (
+                    vjoy.button(self.input_id),
+                    "is_pressed",
+                    self.value
+                )
+            elif self.input_type == gremlin.common.InputType.JoystickHat:
+                return setattr, (
+                    vjoy.hat(self.input_id),
+                    "direction",
+                    self.value
+                )
+        except gremlin.error.VJoyError as e:
+            logging.getLogger("system").warning(
+                "Unable to resolve vJoy input of macro: {}".format(e)
+            )
+        return self, ()
+
+    def input_identifier(self):
+        """Returns the vJoy button pressed or released by this action.
+
+        :return identifier of the button, None if the action does not
+            affect a button
+        """
+        if self.input_type != gremlin.common.InputType.JoystickButton:
+            return None
+        return "vjoy", self.vjoy_id, self.input_id
+
+    def release_action(self):
+        """Returns the action releasing the button this action presses.
+
+        :return action releasing the button, None if the action does not
+            press a button
+        """
+        if self.input_identifier() is None or not self.value:
+            return None
+        return VJoyAction(self.vjoy_id, self.input_type, self.input_id, False)
+
 
 class KeyAction(AbstractAction):
 
@@ -552,6 +944,38 @@ class KeyAction(AbstractAction):
         else:
             _send_key_up(self.key)
 
+    def compile(self):
+        """Returns the operation sending the key event.
+
+        :return function performing the action and the arguments to call
+            it with
+        """
+        flags = win32con.KEYEVENTF_EXTENDEDKEY if self.key.is_extended else 0
+        if not self.is_pressed:
+            flags |= win32con.KEYEVENTF_KEYUP
+        return win32api.keybd_event, (
+            self.key.virtual_code,
+            self.key.scan_code,
+            flags,
+            0
+        )
+
+    def input_identifier(self):
+        """Returns the key pressed or released by this action.
+
+        :return the Key instance of the action
+        """
+        return self.key
+
+    def release_action(self):
+        """Returns the action releasing the key this action presses.
+
+        :return action releasing the key, None if the action releases it
+        """
+        if not self.is_pressed:
+            return None
+        return KeyAction(self.key, False)
+
 
 class PauseAction(AbstractAction):
 
@@ -148,9 +148,9 @@ class Repeater(QtCore.QObject):
         # Repeatedly send events until the thread is interrupted
         while self.is_running:
             if self._events[0].event_type == common.InputType.Keyboard:
-                el.keyboard_event.emit(self._events[index])
+                el.emit_keyboard_event(self._events[index])
             else:
-                el.joystick_event.emit(self._events[index])
+                el.emit_joystick_event(self._events[index])
 
             self._update_func("{} {}".format(
                 common.input_type_to_name[self._events[index].event_type],
@@ -174,6 +174,6 @@ class Repeater(QtCore.QObject):
                 input_devices.JoystickInputSignificant().last_event(event).value
         elif event.event_type == common.InputType.JoystickHat:
             event.value = (0, 0)
-        el.joystick_event.emit(event)
+        el.emit_joystick_event(event)
         self._event_registry = {}
         self._update_func("Waiting for input")
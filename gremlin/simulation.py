@@ -0,0 +1,178 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import queue
+import time
+
+from . import common, event_handler
+
+
+# Description of a simulated joystick
+SimulatedJoystick = collections.namedtuple(
+    "SimulatedJoystick",
+    [
+        "name",
+        "hardware_id",
+        "windows_id",
+        "axis_count",
+        "button_count",
+        "hat_count"
+    ]
+)
+
+# Single entry of an input script, the time is given in seconds relative to
+# the start of the script. Axis values are in the range [-1, 1], button and
+# key values are booleans and hat values (x, y) direction tuples. Keyboard
+# entries use a windows_id of 0 and (scan_code, is_extended) identifiers.
+ScriptEntry = collections.namedtuple(
+    "ScriptEntry",
+    ["time", "windows_id", "input_type", "identifier", "value"]
+)
+
+
+class ScriptedEventSource:
+
+    """Provides input events from scripts instead of SDL and the keyboard.
+
+    The source simulates joysticks and replays scripts of input events
+    with their original timing, allowing profiles to be run without any
+    input devices being present. It is used by passing it to the
+    EventListener when the listener is first created. Scripts
+    are replayed by the listener's thread in the order they are played.
+    """
+
+    def __init__(self, joysticks):
+        """Creates a new instance.
+
+        :param joysticks list of SimulatedJoystick instances to simulate
+        """
+        self.joysticks = {joy.windows_id: joy for joy in joysticks}
+        self._states = {}
+        self._scripts = queue.Queue()
+
+    def attach(self, listener):
+        """Registers the simulated joysticks with the listener.
+
+        :param listener the EventListener using this source
+        """
+        for joy in self.joysticks.values():
+            state = event_handler.DeviceState(
+                joy.axis_count,
+                joy.button_count,
+                joy.hat_count
+            )
+            self._states[joy.windows_id] = state
+            listener.add_device_state(joy.windows_id, state, joy.name)
+
+    def play(self, script, realtime=True):
+        """Queues a script for replay.
+
+        :param script list of ScriptEntry instances ordered by time
+        :param realtime if True the timing of the entries is reproduced,
+            otherwise all entries are replayed as fast as possible
+        """
+        self._scripts.put((script, realtime))
+
+    def wait(self):
+        """Blocks until all queued scripts have been replayed."""
+        self._scripts.join()
+
+    def process(self, listener, timeout):
+        """Replays the next queued script.
+
+        :param listener the EventListener publishing the events
+        :param timeout time in seconds to wait for a script to be queued
+        """
+        try:
+            script, realtime = self._scripts.get(timeout=timeout)
+        except queue.Empty:
+            return
+
+        try:
+            start = time.perf_counter()
+            for entry in script:
+                if realtime:
+                    delay = start + entry.time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                self._publish(listener, entry, start)
+        finally:
+            self._scripts.task_done()
+
+    def _publish(self, listener, entry, start):
+        """Publishes the event described by a script entry.
+
+        :param listener the EventListener publishing the event
+        :param entry the ScriptEntry to publish
+        :param start time at which the replay of the script started
+        """
+        received = time.perf_counter()
+        timestamp = int((received - start) * 1000)
+
+        if entry.input_type == common.InputType.Keyboard:
+            listener.emit_keyboard_event(event_handler.Event(
+                event_type=common.InputType.Keyboard,
+                hardware_id=0,
+                windows_id=0,
+                identifier=entry.identifier,
+                is_pressed=entry.value,
+                timestamp=timestamp,
+                received=received
+            ))
+            return
+
+        joy = self.joysticks[entry.windows_id]
+        state = self._states[entry.windows_id]
+        index = entry.identifier - 1
+        if entry.input_type == common.InputType.JoystickAxis:
+            state.axes[index] = entry.value
+            event = event_handler.Event(
+                event_type=entry.input_type,
+                hardware_id=joy.hardware_id,
+                windows_id=joy.windows_id,
+                identifier=entry.identifier,
+                value=entry.value,
+                raw_value=int(entry.value * 32767),
+                timestamp=timestamp,
+                received=received
+            )
+        elif entry.input_type == common.InputType.JoystickButton:
+            state.buttons[index] = 1 if entry.value else 0
+            event = event_handler.Event(
+                event_type=entry.input_type,
+                hardware_id=joy.hardware_id,
+                windows_id=joy.windows_id,
+                identifier=entry.identifier,
+                is_pressed=entry.value,
+                timestamp=timestamp,
+                received=received
+            )
+        elif entry.input_type == common.InputType.JoystickHat:
+            state.hats[index] = entry.value
+            event = event_handler.Event(
+                event_type=entry.input_type,
+                hardware_id=joy.hardware_id,
+                windows_id=joy.windows_id,
+                identifier=entry.identifier,
+                value=entry.value,
+                timestamp=timestamp,
+                received=received
+            )
+        else:
+            return
+        listener.emit_joystick_event(event)
@@ -16,9 +16,16 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import array
+import bisect
 import collections
 import gremlin.util
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 # Named tuple to facilitate working with 2D coordinates
 Point2D = collections.namedtuple("Point2D", ["x", "y"])
@@ -29,7 +36,10 @@ class CubicSpline:
     """Creates a new cubic spline based interpolation.
     
     The methods requires a set of control points which are used to
-    create a C2 spline which passes through all of them.
+    create a C2 spline which passes through all of them. The polynomial
+    coefficients of each segment are computed once such that evaluating
+    the spline only requires locating the segment and evaluating a cubic
+    polynomial.
     """
 
     def __init__(self, points):
@@ -46,6 +56,7 @@ class CubicSpline:
         self.z = [0] * len(points)
 
         self._fit()
+        self._compute_coefficients()
 
     def _fit(self):
         """Computes the second derivatives for the control points."""
@@ -74,31 +85,78 @@ class CubicSpline:
             self.z[i] = (v[i] - h[i] * self.z[i+1]) / u[i]
         self.z[0] = 0.0
 
+    def _compute_coefficients(self):
+        """Computes the polynomial coefficients of every segment.
+
+        Segment i is evaluated as a + b*t + c*t^2 + d*t^3 with t being the
+        distance to the segment's first control point.
+        """
+        # Segments are located by the control points separating them,
+        # positions outside the control points use the outermost segments
+        self._inner_x = self.x[1:-1]
+        self._segments = []
+        for i in range(len(self.x)-1):
+            h = self.x[i+1] - self.x[i]
+            self._segments.append((
+                self.x[i],
+                self.y[i],
+                (self.y[i+1] - self.y[i]) / h
+                    - (h / 6.0) * (self.z[i+1] + 2 * self.z[i]),
+                self.z[i] / 2.0,
+                (self.z[i+1] - self.z[i]) / (6 * h)
+            ))
+        self._coefficient_arrays = None
+
     def __call__(self, x):
         """Returns the function value at the desired position.
 
         :param x the location at which to evaluate the function
         :return function value at the provided position
         """
-        n = len(self.x)
+        x0, a, b, c, d = \
+            self._segments[bisect.bisect_left(self._inner_x, x)]
+        t = x - x0
+        return a + t * (b + t * (c + t * d))
 
-        i = 0
-        for i in range(n-1):
-            if self.x[i] <= x <= self.x[i+1]:
-                break
+    def evaluate(self, xs):
+        """Returns the function values at all desired positions.
 
-        h = self.x[i+1] - self.x[i]
-        tmp = (self.z[i] / 2.0) + (x - self.x[i]) * \
-            (self.z[i+1] - self.z[i]) / (6 * h)
-        tmp = -(h/6.0) * (self.z[i+1] + 2 * self.z[i]) + \
-            (self.y[i+1] - self.y[i]) / h + (x - self.x[i]) * tmp
+        :param xs sequence of locations at which to evaluate the function
+        :return function values at the provided positions, as a numpy
+            array if numpy is available, as an array otherwise
+        """
+        if numpy is None:
+            return array.array("d", map(self, xs))
 
-        return self.y[i] + (x - self.x[i]) * tmp
+        if self._coefficient_arrays is None:
+            self._coefficient_arrays = numpy.array(self._segments).T
+        x0, a, b, c, d = self._coefficient_arrays
+        xs = numpy.asarray(xs, dtype=float)
+        indices = numpy.searchsorted(self._inner_x, xs, side="left")
+        t = xs - x0[indices]
+        return a[indices] + \
+            t * (b[indices] + t * (c[indices] + t * d[indices]))
 
 
 class CubicBezierSpline:
 
-    """Implementation of cubic Bezier splines."""
+    """Implementation of cubic Bezier splines.
+
+    The curve is evaluated by solving x(t) = x for the curve parameter t of
+    the segment containing x using Newton's method, and evaluating y(t).
+    The iteration is seeded from a small table of x positions sampled at
+    equidistant parameter values, which also brackets the solution.
+    """
+
+    # Number of intervals into which each segment's parameter range is
+    # divided to seed the inversion
+    seed_count = 8
+
+    # Largest remaining difference |x(t) - x| at which the inversion stops
+    tolerance = 1e-12
+
+    # Maximum number of iterations used to invert x(t)
+    max_iterations = 50
 
     def __init__(self, points):
         """Creates a new CubicBezierSpline object.
@@ -110,53 +168,49 @@ class CubicBezierSpline:
 
         self.knots = [pt for pt in points[::3]]
 
-        self._lookup = []
-        self._generate_lookup()
+        self._segments = []
+        self._seeds = array.array("d")
+        self._coefficient_arrays = None
+        self._compute_coefficients()
+
+    def _compute_coefficients(self):
+        """Computes the polynomial coefficients and seeds of all segments.
 
-    def _generate_lookup(self):
-        """Generates the lookup table mapping x to t values."""
+        The coordinates of segment i are evaluated as a*t^3 + b*t^2 + c*t + d
+        with t in [0, 1].
+        """
         assert len(self.x) == len(self.y)
         assert (len(self.x) - 4) % 3 == 0
 
+        # Segments are located by the knots separating them
+        self._inner_x = [knot[0] for knot in self.knots[1:-1]]
+
         # Iterate over all spline groups part of the curve
         for i in range(int((len(self.x) - 4) / 3) + 1):
             offset = i * 3
-            points = [
-                Point2D(self.x[offset], self.y[offset]),
-                Point2D(self.x[offset + 1], self.y[offset + 1]),
-                Point2D(self.x[offset + 2], self.y[offset + 2]),
-                Point2D(self.x[offset + 3], self.y[offset + 3])
-            ]
-
-            # Get t -> coordinate mappings
-            step_size = 1.0 / 100
-            self._lookup.append([])
-            for j in range(0, 101):
-                t = j * step_size
-                self._lookup[-1].append((t, self._value_at_t(points, t)))
-
-    def _value_at_t(self, points, t):
-        """Returns the x and y coordinate for the spline at time t.
-
-        :param points the control points of the curve
-        :param t the time point
-        :return x and y coordinate corresponding to the given time point
+            self._segments.append(
+                self._polynomial(self.x[offset:offset+4]) +
+                self._polynomial(self.y[offset:offset+4])
+            )
+
+            ax, bx, cx, dx = self._segments[-1][:4]
+            for j in range(self.seed_count + 1):
+                t = j / self.seed_count
+                self._seeds.append(((ax * t + bx) * t + cx) * t + dx)
+
+    @staticmethod
+    def _polynomial(values):
+        """Returns the power basis coefficients of a cubic Bezier curve.
+
+        :param values the coordinate of the four control points
+        :return coefficients (a, b, c, d) of a*t^3 + b*t^2 + c*t + d
         """
-        t2 = t * t
-        t3 = t2 * t
-        mt = 1 - t
-        mt2 = mt * mt
-        mt3 = mt2 * mt
-
-        return Point2D(
-            points[0].x * mt3
-                + 3 * points[1].x * mt2 * t
-                + 3 * points[2].x * mt * t2
-                + points[3].x * t3,
-            points[0][1] * mt3
-                + 3 * points[1].y * mt2 * t
-                + 3 * points[2].y * mt * t2
-                + points[3].y * t3
+        p0, p1, p2, p3 = values
+        return (
+            p3 - 3 * p2 + 3 * p1 - p0,
+            3 * (p2 - 2 * p1 + p0),
+            3 * (p1 - p0),
+            p0
         )
 
     def __call__(self, x):
@@ -168,36 +222,137 @@ class CubicBezierSpline:
         # Ensure we have a valid value for x
         x = gremlin.util.clamp(x, -1.0, 1.0)
 
-        # Determine spline group to use
-        index = 0
-        if self.knots[0][0] > x:
-            index = 0
-        elif self.knots[-1][0] <= x:
-            index = len(self._lookup)-1
-        else:
-            segment_count = int((len(self.x) - 4) / 3) + 1
-            for i in range(segment_count):
-                offset = i * 3
-                if self.x[offset] <= x <= self.x[offset+3]:
-                    index = i
-                    break
-
-        # Linearly intepolate the lookup table data
-        interval = [0, len(self._lookup[index])]
-        searching = True
-        while searching:
-            distance = interval[1] - interval[0]
-            if distance == 1:
-                searching = False
+        # Determine spline group to use and bracket t using the seeds
+        index = bisect.bisect_left(self._inner_x, x)
+        ax, bx, cx, dx, ay, by, cy, dy = self._segments[index]
+        seeds = self._seeds
+        offset = index * (self.seed_count + 1)
+        j = bisect.bisect_right(
+            seeds, x, offset + 1, offset + self.seed_count
+        ) - offset - 1
+        t_low = j / self.seed_count
+        t_high = (j + 1) / self.seed_count
+
+        # Start from the linear interpolation of the seeds and refine with
+        # Newton steps, falling back to bisection for steps leaving the
+        # bracket
+        x_low = seeds[offset + j]
+        x_high = seeds[offset + j + 1]
+        t = t_low
+        if x_high != x_low:
+            t = min(t_high, max(t_low, t_low + (x - x_low) /
+                                (x_high - x_low) / self.seed_count))
+        for _ in range(self.max_iterations):
+            error = ((ax * t + bx) * t + cx) * t + dx - x
+            if abs(error) <= self.tolerance:
                 break
-
-            center_index = interval[0] + int(distance / 2.0)
-            if self._lookup[index][center_index][1][0] < x:
-                interval[0] = center_index
+            if error < 0:
+                t_low = t
             else:
-                interval[1] = center_index
+                t_high = t
+            slope = (3 * ax * t + 2 * bx) * t + cx
+            if slope != 0:
+                t -= error / slope
+            if slope == 0 or not t_low < t < t_high:
+                t = 0.5 * (t_low + t_high)
+
+        return ((ay * t + by) * t + cy) * t + dy
 
-        low = self._lookup[index][interval[0]][1]
-        high = self._lookup[index][interval[1]][1]
+    def evaluate(self, xs):
+        """Returns the function values at all desired positions.
 
-        return low.y + (x - low.x) * ((high.y - low.y) / (high.x - low.x))
+        :param xs sequence of locations at which to evaluate the function
+        :return function values at the provided positions, as a numpy
+            array if numpy is available, as an array otherwise
+        """
+        if numpy is None:
+            return array.array("d", map(self, xs))
+
+        if self._coefficient_arrays is None:
+            self._coefficient_arrays = (
+                numpy.array(self._segments).T,
+                numpy.array(self._seeds).reshape(-1, self.seed_count + 1)
+            )
+        coefficients, seeds = self._coefficient_arrays
+        xs = numpy.clip(numpy.asarray(xs, dtype=float), -1.0, 1.0)
+        indices = numpy.searchsorted(self._inner_x, xs)
+        ax, bx, cx, dx, ay, by, cy, dy = coefficients[:, indices]
+
+        # Bracket t and seed the iteration as done for individual values
+        seeds = seeds[indices]
+        j = numpy.count_nonzero(
+            seeds[:, 1:self.seed_count] <= xs[:, None],
+            axis=1
+        )
+        rows = numpy.arange(len(xs))
+        x_low = seeds[rows, j]
+        x_high = seeds[rows, j + 1]
+        t_low = j / self.seed_count
+        t_high = (j + 1) / self.seed_count
+        span = numpy.where(x_high != x_low, x_high - x_low, 1.0)
+        t = numpy.clip(
+            t_low + (xs - x_low) / span / self.seed_count,
+            t_low,
+            t_high
+        )
+
+        for _ in range(self.max_iterations):
+            error = ((ax * t + bx) * t + cx) * t + dx - xs
+            active = numpy.abs(error) > self.tolerance
+            if not active.any():
+                break
+            t_low = numpy.where(active & (error < 0), t, t_low)
+            t_high = numpy.where(active & (error > 0), t, t_high)
+            slope = (3 * ax * t + 2 * bx) * t + cx
+            step = numpy.divide(
+                error,
+                slope,
+                out=numpy.full_like(t, numpy.inf),
+                where=slope != 0
+            )
+            newton = t - step
+            newton = numpy.where(
+                (t_low < newton) & (newton < t_high),
+                newton,
+                0.5 * (t_low + t_high)
+            )
+            t = numpy.where(active, newton, t)
+
+        return ((ay * t + by) * t + cy) * t + dy
+
+
+class LookupTable:
+
+    """Approximates a function on [-1, 1] using precomputed samples.
+
+    The function is sampled at equidistant positions, which include -1, 0
+    and 1, and evaluated by linearly interpolating between the two samples
+    surrounding the requested position.
+    """
+
+    def __init__(self, fn, size=4096):
+        """Creates a new LookupTable object.
+
+        :param fn the function to approximate
+        :param size the number of intervals into which [-1, 1] is divided
+        """
+        self._scale = size / 2.0
+        self._values = array.array(
+            "d",
+            [fn(i / self._scale - 1.0) for i in range(size + 1)]
+        )
+        # Duplicate the last sample so that evaluating at 1 does not
+        # require special handling
+        self._values.append(self._values[-1])
+
+    def __call__(self, x):
+        """Returns the approximated function value at the desired position.
+
+        :param x the location at which to evaluate the function, values
+            outside of [-1, 1] are clamped
+        :return function value at the provided position
+        """
+        position = (min(1.0, max(-1.0, x)) + 1.0) * self._scale
+        index = int(position)
+        low = self._values[index]
+        return low + (position - index) * (self._values[index + 1] - low)
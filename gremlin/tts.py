@@ -21,7 +21,6 @@ to speech system.
 """
 
 import logging
-import win32com.client
 
 from mako.template import Template
 from . import event_handler, util
@@ -31,6 +30,7 @@ class TextToSpeech:
 
     def __init__(self):
         """Creates a new instance."""
+        import win32com.client
         self._speaker = win32com.client.Dispatch("SAPI.SpVoice")
         self.speak("")
 
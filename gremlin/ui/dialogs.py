@@ -84,6 +84,60 @@ class OptionsUi(common.BaseDialogUi):
             self.config.mode_change_message
         )
 
+        # Axis event coalescing
+        self.coalesce_axis_events = QtWidgets.QCheckBox(
+            "Only process the most recent value of fast moving axes"
+        )
+        self.coalesce_axis_events.clicked.connect(self._coalesce_axis_events)
+        self.coalesce_axis_events.setChecked(self.config.coalesce_axis_events)
+
+        # Threaded event dispatch
+        self.threaded_event_dispatch = QtWidgets.QCheckBox(
+            "Process inputs independently of the user interface"
+        )
+        self.threaded_event_dispatch.clicked.connect(
+            self._threaded_event_dispatch
+        )
+        self.threaded_event_dispatch.setChecked(
+            self.config.threaded_event_dispatch
+        )
+
+        # Execution graph interpretation
+        self.interpret_execution_graphs = QtWidgets.QCheckBox(
+            "Interpret actions step by step (for debugging, slower)"
+        )
+        self.interpret_execution_graphs.clicked.connect(
+            self._interpret_execution_graphs
+        )
+        self.interpret_execution_graphs.setChecked(
+            self.config.interpret_execution_graphs
+        )
+
+        # Response curve precomputation
+        self.precompute_response_curves = QtWidgets.QCheckBox(
+            "Precompute response curves (faster, approximate)"
+        )
+        self.precompute_response_curves.clicked.connect(
+            self._precompute_response_curves
+        )
+        self.precompute_response_curves.setChecked(
+            self.config.precompute_response_curves
+        )
+
+        # Batched vJoy output
+        self.batch_vjoy_output = QtWidgets.QCheckBox(
+            "Write vJoy output in batches"
+        )
+        self.batch_vjoy_output.clicked.connect(self._batch_vjoy_output)
+        self.batch_vjoy_output.setChecked(self.config.batch_vjoy_output)
+
+        # Dedicated vJoy output thread
+        self.vjoy_output_thread = QtWidgets.QCheckBox(
+            "Write vJoy output from a dedicated thread"
+        )
+        self.vjoy_output_thread.clicked.connect(self._vjoy_output_thread)
+        self.vjoy_output_thread.setChecked(self.config.vjoy_output_thread)
+
         # Default action selection
         self.default_action_layout = QtWidgets.QHBoxLayout()
         self.default_action_label = QtWidgets.QLabel("Default action")
@@ -111,12 +165,41 @@ class OptionsUi(common.BaseDialogUi):
         self.macro_axis_polling_layout.addWidget(self.macro_axis_polling_value)
         self.macro_axis_polling_layout.addStretch()
 
+        # vJoy output flush interval
+        self.vjoy_flush_interval_layout = QtWidgets.QHBoxLayout()
+        self.vjoy_flush_interval_label = \
+            QtWidgets.QLabel("Batched vJoy output interval")
+        self.vjoy_flush_interval_value = common.DynamicDoubleSpinBox()
+        self.vjoy_flush_interval_value.setRange(0.001, 0.1)
+        self.vjoy_flush_interval_value.setSingleStep(0.005)
+        self.vjoy_flush_interval_value.setDecimals(3)
+        self.vjoy_flush_interval_value.setValue(
+            self.config.vjoy_flush_interval
+        )
+        self.vjoy_flush_interval_value.valueChanged.connect(
+            self._vjoy_flush_interval
+        )
+        self.vjoy_flush_interval_layout.addWidget(
+            self.vjoy_flush_interval_label
+        )
+        self.vjoy_flush_interval_layout.addWidget(
+            self.vjoy_flush_interval_value
+        )
+        self.vjoy_flush_interval_layout.addStretch()
+
         self.general_layout.addWidget(self.highlight_input)
         self.general_layout.addWidget(self.close_to_systray)
         self.general_layout.addWidget(self.start_minimized)
         self.general_layout.addWidget(self.show_mode_change_message)
+        self.general_layout.addWidget(self.coalesce_axis_events)
+        self.general_layout.addWidget(self.threaded_event_dispatch)
+        self.general_layout.addWidget(self.interpret_execution_graphs)
+        self.general_layout.addWidget(self.precompute_response_curves)
+        self.general_layout.addWidget(self.batch_vjoy_output)
+        self.general_layout.addWidget(self.vjoy_output_thread)
         self.general_layout.addLayout(self.default_action_layout)
         self.general_layout.addLayout(self.macro_axis_polling_layout)
+        self.general_layout.addLayout(self.vjoy_flush_interval_layout)
         self.general_layout.addStretch()
         self.tab_container.addTab(self.general_page, "General")
 
@@ -236,6 +319,55 @@ class OptionsUi(common.BaseDialogUi):
         self.config.highlight_input = clicked
         self.config.save()
 
+    def _coalesce_axis_events(self, clicked):
+        """Stores preference for coalescing axis events.
+
+        :param clicked whether or not the checkbox is ticked
+        """
+        self.config.coalesce_axis_events = clicked
+        self.config.save()
+        gremlin.event_handler.EventListener().coalesce_axis_events = clicked
+
+    def _threaded_event_dispatch(self, clicked):
+        """Stores preference for processing inputs on a dedicated thread.
+
+        :param clicked whether or not the checkbox is ticked
+        """
+        self.config.threaded_event_dispatch = clicked
+        self.config.save()
+
+    def _interpret_execution_graphs(self, clicked):
+        """Stores preference for interpreting execution graphs.
+
+        :param clicked whether or not the checkbox is ticked
+        """
+        self.config.interpret_execution_graphs = clicked
+        self.config.save()
+
+    def _precompute_response_curves(self, clicked):
+        """Stores preference for precomputing response curves.
+
+        :param clicked whether or not the checkbox is ticked
+        """
+        self.config.precompute_response_curves = clicked
+        self.config.save()
+
+    def _batch_vjoy_output(self, clicked):
+        """Stores preference for writing vJoy output in batches.
+
+        :param clicked whether or not the checkbox is ticked
+        """
+        self.config.batch_vjoy_output = clicked
+        self.config.save()
+
+    def _vjoy_output_thread(self, clicked):
+        """Stores preference for writing vJoy output from its own thread.
+
+        :param clicked whether or not the checkbox is ticked
+        """
+        self.config.vjoy_output_thread = clicked
+        self.config.save()
+
     def _list_executables(self):
         """Shows a list of executables for the user to pick."""
         self.executable_list_view = ProcessWindow()
@@ -340,6 +472,14 @@ class OptionsUi(common.BaseDialogUi):
         self.config.macro_axis_polling_rate = value
         self.config.save()
 
+    def _vjoy_flush_interval(self, value):
+        """Updates the config with the newly set vJoy output interval.
+
+        :param value the new interval between writes of batched output
+        """
+        self.config.vjoy_flush_interval = value
+        self.config.save()
+
 
 class ProcessWindow(common.BaseDialogUi):
 
@@ -468,6 +608,124 @@ class LogWindowUi(common.BaseDialogUi):
         )
 
 
+class LatencyWindowUi(common.BaseDialogUi):
+
+    """Window displaying statistics about the latency of input events."""
+
+    # Interval in milliseconds between updates of the displayed statistics
+    refresh_interval = 1000
+
+    def __init__(self, parent=None):
+        """Creates a new instance.
+
+        :param parent the parent of this widget
+        """
+        super().__init__(parent)
+
+        self.setWindowTitle("Latency Statistics")
+        self.setMinimumWidth(700)
+        self.setMinimumHeight(400)
+
+        self.recorder = gremlin.latency.LatencyRecorder()
+
+        self.main_layout = QtWidgets.QVBoxLayout(self)
+        self.table = QtWidgets.QTableWidget()
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels([
+            "Stage", "Device", "Input", "Samples",
+            "p50 (ms)", "p95 (ms)", "p99 (ms)"
+        ])
+        self.table.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers
+        )
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        self.enable_recording = QtWidgets.QCheckBox("Record latencies")
+        self.enable_recording.setChecked(self.recorder.enabled)
+        self.enable_recording.clicked.connect(self._enable_recording)
+        self.reset_button = QtWidgets.QPushButton("Reset")
+        self.reset_button.clicked.connect(self._reset)
+        self.save_button = QtWidgets.QPushButton("Save to file")
+        self.save_button.clicked.connect(self._save)
+
+        self.button_layout = QtWidgets.QHBoxLayout()
+        self.button_layout.addWidget(self.enable_recording)
+        self.button_layout.addStretch()
+        self.button_layout.addWidget(self.reset_button)
+        self.button_layout.addWidget(self.save_button)
+
+        self.main_layout.addWidget(self.table)
+        self.main_layout.addLayout(self.button_layout)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self._refresh)
+        self.timer.start(LatencyWindowUi.refresh_interval)
+        self._refresh()
+
+    def closeEvent(self, event):
+        """Handles closing of the window.
+
+        :param event the closing event
+        """
+        self.timer.stop()
+        super().closeEvent(event)
+
+    def _enable_recording(self, clicked):
+        """Enables or disables the recording of latencies.
+
+        :param clicked whether or not latencies should be recorded
+        """
+        self.recorder.enabled = clicked
+
+    def _reset(self):
+        """Removes all recorded latencies."""
+        self.recorder.reset()
+        self._refresh()
+
+    def _save(self):
+        """Writes the current statistics to a user selected file."""
+        fname, _ = QtWidgets.QFileDialog.getSaveFileName(
+            None,
+            "Save latency statistics",
+            gremlin.util.userprofile_path(),
+            "CSV files (*.csv)"
+        )
+        if fname != "":
+            self.recorder.dump(fname)
+
+    def _refresh(self):
+        """Updates the table with the current statistics."""
+        statistics = self.recorder.statistics()
+        self.table.setRowCount(len(statistics))
+        for row, entry in enumerate(statistics):
+            description, count, p50, p95, p99 = entry
+            stage, hardware_id, windows_id, input_type, identifier, \
+                detail = description
+
+            stage_name = gremlin.latency.stage_to_name[stage]
+            if detail is not None:
+                stage_name = "{} ({})".format(stage_name, detail)
+            values = [
+                stage_name,
+                "{:d} / {:d}".format(hardware_id, windows_id),
+                "{} {}".format(
+                    gremlin.common.input_type_to_name[input_type],
+                    gremlin.latency.format_identifier(input_type, identifier)
+                ),
+                "{:d}".format(count),
+                "{:.3f}".format(p50 * 1000.0),
+                "{:.3f}".format(p95 * 1000.0),
+                "{:.3f}".format(p99 * 1000.0)
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(
+                    row,
+                    column,
+                    QtWidgets.QTableWidgetItem(value)
+                )
+
+
 class AboutUi(common.BaseDialogUi):
 
     """Widget which displays information about the application."""
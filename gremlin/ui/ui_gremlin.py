@@ -88,6 +88,8 @@ class Ui_Gremlin(object):
         self.actionCreate1to1Mapping.setObjectName("actionCreate1to1Mapping")
         self.actionLogDisplay = QtWidgets.QAction(Gremlin)
         self.actionLogDisplay.setObjectName("actionLogDisplay")
+        self.actionLatencyDisplay = QtWidgets.QAction(Gremlin)
+        self.actionLatencyDisplay.setObjectName("actionLatencyDisplay")
         self.actionMergeAxis = QtWidgets.QAction(Gremlin)
         self.actionMergeAxis.setObjectName("actionMergeAxis")
         self.actionModifyProfile = QtWidgets.QAction(Gremlin)
@@ -117,6 +119,7 @@ class Ui_Gremlin(object):
         self.menuTools.addSeparator()
         self.menuTools.addAction(self.actionOptions)
         self.menuTools.addAction(self.actionLogDisplay)
+        self.menuTools.addAction(self.actionLatencyDisplay)
         self.menu_Help.addAction(self.actionAbout)
         self.menuActions.addAction(self.actionCreate1to1Mapping)
         self.menuActions.addAction(self.actionMergeAxis)
@@ -161,6 +164,7 @@ class Ui_Gremlin(object):
         self.actionOptions.setText(_translate("Gremlin", "&Options"))
         self.actionCreate1to1Mapping.setText(_translate("Gremlin", "Create 1:1 mapping"))
         self.actionLogDisplay.setText(_translate("Gremlin", "&Log display"))
+        self.actionLatencyDisplay.setText(_translate("Gremlin", "L&atency statistics"))
         self.actionMergeAxis.setText(_translate("Gremlin", "&Merge Axis"))
         self.actionModifyProfile.setText(_translate("Gremlin", "Modify Profile"))
         self.actionRecent.setText(_translate("Gremlin", "&Recent"))
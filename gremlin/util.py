@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import array
 import importlib
 import logging
 import os
@@ -82,6 +83,44 @@ class FileWatcher(QtCore.QObject):
             time.sleep(1)
 
 
+class MainThreadInvoker(QtCore.QObject):
+
+    """Runs functions on the thread executing the Qt event loop."""
+
+    # Signal used to hand a function over to the main thread
+    invoke = QtCore.pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        """Creates a new instance.
+
+        :param parent parent of this object
+        """
+        QtCore.QObject.__init__(self, parent)
+        self.invoke.connect(self._run)
+
+    def _run(self, fn):
+        """Executes the provided function.
+
+        :param fn the function to execute
+        """
+        fn()
+
+
+# Instance living in the main thread used by run_in_main_thread
+_main_thread_invoker = MainThreadInvoker()
+
+
+def run_in_main_thread(fn):
+    """Executes the provided function on the Qt main thread.
+
+    When called from the main thread the function is executed immediately,
+    otherwise it is queued and executed by the Qt event loop.
+
+    :param fn the function to execute
+    """
+    _main_thread_invoker.invoke.emit(fn)
+
+
 def setup_duplicate_devices(device_id_fn, duplicate_devices):
     """Configures the device id generation method.
 
@@ -145,6 +184,57 @@ def create_calibration_function(minimum, center, maximum):
         return lambda x: axis_calibration(x, minimum, center, maximum)
 
 
+def create_calibration_lookup(minimum, center, maximum):
+    """Returns a lookup table containing the calibrated value of every
+    possible raw axis value.
+
+    The table is indexed by the raw value offset by 32768 and contains the
+    exact values the function created by create_calibration_function
+    returns for the same calibration data.
+
+    :param minimum the minimal value ever reported
+    :param center the value in the neutral position
+    :param maximum the maximal value ever reported
+    :return array of calibrated values indexed by the raw value + 32768
+    """
+    # Limits without any range, e.g. of an axis that was not moved during
+    # calibration, cannot be scaled and map every value to the center
+    if maximum == minimum:
+        logging.getLogger("system").warning(
+            "Invalid calibration limits ({}, {}, {}), using a constant "
+            "value of 0.0".format(minimum, center, maximum)
+        )
+        return array.array("d", [0.0]) * 65536
+
+    # Fall back to evaluating every single raw value if the limits are
+    # unusual, otherwise only the non clamped range needs to be evaluated
+    if not all(isinstance(v, int) for v in [minimum, center, maximum]) or \
+            not -32768 <= minimum <= center <= maximum <= 32767:
+        calibrate = create_calibration_function(minimum, center, maximum)
+        return array.array("d", map(calibrate, range(-32768, 32768)))
+
+    # Same computations as slider_calibration and axis_calibration
+    if minimum == center or maximum == center:
+        scale = float(maximum - minimum)
+        values = [
+            (v - minimum) / scale * 2.0 - 1.0
+            for v in range(minimum, maximum + 1)
+        ]
+    else:
+        lower_scale = float(center - minimum)
+        upper_scale = float(maximum - center)
+        values = [(v - center) / lower_scale for v in range(minimum, center)]
+        values.extend([
+            (v - center) / upper_scale for v in range(center, maximum + 1)
+        ])
+
+    # Raw values outside of the calibrated range are clamped
+    lookup = array.array("d", values[:1]) * (minimum + 32768)
+    lookup.extend(values)
+    lookup.extend(array.array("d", values[-1:]) * (32767 - maximum))
+    return lookup
+
+
 def truncate(text, left_size, right_size):
     """Returns a truncated string matching the specified character counts.
 
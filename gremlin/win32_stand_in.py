@@ -0,0 +1,266 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Stand-ins for the parts of the Windows API used to send key presses.
+
+They are used by the macro module when pywin32 is not available, such as
+when running profiles with simulated devices on other platforms. Key
+presses are recorded instead of being sent and the keyboard layout is a
+fixed US layout.
+"""
+
+import collections
+import time
+
+
+class win32con:
+
+    """Windows constants used by the macro module."""
+
+    KEYEVENTF_EXTENDEDKEY = 0x0001
+    KEYEVENTF_KEYUP = 0x0002
+
+    VK_BACK = 0x08
+    VK_TAB = 0x09
+    VK_RETURN = 0x0D
+    VK_PAUSE = 0x13
+    VK_CAPITAL = 0x14
+    VK_ESCAPE = 0x1B
+    VK_SPACE = 0x20
+    VK_PRIOR = 0x21
+    VK_NEXT = 0x22
+    VK_END = 0x23
+    VK_HOME = 0x24
+    VK_LEFT = 0x25
+    VK_UP = 0x26
+    VK_RIGHT = 0x27
+    VK_DOWN = 0x28
+    VK_PRINT = 0x2A
+    VK_INSERT = 0x2D
+    VK_DELETE = 0x2E
+    VK_LWIN = 0x5B
+    VK_RWIN = 0x5C
+    VK_APPS = 0x5D
+    VK_NUMPAD0 = 0x60
+    VK_NUMPAD1 = 0x61
+    VK_NUMPAD2 = 0x62
+    VK_NUMPAD3 = 0x63
+    VK_NUMPAD4 = 0x64
+    VK_NUMPAD5 = 0x65
+    VK_NUMPAD6 = 0x66
+    VK_NUMPAD7 = 0x67
+    VK_NUMPAD8 = 0x68
+    VK_NUMPAD9 = 0x69
+    VK_MULTIPLY = 0x6A
+    VK_ADD = 0x6B
+    VK_SEPARATOR = 0x6C
+    VK_SUBTRACT = 0x6D
+    VK_DECIMAL = 0x6E
+    VK_DIVIDE = 0x6F
+    VK_F1 = 0x70
+    VK_F2 = 0x71
+    VK_F3 = 0x72
+    VK_F4 = 0x73
+    VK_F5 = 0x74
+    VK_F6 = 0x75
+    VK_F7 = 0x76
+    VK_F8 = 0x77
+    VK_F9 = 0x78
+    VK_F10 = 0x79
+    VK_F11 = 0x7A
+    VK_F12 = 0x7B
+    VK_NUMLOCK = 0x90
+    VK_SCROLL = 0x91
+    VK_LSHIFT = 0xA0
+    VK_RSHIFT = 0xA1
+    VK_LCONTROL = 0xA2
+    VK_RCONTROL = 0xA3
+    VK_LMENU = 0xA4
+    VK_RMENU = 0xA5
+
+
+class KeyboardStandIn:
+
+    """Replacement for win32api which records key presses.
+
+    Every call to keybd_event is counted and, if enabled, recorded together
+    with the time it happened.
+    """
+
+    def __init__(self):
+        """Creates a new instance."""
+        self.call_count = 0
+        self.record_history = False
+        self.history = []
+
+    def keybd_event(self, virtual_code, scan_code, flags, extra_info):
+        """Records a key press or release.
+
+        :param virtual_code virtual code of the key
+        :param scan_code scan code of the key
+        :param flags KEYEVENTF_ flags of the event
+        :param extra_info additional information, ignored
+        """
+        self.call_count += 1
+        if self.record_history:
+            self.history.append((
+                time.perf_counter(),
+                virtual_code,
+                scan_code,
+                flags
+            ))
+
+    def reset_counts(self):
+        """Resets the call count and the history."""
+        self.call_count = 0
+        self.history = []
+
+
+# Drop-in replacement for the win32api module
+win32api = KeyboardStandIn()
+
+
+# Character, virtual code and scan code of the keys of a US layout which
+# are translated via the keyboard layout
+LayoutKey = collections.namedtuple(
+    "LayoutKey",
+    ["character", "virtual_code", "scan_code"]
+)
+
+_layout_keys = [
+    LayoutKey(character, 0x41 + i, scan_code)
+    for i, (character, scan_code) in enumerate(zip(
+        "abcdefghijklmnopqrstuvwxyz",
+        [
+            0x1e, 0x30, 0x2e, 0x20, 0x12, 0x21, 0x22, 0x23, 0x17, 0x24,
+            0x25, 0x26, 0x32, 0x31, 0x18, 0x19, 0x10, 0x13, 0x1f, 0x14,
+            0x16, 0x2f, 0x11, 0x2d, 0x15, 0x2c
+        ]
+    ))
+] + [
+    LayoutKey(str(i), 0x30 + i, 0x0b if i == 0 else 0x01 + i)
+    for i in range(10)
+] + [
+    LayoutKey(";", 0xba, 0x27),
+    LayoutKey("=", 0xbb, 0x0d),
+    LayoutKey(",", 0xbc, 0x33),
+    LayoutKey("-", 0xbd, 0x0c),
+    LayoutKey(".", 0xbe, 0x34),
+    LayoutKey("/", 0xbf, 0x35),
+    LayoutKey("`", 0xc0, 0x29),
+    LayoutKey("[", 0xdb, 0x1a),
+    LayoutKey("\\", 0xdc, 0x2b),
+    LayoutKey("]", 0xdd, 0x1b),
+    LayoutKey("'", 0xde, 0x28)
+]
+_character_to_key = {key.character: key for key in _layout_keys}
+_virtual_code_to_key = {key.virtual_code: key for key in _layout_keys}
+_scan_code_to_key = {key.scan_code: key for key in _layout_keys}
+
+# Identifier of the US keyboard layout
+_us_layout = 0x04090409
+
+
+def get_keyboard_layout(thread_id):
+    """Returns the keyboard layout, see GetKeyboardLayout.
+
+    :param thread_id the thread whose layout to return, ignored
+    :return identifier of the US keyboard layout
+    """
+    return _us_layout
+
+
+def get_keyboard_state(state_buffer):
+    """Returns the state of all keys, see GetKeyboardState.
+
+    :param state_buffer buffer receiving the state, left unchanged
+    :return always True
+    """
+    return True
+
+
+def map_virtual_key_ex(code, map_type, layout):
+    """Translates between virtual codes and scan codes, see MapVirtualKeyEx.
+
+    Only the translations used by the macro module, scan code to virtual
+    code (3) and virtual code to scan code (4), are supported.
+
+    :param code the code to translate
+    :param map_type the type of translation to perform
+    :param layout the keyboard layout, ignored
+    :return translated code, 0 if no translation exists
+    """
+    if map_type == 3:
+        key = _scan_code_to_key.get(code)
+        return 0 if key is None else key.virtual_code
+    elif map_type == 4:
+        key = _virtual_code_to_key.get(code)
+        return 0 if key is None else key.scan_code
+    return 0
+
+
+def to_unicode_ex(
+        virtual_code,
+        scan_code,
+        state_buffer,
+        output_buffer,
+        output_size,
+        flags,
+        layout
+):
+    """Translates a virtual code into a character, see ToUnicodeEx.
+
+    :param virtual_code the virtual code to translate
+    :param scan_code the scan code of the key, ignored
+    :param state_buffer the state of the keyboard, ignored
+    :param output_buffer buffer receiving the character
+    :param output_size size of the output buffer, ignored
+    :param flags behaviour flags, ignored
+    :param layout the keyboard layout, ignored
+    :return number of characters written to the output buffer
+    """
+    key = _virtual_code_to_key.get(virtual_code)
+    if key is None:
+        return 0
+    output_buffer.value = key.character
+    return 1
+
+
+def vk_key_scan_ex(character, layout):
+    """Returns the virtual code of a character, see VkKeyScanEx.
+
+    :param character the character to translate
+    :param layout the keyboard layout, ignored
+    :return virtual code in the low byte and the shift state in the high
+        byte, -1 if the character has no key
+    """
+    key = _character_to_key.get(character.lower())
+    if key is None:
+        return -1
+    shift = 0x100 if character != key.character else 0
+    return shift | key.virtual_code
+
+
+# Stand-ins for the dll functions used by the macro module
+dll_functions = {
+    ("user32", "GetKeyboardLayout"): get_keyboard_layout,
+    ("user32", "GetKeyboardState"): get_keyboard_state,
+    ("user32", "MapVirtualKeyExW"): map_virtual_key_ex,
+    ("user32", "ToUnicodeEx"): to_unicode_ex,
+    ("user32", "VkKeyScanExW"): vk_key_scan_ex
+}
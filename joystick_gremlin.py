@@ -210,6 +210,14 @@ class GremlinUi(QtWidgets.QMainWindow):
             lambda: self._remove_modal_window("log")
         )
 
+    def latency_window(self):
+        """Opens the latency statistics window."""
+        self.modal_windows["latency"] = gremlin.ui.dialogs.LatencyWindowUi()
+        self.modal_windows["latency"].show()
+        self.modal_windows["latency"].closed.connect(
+            lambda: self._remove_modal_window("latency")
+        )
+
     def manage_custom_modules(self):
         """Opens the custom module management window."""
         self.modal_windows["module_manager"] = \
@@ -512,6 +520,9 @@ class GremlinUi(QtWidgets.QMainWindow):
         self.ui.actionLogDisplay.triggered.connect(
             self.log_window
         )
+        self.ui.actionLatencyDisplay.triggered.connect(
+            self.latency_window
+        )
         # About
         self.ui.actionAbout.triggered.connect(self.about)
 
@@ -581,19 +592,7 @@ class GremlinUi(QtWidgets.QMainWindow):
         vjoy_devices = [dev for dev in self.devices if dev.is_virtual]
         phys_devices = [dev for dev in self.devices if not dev.is_virtual]
         for device in sorted(phys_devices, key=lambda x: x.name):
-            device_profile = self._profile.get_device_modes(
-                gremlin.util.device_id(device),
-                gremlin.profile.DeviceType.Joystick,
-                device.name
-            )
-
-            widget = gremlin.ui.device_tab.JoystickDeviceTabWidget(
-                vjoy_devices,
-                device,
-                device_profile,
-                self._current_mode
-            )
-            self.tabs[gremlin.util.device_id(device)] = widget
+            widget = self._create_joystick_tab(device, vjoy_devices)
             self.ui.devices.addTab(widget, device.name)
 
         # Create keyboard tab
@@ -640,6 +639,66 @@ class GremlinUi(QtWidgets.QMainWindow):
         )
         self.ui.devices.addTab(widget, "Settings")
 
+    def _create_joystick_tab(self, device, vjoy_devices):
+        """Creates the tab widget of a physical joystick device.
+
+        :param device the device for which to create the tab
+        :param vjoy_devices list of the available vJoy devices
+        :return widget representing the device's tab
+        """
+        device_profile = self._profile.get_device_modes(
+            gremlin.util.device_id(device),
+            gremlin.profile.DeviceType.Joystick,
+            device.name
+        )
+
+        widget = gremlin.ui.device_tab.JoystickDeviceTabWidget(
+            vjoy_devices,
+            device,
+            device_profile,
+            self._current_mode
+        )
+        self.tabs[gremlin.util.device_id(device)] = widget
+        return widget
+
+    def _add_joystick_tab(self, device):
+        """Adds the tab of a newly connected physical joystick device.
+
+        The tab is inserted such that physical devices remain sorted by
+        their name.
+
+        :param device the device for which to add a tab
+        """
+        # Devices are only distinguished by their hardware id unless
+        # duplicate devices are present, replace any such tab
+        self._remove_joystick_tab(device)
+
+        vjoy_devices = [dev for dev in self.devices if dev.is_virtual]
+        # Identical devices can share a single tab, hence count the tabs
+        # rather than the devices preceding the new one
+        preceding_tabs = set()
+        for dev in self.devices:
+            dev_id = gremlin.util.device_id(dev)
+            if not dev.is_virtual and dev.name <= device.name and \
+                    dev_id in self.tabs:
+                preceding_tabs.add(dev_id)
+        index = len(preceding_tabs)
+
+        widget = self._create_joystick_tab(device, vjoy_devices)
+        self.ui.devices.insertTab(index, widget, device.name)
+
+    def _remove_joystick_tab(self, device):
+        """Removes the tab of a disconnected physical joystick device.
+
+        :param device the device whose tab to remove
+        """
+        widget = self.tabs.pop(gremlin.util.device_id(device), None)
+        if widget is None:
+            return
+
+        self.ui.devices.removeTab(self.ui.devices.indexOf(widget))
+        widget.deleteLater()
+
     def _setup_icons(self):
         """Sets the icons of all QAction items."""
         # Menu actions
@@ -693,9 +752,32 @@ class GremlinUi(QtWidgets.QMainWindow):
     # +---------------------------------------------------------------
 
     def _device_change_cb(self):
-        """Handles addition and removal of joystick devices."""
+        """Handles addition and removal of joystick devices.
+
+        Only the tabs of the devices that were added or removed are
+        updated, unless a vJoy device changed, as every tab depends on
+        the available vJoy devices.
+        """
+        old_devices = self.devices
         self.devices = gremlin.joystick_handling.joystick_devices()
-        self._create_tabs()
+        added = [dev for dev in self.devices if dev not in old_devices]
+        removed = [dev for dev in old_devices if dev not in self.devices]
+
+        if any(dev.is_virtual for dev in added + removed):
+            self._create_tabs()
+            return
+
+        # Identical devices share a tab unless duplicate devices are
+        # distinguished, keep it while any of them remains connected
+        connected_ids = set(
+            gremlin.util.device_id(dev) for dev in self.devices
+            if not dev.is_virtual
+        )
+        for device in removed:
+            if gremlin.util.device_id(device) not in connected_ids:
+                self._remove_joystick_tab(device)
+        for device in added:
+            self._add_joystick_tab(device)
 
     def _joystick_input_selection(self, event):
         """Handles joystick events to select the appropriate input item.
@@ -1253,4 +1335,7 @@ if __name__ == "__main__":
     # Relinquish control over all VJoy devices used
     gremlin.joystick_handling.VJoyProxy.reset()
 
+    # Write configuration changes which have not been saved yet
+    gremlin.config.Configuration().flush()
+
     sys.exit(0)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Shared setup of the tests.
+
+The tests run without joystick hardware or the vJoy driver, input is
+provided by a simulated joystick and output is written to the simulated
+vJoy driver. As the EventListener is a singleton, all tests share the
+same event source.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+
+# Select the simulated vJoy driver before the vjoy module is imported
+os.environ.setdefault("GREMLIN_VJOY_DRIVER", "simulated")
+# Keep the configuration away from an actual installation's
+os.environ.setdefault("userprofile", tempfile.mkdtemp())
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# Gremlin loads its data files and templates relative to the working
+# directory
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.getcwd())
+
+
+def simulated_stick():
+    """Returns the description of the simulated joystick.
+
+    :return SimulatedJoystick instance used by all tests
+    """
+    from gremlin import simulation
+    return simulation.SimulatedJoystick(
+        name="Simulated Stick",
+        hardware_id=1,
+        windows_id=0,
+        axis_count=2,
+        button_count=8,
+        hat_count=1
+    )
+
+
+@pytest.fixture(scope="session")
+def qt_app():
+    """Returns the Qt application running the tests."""
+    from PyQt5 import QtCore
+    app = QtCore.QCoreApplication.instance()
+    if app is None:
+        app = QtCore.QCoreApplication(sys.argv)
+    return app
+
+
+@pytest.fixture(scope="session")
+def event_source(qt_app):
+    """Returns the event source providing the input of all tests."""
+    import gremlin
+    from gremlin import event_handler, simulation
+
+    gremlin.util.setup_userprofile()
+    gremlin.util.setup_duplicate_devices(gremlin.util.device_id_unique, False)
+
+    source = simulation.ScriptedEventSource([simulated_stick()])
+    listener = event_handler.EventListener(source)
+    yield source
+    listener.terminate()
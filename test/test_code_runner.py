@@ -0,0 +1,109 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+import gremlin
+from gremlin import code_generator, code_runner, profile, simulation
+from gremlin.common import InputType
+from vjoy import vjoy_interface
+
+from conftest import simulated_stick
+
+
+custom_module = """
+import gremlin
+
+stick = gremlin.input_devices.JoystickDecorator("Simulated Stick", 1, "Default")
+
+
+@stick.axis(1)
+def roll(event, vjoy):
+    vjoy[1].axis(1).value = event.value
+
+
+@stick.button(1)
+def fire(event, vjoy):
+    vjoy[1].button(1).is_pressed = event.is_pressed
+"""
+
+
+def create_profile(module_name):
+    """Returns a profile containing the simulated joystick.
+
+    :param module_name name of the custom module imported by the profile
+    :return profile importing the given custom module
+    """
+    stick = simulated_stick()
+    new_profile = profile.Profile()
+    device = profile.Device(new_profile)
+    device.name = stick.name
+    device.hardware_id = stick.hardware_id
+    device.windows_id = stick.windows_id
+    device.type = profile.DeviceType.Joystick
+    device.ensure_mode_exists("Default")
+    new_profile.devices[gremlin.util.device_id(device)] = device
+    new_profile.imports = [module_name]
+    return new_profile
+
+
+def test_profile_runs_with_simulated_devices(event_source, tmp_path,
+                                             monkeypatch):
+    (tmp_path / "runner_test_module.py").write_text(custom_module)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.syspath_prepend(gremlin.util.userprofile_path())
+
+    sim_profile = create_profile("runner_test_module")
+    code_generator.CodeGenerator(sim_profile).write_code(
+        os.path.join(gremlin.util.userprofile_path(), "gremlin_code.py")
+    )
+    runner = code_runner.CodeRunner()
+    runner.start(
+        sim_profile.build_inheritance_tree(),
+        sim_profile.settings,
+        "Default",
+        sim_profile
+    )
+    assert runner.is_running()
+
+    device = vjoy_interface.VJoyInterface.devices[1]
+    try:
+        event_source.play([
+            simulation.ScriptEntry(0.0, 0, InputType.JoystickAxis, 1, 0.5),
+            simulation.ScriptEntry(0.0, 0, InputType.JoystickButton, 1, True)
+        ], realtime=False)
+        event_source.wait()
+
+        # Events are processed by the dispatch thread
+        deadline = time.perf_counter() + 2.0
+        while not device.buttons[1] and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert device.axes[0x30] == 0x6000
+        assert device.buttons[1] is True
+    finally:
+        runner.stop()
+        event_source.play([
+            simulation.ScriptEntry(0.0, 0, InputType.JoystickAxis, 1, 0.0),
+            simulation.ScriptEntry(0.0, 0, InputType.JoystickButton, 1, False)
+        ], realtime=False)
+        event_source.wait()
+        device.reset()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from PyQt5 import QtCore
+
+from gremlin import common, event_handler
+
+
+def button_event(is_pressed):
+    """Returns an event of the simulated joystick's first button.
+
+    :param is_pressed whether or not the button is pressed
+    :return new Event instance
+    """
+    return event_handler.Event(
+        event_type=common.InputType.JoystickButton,
+        hardware_id=1,
+        windows_id=0,
+        identifier=1,
+        is_pressed=is_pressed
+    )
+
+
+class Recorder:
+
+    """Records the processed events, deferring work for pressed buttons."""
+
+    def __init__(self, delay):
+        """Creates a new instance.
+
+        :param delay time in seconds after which deferred tasks run
+        """
+        self.delay = delay
+        self.log = []
+
+    def process_event(self, event):
+        self.log.append("press" if event.is_pressed else "release")
+        if event.is_pressed:
+            event_handler.EventDispatcher().defer(
+                event,
+                self.delay,
+                lambda: self.log.append("task")
+            )
+
+    def end_batch(self):
+        self.log.append("batch")
+
+
+@pytest.fixture
+def recorder(event_source):
+    """Returns a recorder connected to the dispatcher."""
+    rec = Recorder(0.05)
+    dispatcher = event_handler.EventDispatcher()
+    dispatcher.connect(rec.process_event)
+    dispatcher.connect_batch_end(rec.end_batch)
+    yield rec
+    dispatcher.stop()
+    dispatcher.disconnect(rec.process_event)
+    dispatcher.disconnect_batch_end(rec.end_batch)
+
+
+def test_held_events_end_batch_without_thread(qt_app, recorder):
+    dispatcher = event_handler.EventDispatcher()
+    dispatcher.start(False)
+
+    dispatcher._process_signalled_event(button_event(True))
+    dispatcher._process_signalled_event(button_event(False))
+    assert recorder.log == ["press", "batch", "batch"]
+
+    deadline = time.perf_counter() + 2.0
+    while "task" not in recorder.log and time.perf_counter() < deadline:
+        qt_app.processEvents(QtCore.QEventLoop.AllEvents, 10)
+
+    # The held back release is processed after the task and followed by
+    # the end of a batch
+    assert recorder.log[3:] == ["task", "release", "batch"]
+
+
+def test_stop_runs_deferred_tasks(recorder):
+    recorder.delay = 10.0
+    dispatcher = event_handler.EventDispatcher()
+    dispatcher.start(True)
+
+    el = event_handler.EventListener()
+    el.emit_joystick_event(button_event(True))
+    el.emit_joystick_event(button_event(False))
+    deadline = time.perf_counter() + 2.0
+    while "press" not in recorder.log and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    dispatcher.stop()
+    assert time.perf_counter() - start < 1.0
+    assert recorder.log[-3:] == ["task", "release", "batch"]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from gremlin import macro, win32_stand_in
+
+
+@pytest.fixture
+def key_output():
+    """Returns the recorded key presses."""
+    if not isinstance(macro.win32api, win32_stand_in.KeyboardStandIn):
+        pytest.skip("Key presses are sent to the system")
+    macro.win32api.reset_counts()
+    macro.win32api.record_history = True
+    yield macro.win32api
+    macro.win32api.record_history = False
+    macro.win32api.reset_counts()
+
+
+def key_events(history):
+    """Returns the key presses and releases of a history.
+
+    :param history the recorded key events
+    :return list of virtual code and whether or not the key was pressed
+    """
+    return [
+        (entry[1], not entry[3] & win32_stand_in.win32con.KEYEVENTF_KEYUP)
+        for entry in history
+    ]
+
+
+def test_stop_releases_held_keys_only(key_output):
+    held = macro.Macro()
+    held.press("a")
+    held.tap("b")
+    held.pause(10.0)
+    held.release("a")
+    held.tap("c")
+
+    manager = macro.MacroManager()
+    manager.start()
+    manager.queue_macro(held)
+    deadline = time.perf_counter() + 2.0
+    while len(key_output.history) < 3 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    manager.stop()
+    assert time.perf_counter() - start < 1.0
+
+    a = macro.key_from_name("a").virtual_code
+    b = macro.key_from_name("b").virtual_code
+    assert key_events(key_output.history) == [
+        (a, True), (b, True), (b, False), (a, False)
+    ]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import types
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from gremlin import common, event_handler, joystick_handling, repeater, util
+
+
+def test_events_reach_threaded_dispatch(event_source, monkeypatch):
+    monkeypatch.setattr(
+        joystick_handling,
+        "joystick_devices",
+        lambda: [types.SimpleNamespace(hardware_id=99, is_virtual=True)]
+    )
+
+    event = event_handler.Event(
+        event_type=common.InputType.JoystickButton,
+        hardware_id=1,
+        windows_id=0,
+        identifier=1,
+        is_pressed=True
+    )
+    received = []
+    received_event = threading.Event()
+
+    def callback(evt):
+        received.append(evt.is_pressed)
+        received_event.set()
+
+    eh = event_handler.EventHandler()
+    eh.add_callback(util.device_id(event), "Default", event, callback)
+    eh.build_event_lookup({"Default": {}})
+    eh.change_mode("Default")
+    eh.resume()
+
+    dispatcher = event_handler.EventDispatcher()
+    dispatcher.connect(eh.process_event)
+    dispatcher.start(True)
+    try:
+        released = event.clone()
+        released.is_pressed = False
+        rep = repeater.Repeater([released, event], lambda msg: None)
+        rep.is_running = True
+        thread = threading.Thread(target=rep.emit_events)
+        thread.start()
+        received_event.wait(2.0)
+        rep.is_running = False
+        thread.join()
+
+        # Wait for the release event, which leaves the input neutral
+        deadline = time.perf_counter() + 2.0
+        while len(received) < 2 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        dispatcher.stop()
+        dispatcher.disconnect(eh.process_event)
+        eh.clear()
+
+    assert len(received) >= 2
+    assert received[0] is False
+    assert received[-1] is False
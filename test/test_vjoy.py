@@ -0,0 +1,89 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+# The gremlin package has to be imported before the vjoy package
+import gremlin
+from vjoy import vjoy, vjoy_interface
+from vjoy.stand_in import VJoyInterfaceStandIn
+
+
+@pytest.fixture
+def device():
+    """Returns the first simulated vJoy device."""
+    driver = vjoy_interface.VJoyInterface
+    assert isinstance(driver, VJoyInterfaceStandIn)
+
+    dev = vjoy.VJoy(1)
+    driver.reset_counts()
+    yield dev
+    vjoy.VJoy.batch_output = False
+    dev.invalidate()
+    driver.devices[1].reset()
+
+
+def test_unchanged_values_are_suppressed(device):
+    driver = vjoy_interface.VJoyInterface
+
+    device.write_axis(0x30, 0x5000)
+    device.write_axis(0x30, 0x5000)
+    device.write_button(1, True)
+    device.write_button(1, True)
+    device.write_button(1, False)
+
+    assert driver.call_counts["SetAxis"] == 1
+    assert driver.call_counts["SetBtn"] == 2
+    assert device.suppressed_writes == 2
+    assert driver.devices[1].axes[0x30] == 0x5000
+    assert driver.devices[1].buttons[1] is False
+
+
+def test_batched_output_updates_once_per_flush(device):
+    driver = vjoy_interface.VJoyInterface
+    vjoy.VJoy.batch_output = True
+
+    for value in range(0x4100, 0x4600, 0x100):
+        device.write_axis(0x30, value)
+    device.write_axis(0x31, 0x1000)
+    device.write_button(1, True)
+    device.write_button(2, True)
+    device.write_continuous_hat(1, 9000)
+
+    # Nothing is written before the flush
+    assert driver.total_calls() == 0
+    assert driver.devices[1].axes[0x30] == 0x4000
+
+    vjoy.VJoy.flush_all()
+    assert driver.total_calls() == 1
+    assert driver.call_counts["UpdateVJD"] == 1
+    assert driver.devices[1].axes[0x30] == 0x4500
+    assert driver.devices[1].axes[0x31] == 0x1000
+    assert driver.devices[1].buttons[1] is True
+    assert driver.devices[1].buttons[2] is True
+    assert driver.devices[1].hats[1] == 9000
+
+    # Flushing without pending changes does not write to the driver
+    vjoy.VJoy.flush_all()
+    assert driver.call_counts["UpdateVJD"] == 1
+
+    # Redundant writes do not mark the device as pending
+    device.write_button(1, True)
+    vjoy.VJoy.flush_all()
+    assert driver.call_counts["UpdateVJD"] == 1
@@ -0,0 +1,288 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2017 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import collections
+import functools
+import time
+
+from vjoy.vjoy_interface import VJoyState, position_axis_fields, \
+    position_button_fields, position_hat_fields
+
+
+def counted(fn):
+    """Decorator counting the number of times a driver function is called.
+
+    :param fn the function whose calls to count
+    :return wrapped function
+    """
+    @functools.wraps(fn)
+    def wrapper(self, *args):
+        self.call_counts[fn.__name__] += 1
+        return fn(self, *args)
+    return wrapper
+
+
+class StandInDevice:
+
+    """State of a single simulated vJoy device.
+
+    In addition to the state of each input the time of its last change is
+    recorded.
+    """
+
+    def __init__(self, axis_ids, button_count, hat_count):
+        """Creates a new device.
+
+        :param axis_ids HID usage ids of the axes present on the device
+        :param button_count number of buttons present on the device
+        :param hat_count number of continuous hats present on the device
+        """
+        self.is_acquired = False
+        self.axis_ids = tuple(axis_ids)
+        self.button_count = button_count
+        self.hat_count = hat_count
+        self.reset()
+
+    def reset(self):
+        """Resets all inputs to their default state."""
+        self.axes = {axis_id: 0x4000 for axis_id in self.axis_ids}
+        self.buttons = {i: False for i in range(1, self.button_count+1)}
+        self.hats = {i: -1 for i in range(1, self.hat_count+1)}
+        self.change_times = {}
+
+
+class VJoyInterfaceStandIn:
+
+    """Replacement for VJoyInterface which simulates vJoy devices.
+
+    Every call made to the driver functions is counted, allowing the number
+    of driver round trips caused by a sequence of operations to be
+    measured without vJoy devices being configured. If enabled, every
+    change of an input is recorded together with the time it happened.
+
+    The stand-in is used instead of the vJoy driver if the
+    GREMLIN_VJOY_DRIVER environment variable is set to "simulated", or by
+    replacing the VJoyInterface object used by the vjoy module.
+    """
+
+    def __init__(
+            self,
+            device_count=1,
+            axis_ids=range(0x30, 0x38),
+            button_count=32,
+            hat_count=4
+    ):
+        """Creates a new stand-in with identically configured devices.
+
+        :param device_count number of simulated devices
+        :param axis_ids HID usage ids of the axes present on each device
+        :param button_count number of buttons present on each device
+        :param hat_count number of continuous hats present on each device
+        """
+        self.call_counts = collections.Counter()
+        self.record_history = False
+        self.history = []
+        self.devices = {}
+        for vjoy_id in range(1, device_count+1):
+            self.add_device(vjoy_id, axis_ids, button_count, hat_count)
+
+    def add_device(self, vjoy_id, axis_ids, button_count, hat_count):
+        """Adds a simulated device, replacing any existing one.
+
+        :param vjoy_id the id of the device
+        :param axis_ids HID usage ids of the axes present on the device
+        :param button_count number of buttons present on the device
+        :param hat_count number of continuous hats present on the device
+        """
+        self.devices[vjoy_id] = StandInDevice(
+            axis_ids,
+            button_count,
+            hat_count
+        )
+
+    def total_calls(self, names=None):
+        """Returns the number of calls made to driver functions.
+
+        :param names names of the functions to count, all functions if
+            None is provided
+        :return total number of calls made
+        """
+        if names is None:
+            return sum(self.call_counts.values())
+        return sum(self.call_counts[name] for name in names)
+
+    def reset_counts(self):
+        """Resets the call counts of all functions and the history."""
+        self.call_counts.clear()
+        self.history = []
+
+    def _changed(self, vjoy_id, input_type, input_id, value):
+        """Records the change of an input's state.
+
+        :param vjoy_id the id of the device whose input changed
+        :param input_type the type of the input, one of "axis", "button"
+            or "hat"
+        :param input_id the id of the input
+        :param value the new state of the input
+        """
+        timestamp = time.perf_counter()
+        self.devices[vjoy_id].change_times[(input_type, input_id)] = timestamp
+        if self.record_history:
+            self.history.append(
+                (timestamp, vjoy_id, input_type, input_id, value)
+            )
+
+    # General vJoy information
+    @counted
+    def GetvJoyVersion(self):
+        return 0x218
+
+    @counted
+    def vJoyEnabled(self):
+        return True
+
+    @counted
+    def GetvJoyProductString(self):
+        return "vJoy - Virtual Joystick"
+
+    @counted
+    def GetvJoyManufacturerString(self):
+        return "Shaul Eizikovich"
+
+    @counted
+    def GetvJoySerialNumberString(self):
+        return "2.1.8"
+
+    # Device properties
+    @counted
+    def GetVJDButtonNumber(self, vjoy_id):
+        return self.devices[vjoy_id].button_count
+
+    @counted
+    def GetVJDDiscPovNumber(self, vjoy_id):
+        return 0
+
+    @counted
+    def GetVJDContPovNumber(self, vjoy_id):
+        return self.devices[vjoy_id].hat_count
+
+    @counted
+    def GetVJDAxisExist(self, vjoy_id, axis_id):
+        return 1 if axis_id in self.devices[vjoy_id].axis_ids else 0
+
+    @counted
+    def GetVJDAxisMax(self, vjoy_id, axis_id, value):
+        value._obj.value = 0x8000
+        return True
+
+    @counted
+    def GetVJDAxisMin(self, vjoy_id, axis_id, value):
+        value._obj.value = 0
+        return True
+
+    # Device management
+    @counted
+    def AcquireVJD(self, vjoy_id):
+        device = self.devices.get(vjoy_id)
+        if device is None or device.is_acquired:
+            return False
+        device.is_acquired = True
+        return True
+
+    @counted
+    def RelinquishVJD(self, vjoy_id):
+        self.devices[vjoy_id].is_acquired = False
+
+    @counted
+    def UpdateVJD(self, vjoy_id, position):
+        device = self.devices[vjoy_id]
+        position = position._obj
+        for axis_id in device.axes:
+            value = getattr(position, position_axis_fields[axis_id])
+            if device.axes[axis_id] != value:
+                device.axes[axis_id] = value
+                self._changed(vjoy_id, "axis", axis_id, value)
+        for button_id in device.buttons:
+            field = position_button_fields[(button_id - 1) // 32]
+            value = bool(
+                getattr(position, field) & (1 << ((button_id - 1) % 32))
+            )
+            if device.buttons[button_id] != value:
+                device.buttons[button_id] = value
+                self._changed(vjoy_id, "button", button_id, value)
+        for hat_id in device.hats:
+            value = getattr(position, position_hat_fields[hat_id - 1])
+            value = -1 if value == 0xFFFFFFFF else value
+            if device.hats[hat_id] != value:
+                device.hats[hat_id] = value
+                self._changed(vjoy_id, "hat", hat_id, value)
+        return True
+
+    @counted
+    def GetVJDStatus(self, vjoy_id):
+        if vjoy_id not in self.devices:
+            return VJoyState.Missing.value
+        elif self.devices[vjoy_id].is_acquired:
+            return VJoyState.Owned.value
+        return VJoyState.Free.value
+
+    # Reset functions
+    @counted
+    def ResetVJD(self, vjoy_id):
+        self.devices[vjoy_id].reset()
+        return True
+
+    @counted
+    def ResetAll(self):
+        for device in self.devices.values():
+            device.reset()
+
+    @counted
+    def ResetButtons(self, vjoy_id):
+        device = self.devices[vjoy_id]
+        device.buttons = {i: False for i in device.buttons}
+        return True
+
+    @counted
+    def ResetPovs(self, vjoy_id):
+        device = self.devices[vjoy_id]
+        device.hats = {i: -1 for i in device.hats}
+        return True
+
+    # Set values
+    @counted
+    def SetAxis(self, value, vjoy_id, axis_id):
+        self.devices[vjoy_id].axes[axis_id] = value
+        self._changed(vjoy_id, "axis", axis_id, value)
+        return True
+
+    @counted
+    def SetBtn(self, is_pressed, vjoy_id, button_id):
+        self.devices[vjoy_id].buttons[button_id] = bool(is_pressed)
+        self._changed(vjoy_id, "button", button_id, bool(is_pressed))
+        return True
+
+    @counted
+    def SetDiscPov(self, value, vjoy_id, hat_id):
+        return False
+
+    @counted
+    def SetContPov(self, value, vjoy_id, hat_id):
+        self.devices[vjoy_id].hats[hat_id] = value
+        self._changed(vjoy_id, "hat", hat_id, value)
+        return True
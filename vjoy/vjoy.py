@@ -19,12 +19,15 @@
 import ctypes
 import enum
 import logging
+import queue
 import threading
 import time
 
-from vjoy.vjoy_interface import VJoyState, VJoyInterface
+from vjoy.vjoy_interface import VJoyState, VJoyInterface, JoystickPosition, \
+    position_axis_fields, position_button_fields, position_hat_fields
 from gremlin.error import VJoyError
 import gremlin.common
+import gremlin.latency
 import gremlin.spline
 
 
@@ -65,6 +68,7 @@ class Axis:
         self.vjoy_id = vjoy_dev.vjoy_id
         self.axis_id = axis_id
         self._value = 0.0
+        self._latency = gremlin.latency.LatencyRecorder()
 
         # Retrieve axis minimum and maximum values
         tmp = ctypes.c_ulong()
@@ -84,6 +88,7 @@ class Axis:
 
         self._deadzone_fn = lambda x: deadzone(x, -1.0, -0.0, 0.0, 1.0)
         self._response_curve_fn = lambda x: x
+        self._lookup_table = None
 
         # If this is not the case our value setter needs to change
         if self._min_value != 0:
@@ -103,6 +108,7 @@ class Axis:
         else:
             logging.getLogger("system").error("Invalid spline type specified")
             self._response_curve_fn = lambda x: x
+        self._lookup_table = None
 
     def set_deadzone(self, low, center_low, center_high, high):
         """Sets the deadzone for the axis.
@@ -115,6 +121,37 @@ class Axis:
         self._deadzone_fn = lambda x: deadzone(
             x, low, center_low, center_high, high
         )
+        self._lookup_table = None
+
+    def create_lookup_table(self):
+        """Returns a table approximating the deadzone and response curve.
+
+        :return LookupTable combining the current deadzone and response
+            curve settings
+        """
+        deadzone_fn = self._deadzone_fn
+        response_curve_fn = self._response_curve_fn
+        return gremlin.spline.LookupTable(
+            lambda x: response_curve_fn(deadzone_fn(x))
+        )
+
+    def set_lookup_table(self, table):
+        """Sets a table to use instead of the deadzone and response curve.
+
+        The table remains in use until the deadzone or response curve is
+        changed.
+
+        :param table the LookupTable mapping input to output values
+        """
+        self._lookup_table = table
+
+    @property
+    def center_value(self):
+        """Returns the raw value corresponding to the axis' center.
+
+        :return raw value of the centered axis
+        """
+        return self._half_range
 
     @property
     def value(self):
@@ -141,16 +178,18 @@ class Axis:
 
         # Normalize value to [-1, 1] and apply response curve and deadzone
         # settings
-        self._value = self._response_curve_fn(
-            self._deadzone_fn(min(1.0, max(-1.0, value)))
-        )
+        value = min(1.0, max(-1.0, value))
+        if self._lookup_table is not None:
+            self._value = self._lookup_table(value)
+        else:
+            self._value = self._response_curve_fn(self._deadzone_fn(value))
 
-        if not VJoyInterface.SetAxis(
-                int(self._half_range + self._half_range * self._value),
-                self.vjoy_id,
-                self.axis_id
-        ):
-            raise VJoyError("Failed setting axis value")
+        self.vjoy_dev.write_axis(
+            self.axis_id,
+            int(self._half_range + self._half_range * self._value)
+        )
+        if self._latency.enabled:
+            self._latency.record_output()
         self.vjoy_dev.used()
 
     def set_absolute_value(self, value):
@@ -173,12 +212,12 @@ class Axis:
         # settings
         self._value = value
 
-        if not VJoyInterface.SetAxis(
-                int(self._half_range + self._half_range * self._value),
-                self.vjoy_id,
-                self.axis_id
-        ):
-            raise VJoyError("Failed setting axis value")
+        self.vjoy_dev.write_axis(
+            self.axis_id,
+            int(self._half_range + self._half_range * self._value)
+        )
+        if self._latency.enabled:
+            self._latency.record_output()
         self.vjoy_dev.used()
 
 
@@ -196,6 +235,7 @@ class Button:
         self.vjoy_id = vjoy_dev.vjoy_id
         self.button_id = button_id
         self._is_pressed = False
+        self._latency = gremlin.latency.LatencyRecorder()
 
     @property
     def is_pressed(self):
@@ -214,12 +254,9 @@ class Button:
         """
         assert(isinstance(is_pressed, bool))
         self._is_pressed = is_pressed
-        if not VJoyInterface.SetBtn(
-                self._is_pressed,
-                self.vjoy_id,
-                self.button_id
-        ):
-            raise VJoyError("Failed updating button state")
+        self.vjoy_dev.write_button(self.button_id, self._is_pressed)
+        if self._latency.enabled:
+            self._latency.record_output()
         self.vjoy_dev.used()
 
 
@@ -262,6 +299,7 @@ class Hat:
         self.hat_id = hat_id
         self._direction = (0, 0)
         self.hat_type = hat_type
+        self._latency = gremlin.latency.LatencyRecorder()
 
     @property
     def direction(self):
@@ -284,6 +322,8 @@ class Hat:
             self._set_continuous_direction(direction)
         else:
             raise VJoyError("Invalid hat type specified")
+        if self._latency.enabled:
+            self._latency.record_output()
         self.vjoy_dev.used()
 
     def _set_discrete_direction(self, direction):
@@ -297,12 +337,10 @@ class Hat:
             )
 
         self._direction = direction
-        if not VJoyInterface.SetDiscPov(
-                Hat.to_discrete_direction[direction],
-                self.vjoy_id,
-                self.hat_id
-        ):
-            raise VJoyError("Failed to set hat direction")
+        self.vjoy_dev.write_discrete_hat(
+            self.hat_id,
+            Hat.to_discrete_direction[direction]
+        )
 
     def _set_continuous_direction(self, direction):
         """Sets the direction of a continuous hat.
@@ -315,21 +353,47 @@ class Hat:
             )
 
         self._direction = direction
-        if not VJoyInterface.SetContPov(
-                Hat.to_continuous_direction[direction],
-                self.vjoy_id,
-                self.hat_id
-        ):
-            raise VJoyError("Failed to set hat direction")
+        self.vjoy_dev.write_continuous_hat(
+            self.hat_id,
+            Hat.to_continuous_direction[direction]
+        )
 
 
 class VJoy:
 
-    """Represents a vJoy device present in the system."""
+    """Represents a vJoy device present in the system.
+
+    Changes to the inputs of a device are either written to the driver
+    immediately, one call per change, or, if batched output is enabled,
+    accumulated and written with a single call when the device is flushed.
+    If an output writer is set all changes are instead submitted to it and
+    written by its thread.
+    """
 
     # Duration of inactivity after which the keep alive routine is run
     keep_alive_timeout = 60
 
+    # Whether or not changes are accumulated until the device is flushed
+    batch_output = False
+
+    # Devices holding changes which have not been written to the driver
+    _pending_devices = set()
+
+    # OutputWriter performing all driver calls, None if changes are written
+    # by the thread making them
+    output_writer = None
+
+    @classmethod
+    def flush_all(cls):
+        """Writes the pending changes of all devices to the driver."""
+        pending = cls._pending_devices
+        while len(pending) > 0:
+            try:
+                device = pending.pop()
+            except KeyError:
+                break
+            device.flush()
+
     def __init__(self, vjoy_id):
         """Creates a new object.
 
@@ -358,6 +422,16 @@ class VJoy:
 
         self.vjoy_id = vjoy_id
 
+        # Mirror of the device state, used to skip redundant writes and to
+        # write the complete state in a single call, hats start out centered.
+        # Inputs sharing a field are modified by several threads, the lock
+        # keeps each update of the mirror and its driver write atomic.
+        self._lock = threading.RLock()
+        self._position = JoystickPosition()
+        self._position.bDevice = vjoy_id
+        for field in position_hat_fields:
+            setattr(self._position, field, 0xFFFFFFFF)
+
         # Initialize all controls
         self._axis_lookup = {}
         self._axis_names = {}
@@ -365,17 +439,25 @@ class VJoy:
         self._button = self._init_buttons()
         self._hat = self._init_hats()
 
-        # Timestamp of the last time the device was used
-        self._last_active = time.time()
-        self._keep_alive_timer = threading.Timer(
-            VJoy.keep_alive_timeout,
-            self._keep_alive
-        )
-        self._keep_alive_timer.start()
+        # Number of writes skipped as they would not change the state
+        self._suppressed_writes = 0
+
+        # Counter incremented whenever the device is used
+        self._use_count = 0
 
         # Reset all controls
         self.reset()
 
+        KeepAliveScheduler().register(self)
+
+    @property
+    def suppressed_writes(self):
+        """Returns the number of writes skipped for being redundant.
+
+        :return number of writes which did not change the state of an input
+        """
+        return self._suppressed_writes
+
     @property
     def axis_count(self):
         """Returns the number of axes present in this device.
@@ -513,59 +595,235 @@ class VJoy:
         return index in self._hat
 
     def reset(self):
-        """Resets the state of all inputs to their default state."""
-        # Obtain the current state of all inputs
-        axis_states = {}
-        button_states = {}
-        hat_states = {}
-
-        for id, axis in self._axis.items():
-            axis_states[id] = axis.value
-        for id, button in self._button.items():
-            button_states[id] = button.is_pressed
-        for id, hat in self._hat.items():
-            hat_states[id] = hat.direction
-
-        # Perform reset using default vJoy functionality
+        """Resets the device while retaining the state of all inputs.
+
+        The driver's state of the device is reset and then overwritten with
+        the state last written to each input.
+        """
+        writer = VJoy.output_writer
+        if writer is not None:
+            writer.submit(self, VJoy._reset_driver_state, None, None)
+            return
+
+        with self._lock:
+            VJoyInterface.ResetVJD(self.vjoy_id)
+            self.flush()
+
+    def write_axis(self, axis_id, value):
+        """Writes the raw value of an axis.
+
+        Writing the value the axis already has is skipped.
+
+        :param axis_id the id of the axis to write
+        :param value the raw axis value
+        """
+        writer = VJoy.output_writer
+        if writer is not None:
+            writer.submit(self, VJoy._set_axis_state, axis_id, value)
+        else:
+            with self._lock:
+                if self._set_axis_state(axis_id, value):
+                    if VJoy.batch_output:
+                        VJoy._pending_devices.add(self)
+                    elif not VJoyInterface.SetAxis(
+                            value,
+                            self.vjoy_id,
+                            axis_id
+                    ):
+                        raise VJoyError("Failed setting axis value")
+
+    def write_button(self, button_id, is_pressed):
+        """Writes the state of a button.
+
+        Writing the state the button already has is skipped.
+
+        :param button_id the id of the button to write
+        :param is_pressed True if the button is pressed, False otherwise
+        """
+        writer = VJoy.output_writer
+        if writer is not None:
+            writer.submit(self, VJoy._set_button_state, button_id, is_pressed)
+        else:
+            with self._lock:
+                if self._set_button_state(button_id, is_pressed):
+                    if VJoy.batch_output:
+                        VJoy._pending_devices.add(self)
+                    elif not VJoyInterface.SetBtn(
+                            is_pressed,
+                            self.vjoy_id,
+                            button_id
+                    ):
+                        raise VJoyError("Failed updating button state")
+
+    def write_discrete_hat(self, hat_id, value):
+        """Writes the direction of a discrete hat.
+
+        Writing the direction the hat already has is skipped.
+
+        :param hat_id the id of the hat to write
+        :param value the discrete vJoy direction value, -1 if the hat is
+            centered
+        """
+        writer = VJoy.output_writer
+        if writer is not None:
+            writer.submit(self, VJoy._set_discrete_hat_state, hat_id, value)
+        else:
+            with self._lock:
+                if self._set_discrete_hat_state(hat_id, value):
+                    if VJoy.batch_output:
+                        VJoy._pending_devices.add(self)
+                    elif not VJoyInterface.SetDiscPov(
+                            value,
+                            self.vjoy_id,
+                            hat_id
+                    ):
+                        raise VJoyError("Failed to set hat direction")
+
+    def write_continuous_hat(self, hat_id, value):
+        """Writes the direction of a continuous hat.
+
+        Writing the direction the hat already has is skipped.
+
+        :param hat_id the id of the hat to write
+        :param value the angle of the hat in hundredths of a degree, -1 if
+            the hat is centered
+        """
+        writer = VJoy.output_writer
+        if writer is not None:
+            writer.submit(self, VJoy._set_continuous_hat_state, hat_id, value)
+        else:
+            with self._lock:
+                if self._set_continuous_hat_state(hat_id, value):
+                    if VJoy.batch_output:
+                        VJoy._pending_devices.add(self)
+                    elif not VJoyInterface.SetContPov(
+                            value,
+                            self.vjoy_id,
+                            hat_id
+                    ):
+                        raise VJoyError("Failed to set hat direction")
+
+    def _set_axis_state(self, axis_id, value):
+        """Stores the raw value of an axis in the device state.
+
+        :param axis_id the id of the axis to modify
+        :param value the raw axis value
+        :return True if the state changed, False otherwise
+        """
+        field = position_axis_fields[axis_id]
+        if getattr(self._position, field) == value:
+            self._suppressed_writes += 1
+            return False
+
+        setattr(self._position, field, value)
+        return True
+
+    def _set_button_state(self, button_id, is_pressed):
+        """Stores the state of a button in the device state.
+
+        :param button_id the id of the button to modify
+        :param is_pressed True if the button is pressed, False otherwise
+        :return True if the state changed, False otherwise
+        """
+        field = position_button_fields[(button_id - 1) // 32]
+        mask = 1 << ((button_id - 1) % 32)
+        state = getattr(self._position, field)
+        if bool(state & mask) == is_pressed:
+            self._suppressed_writes += 1
+            return False
+
+        setattr(self._position, field, state ^ mask)
+        return True
+
+    def _set_discrete_hat_state(self, hat_id, value):
+        """Stores the direction of a discrete hat in the device state.
+
+        :param hat_id the id of the hat to modify
+        :param value the discrete vJoy direction value, -1 if the hat is
+            centered
+        :return True if the state changed, False otherwise
+        """
+        shift = 4 * (hat_id - 1)
+        state = self._position.bHats
+        if (state >> shift) & 0xF == value & 0xF:
+            self._suppressed_writes += 1
+            return False
+
+        self._position.bHats = \
+            (state & ~(0xF << shift)) | ((value & 0xF) << shift)
+        return True
+
+    def _set_continuous_hat_state(self, hat_id, value):
+        """Stores the direction of a continuous hat in the device state.
+
+        :param hat_id the id of the hat to modify
+        :param value the angle of the hat in hundredths of a degree, -1 if
+            the hat is centered
+        :return True if the state changed, False otherwise
+        """
+        field = position_hat_fields[hat_id - 1]
+        if getattr(self._position, field) == value & 0xFFFFFFFF:
+            self._suppressed_writes += 1
+            return False
+
+        setattr(self._position, field, value & 0xFFFFFFFF)
+        return True
+
+    def _reset_driver_state(self, input_id, value):
+        """Resets the driver's state of the device.
+
+        The signature matches the state setters such that resets can be
+        submitted to an OutputWriter.
+
+        :param input_id unused
+        :param value unused
+        :return True if the device state has to be written, False otherwise
+        """
+        if self.vjoy_id is None:
+            return False
         VJoyInterface.ResetVJD(self.vjoy_id)
+        return True
+
+    def flush(self):
+        """Writes the complete state of the device to the driver.
 
-        # Restore input states based on what we recorded
-        for id in self._axis:
-            self._axis[id].value = axis_states[id]
-        for id in self._button:
-            self._button[id].is_pressed = button_states[id]
-        for id in self._hat:
-            self._hat[id].direction = hat_states[id]
+        This writes the state of every input, including those whose writes
+        were skipped for being redundant.
+        """
+        VJoy._pending_devices.discard(self)
+        if self.vjoy_id is None:
+            return
+        with self._lock:
+            if not VJoyInterface.UpdateVJD(
+                    self.vjoy_id,
+                    ctypes.byref(self._position)
+            ):
+                raise VJoyError("Failed updating device state")
+
+    @property
+    def use_count(self):
+        """Returns the number of times the device has been used.
+
+        :return counter incremented with every use of the device
+        """
+        return self._use_count
 
     def used(self):
-        """Updates the timestamp of the last time the device has been used."""
-        self._last_active = time.time()
+        """Records that the device has been used."""
+        self._use_count += 1
 
     def invalidate(self):
         """Releases all resources claimed by this instance.
 
-        Releases the lock on the vjoy device instance as well as terminating
-        the keep alive timer.
+        Releases the lock on the vjoy device instance as well as removing
+        it from the keep alive scheduler.
         """
         if self.vjoy_id:
+            KeepAliveScheduler().unregister(self)
             self.reset()
+            VJoy._pending_devices.discard(self)
             VJoyInterface.RelinquishVJD(self.vjoy_id)
             self.vjoy_id = None
-            self._keep_alive_timer.cancel()
-
-    def _keep_alive(self):
-        """Timer callback ensuring the vJoy device stays active.
-
-        If the device hasn't been used in the last 60 seconds the device will
-        be reset to ensure it doesn't time out.
-        """
-        if self._last_active + VJoy.keep_alive_timeout < time.time():
-            self.reset()
-        self._keep_alive_timer = threading.Timer(
-            VJoy.keep_alive_timeout,
-            self._keep_alive
-        )
-        self._keep_alive_timer.start()
 
     def _init_axes(self):
         """Retrieves all axes present on the vJoy device and creates their
@@ -577,6 +835,12 @@ class VJoy:
         for i, axis in enumerate(AxisName):
             if VJoyInterface.GetVJDAxisExist(self.vjoy_id, axis.value) > 0:
                 axes[i+1] = Axis(self, axis.value)
+                # Axes start out centered
+                setattr(
+                    self._position,
+                    position_axis_fields[axis.value],
+                    axes[i+1].center_value
+                )
                 self._axis_names[i+1] = gremlin.common.vjoy_axis_names[i]
                 self._axis_lookup[len(self._axis_names)] = i+1
                 self._axis_lookup[axis] = i+1
@@ -630,6 +894,239 @@ class VJoy:
         )
 
 
+@gremlin.common.SingletonDecorator
+class KeepAliveScheduler:
+
+    """Ensures acquired vJoy devices stay active.
+
+    A single thread checks all registered devices. Any device which hasn't
+    been used since it was last checked is reset, which resends the state
+    of all its inputs, to ensure it doesn't time out. The thread only runs
+    while devices are registered.
+    """
+
+    def __init__(self):
+        """Creates a new instance."""
+        # Maps devices to their use count and the time of the next check
+        self._devices = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def register(self, device):
+        """Adds a device to be kept alive.
+
+        :param device the VJoy device to keep alive
+        """
+        with self._condition:
+            self._devices[device] = (
+                device.use_count,
+                time.monotonic() + VJoy.keep_alive_timeout
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def unregister(self, device):
+        """Removes a device from the ones being kept alive.
+
+        :param device the VJoy device to remove
+        """
+        with self._condition:
+            self._devices.pop(device, None)
+            self._condition.notify()
+
+    def _run(self):
+        """Checks devices as they become due until none are registered."""
+        with self._condition:
+            while len(self._devices) > 0:
+                now = time.monotonic()
+                for device, entry in list(self._devices.items()):
+                    use_count, deadline = entry
+                    if deadline > now:
+                        continue
+                    if device.use_count == use_count:
+                        try:
+                            device.reset()
+                        except VJoyError:
+                            logging.getLogger("system").exception(
+                                "Failed to keep vJoy device alive"
+                            )
+                    self._devices[device] = (
+                        device.use_count,
+                        now + VJoy.keep_alive_timeout
+                    )
+
+                if len(self._devices) > 0:
+                    self._condition.wait(
+                        min(entry[1] for entry in self._devices.values())
+                        - time.monotonic()
+                    )
+            self._thread = None
+
+
+class OutputWriter:
+
+    """Performs all writes to vJoy devices from a single thread.
+
+    Any thread can submit changes to the inputs of a device without
+    blocking. The writer thread drains all submitted changes, keeps only
+    the last value submitted for each axis, and writes each modified device
+    with a single driver call. Button and hat changes are never dropped, a
+    change reverting a pending one, such as a button's release following
+    its press, causes the pending changes to be written first.
+    """
+
+    def __init__(self):
+        """Creates a new instance."""
+        self._commands = queue.SimpleQueue()
+        self._thread = None
+        self._submitted = 0
+        self._coalesced = 0
+
+    @property
+    def command_counts(self):
+        """Returns statistics about the changes submitted to the writer.
+
+        :return tuple of the number of changes submitted and the number of
+            changes dropped as they were superseded by later ones
+        """
+        return self._submitted, self._coalesced
+
+    def start(self):
+        """Starts the writer thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Writes all submitted changes and stops the writer thread."""
+        if self._thread is None:
+            return
+        self._commands.put(None)
+        self._thread.join()
+        self._thread = None
+        logging.getLogger("system").debug(
+            "vJoy changes submitted: {:d}, coalesced: {:d}".format(
+                *self.command_counts
+            )
+        )
+
+    def submit(self, device, setter, input_id, value):
+        """Submits a change to the input of a device.
+
+        :param device the VJoy device to modify
+        :param setter the VJoy method storing the change in the device
+            state, returning whether or not the state changed
+        :param input_id the id of the input to modify
+        :param value the new value of the input
+        """
+        self._commands.put((device, setter, input_id, value))
+
+    def _run(self):
+        """Writes submitted changes until stopped."""
+        commands = self._commands
+        running = True
+        while running:
+            pending = {}
+            command = commands.get()
+            while True:
+                if command is None:
+                    running = False
+                    break
+
+                self._submitted += 1
+                device, setter, input_id, value = command
+                key = (device, setter, input_id)
+                if key in pending:
+                    if setter is not VJoy._set_axis_state and \
+                            pending[key] != value:
+                        self._write(pending)
+                        pending = {}
+                    else:
+                        self._coalesced += 1
+                pending[key] = value
+
+                try:
+                    command = commands.get_nowait()
+                except queue.Empty:
+                    break
+            self._write(pending)
+
+    def _write(self, pending):
+        """Writes changes to the driver.
+
+        :param pending dictionary mapping (device, setter, input_id) keys
+            to the value to write
+        """
+        devices = {}
+        for key, value in pending.items():
+            device, setter, input_id = key
+            try:
+                with device._lock:
+                    changed = setter(device, input_id, value)
+                if changed:
+                    devices[device] = True
+            except (KeyError, IndexError):
+                logging.getLogger("system").exception(
+                    "Invalid vJoy change submitted"
+                )
+
+        for device in devices:
+            try:
+                device.flush()
+            except VJoyError:
+                logging.getLogger("system").exception(
+                    "Error while writing vJoy device state"
+                )
+
+
+class FlushTimer:
+
+    """Periodically writes the pending changes of all vJoy devices.
+
+    This bounds the time changes made outside of event processing, for
+    example by macros, wait before being written when batched output is
+    used.
+    """
+
+    def __init__(self, interval):
+        """Creates a new instance.
+
+        :param interval time in seconds between two flushes
+        """
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts periodically flushing the vJoy devices."""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops flushing the vJoy devices."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        """Flushes all devices until stopped."""
+        while not self._stop_event.wait(self._interval):
+            try:
+                VJoy.flush_all()
+            except VJoyError:
+                logging.getLogger("system").exception(
+                    "Error while flushing vJoy devices"
+                )
+
+
 def deadzone(value, low, low_center, high_center, high):
     """Returns the mapped value taking the provided deadzone into
     account.
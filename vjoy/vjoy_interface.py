@@ -34,21 +34,73 @@ class VJoyState(enum.Enum):
     Unknown = 4     # Unknown type of error
 
 
+class JoystickPosition(ctypes.Structure):
+
+    """Complete state of a vJoy device as consumed by UpdateVJD.
+
+    Mirrors the JOYSTICK_POSITION_V2 structure of vJoy 2.1.8.
+    """
+
+    _fields_ = [
+        ("bDevice", ctypes.c_ubyte),
+        ("wThrottle", ctypes.c_int32),
+        ("wRudder", ctypes.c_int32),
+        ("wAileron", ctypes.c_int32),
+        ("wAxisX", ctypes.c_int32),
+        ("wAxisY", ctypes.c_int32),
+        ("wAxisZ", ctypes.c_int32),
+        ("wAxisXRot", ctypes.c_int32),
+        ("wAxisYRot", ctypes.c_int32),
+        ("wAxisZRot", ctypes.c_int32),
+        ("wSlider", ctypes.c_int32),
+        ("wDial", ctypes.c_int32),
+        ("wWheel", ctypes.c_int32),
+        ("wAxisVX", ctypes.c_int32),
+        ("wAxisVY", ctypes.c_int32),
+        ("wAxisVZ", ctypes.c_int32),
+        ("wAxisVBRX", ctypes.c_int32),
+        ("wAxisVBRY", ctypes.c_int32),
+        ("wAxisVBRZ", ctypes.c_int32),
+        ("lButtons", ctypes.c_uint32),
+        ("bHats", ctypes.c_uint32),
+        ("bHatsEx1", ctypes.c_uint32),
+        ("bHatsEx2", ctypes.c_uint32),
+        ("bHatsEx3", ctypes.c_uint32),
+        ("lButtonsEx1", ctypes.c_uint32),
+        ("lButtonsEx2", ctypes.c_uint32),
+        ("lButtonsEx3", ctypes.c_uint32),
+    ]
+
+
+# Names of the JoystickPosition fields storing the value of each axis,
+# indexed by the axis' HID usage id
+position_axis_fields = {
+    0x30: "wAxisX",
+    0x31: "wAxisY",
+    0x32: "wAxisZ",
+    0x33: "wAxisXRot",
+    0x34: "wAxisYRot",
+    0x35: "wAxisZRot",
+    0x36: "wSlider",
+    0x37: "wDial",
+}
+
+# Names of the JoystickPosition fields storing the state of buttons, each
+# field holds 32 buttons
+position_button_fields = (
+    "lButtons", "lButtonsEx1", "lButtonsEx2", "lButtonsEx3"
+)
+
+# Names of the JoystickPosition fields storing the direction of continuous
+# hats, discrete hats are stored as 4 bit values in the first field
+position_hat_fields = ("bHats", "bHatsEx1", "bHatsEx2", "bHatsEx3")
+
+
 class VJoyInterface:
 
     """Allows low level interaction with VJoy devices via ctypes."""
 
-    # Attempt to find the correct location of the dll for development
-    # and installed use cases.
-    dev_path = os.path.join(os.path.dirname(__file__), "vJoyInterface.dll")
-    if os.path.isfile("vJoyInterface.dll"):
-        dll_path = "vJoyInterface.dll"
-    elif os.path.isfile(dev_path):
-        dll_path = dev_path
-    else:
-        raise GremlinError("Unable to locate vjoy dll")
-
-    vjoy_dll = ctypes.cdll.LoadLibrary(dll_path)
+    vjoy_dll = None
 
     # Declare argument and return types for all the functions
     # exposed by the dll
@@ -161,7 +213,21 @@ class VJoyInterface:
 
     @classmethod
     def initialize(cls):
-        """Initializes the functions as class methods."""
+        """Loads the dll and initializes the functions as class methods."""
+        # Attempt to find the correct location of the dll for development
+        # and installed use cases.
+        dev_path = os.path.join(
+            os.path.dirname(__file__),
+            "vJoyInterface.dll"
+        )
+        if os.path.isfile("vJoyInterface.dll"):
+            dll_path = "vJoyInterface.dll"
+        elif os.path.isfile(dev_path):
+            dll_path = dev_path
+        else:
+            raise GremlinError("Unable to locate vjoy dll")
+
+        cls.vjoy_dll = ctypes.cdll.LoadLibrary(dll_path)
         for fn_name, params in cls.api_functions.items():
             dll_fn = getattr(cls.vjoy_dll, fn_name)
             if "arguments" in params:
@@ -171,5 +237,12 @@ class VJoyInterface:
             setattr(cls, fn_name, dll_fn)
 
 
-# Initialize the class
-VJoyInterface.initialize()
+# Select the driver to use, the simulated driver allows running without vJoy
+# being installed
+if os.environ.get("GREMLIN_VJOY_DRIVER") == "simulated":
+    from vjoy.stand_in import VJoyInterfaceStandIn
+    VJoyInterface = VJoyInterfaceStandIn(
+        int(os.environ.get("GREMLIN_VJOY_DEVICES", "1"))
+    )
+else:
+    VJoyInterface.initialize()